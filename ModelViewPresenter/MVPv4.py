@@ -1,74 +1,128 @@
 import sys
-import uuid
-from datetime import datetime, date
+from contextlib import contextmanager
+from datetime import datetime
 import speech_recognition as sr
 from PyQt5.QtWidgets import (
-    QApplication, QWidget, QTableWidget, QVBoxLayout, QHBoxLayout,
-    QTableWidgetItem, QPushButton, QMessageBox, QHeaderView
+    QApplication, QWidget, QTableView, QVBoxLayout, QHBoxLayout,
+    QPushButton, QMessageBox, QHeaderView
 )
-from PyQt5.QtCore import pyqtSignal, Qt
-
-def calculate_age(dob):
-    today = date.today()
-    return today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, QTimer, pyqtSignal, Qt
+from sort_view import SortView
+from table_model import TableModel
+
+HEADERS = ["UUID", "Name", "DOB", "Age", "Last Updated"]
+EDITABLE = (1, 2)
+# Columns whose values an edit of the key column changes.
+EDIT_TOUCHES = {1: {1, 4}, 2: {2, 3, 4}}
+
+class QtTableAdapter(QAbstractTableModel):
+    """Exposes a ``TableModel`` to a ``QTableView``, in ``rows`` order.
+
+    The view asks for the cells it paints, so nothing is copied into
+    widgets.  Row numbers here are display rows; ``rows`` (a ``SortView``)
+    maps them to model rows.  Edits typed into the view come out as ``edit_requested`` for
+    the presenter to apply; after changing the model the presenter reports
+    what changed (``row_changed``, or an ``inserting``/``removing``/
+    ``moving``/``rearranging`` block around the change) so only those rows
+    repaint.
+    """
+
+    edit_requested = pyqtSignal(int, int, object)
+
+    def __init__(self, model, rows, parent=None):
+        super().__init__(parent)
+        self.model = model
+        self.rows = rows
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.model.col_count()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.EditRole):
+            return None
+        return self.model.data(self.rows.source_row(index.row()), index.column())
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return HEADERS[section]
+        return section + 1
+
+    def flags(self, index):
+        flags = Qt.ItemIsSelectable | Qt.ItemIsEnabled
+        if index.column() in EDITABLE:
+            flags |= Qt.ItemIsEditable
+        return flags
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.EditRole or not index.isValid():
+            return False
+        self.edit_requested.emit(index.row(), index.column(), value)
+        return True
+
+    def reset(self):
+        self.beginResetModel()
+        self.rows.reset()
+        self.endResetModel()
+
+    def column_changed(self, col):
+        if self.rowCount():
+            self.dataChanged.emit(self.index(0, col), self.index(self.rowCount() - 1, col))
+
+    def row_changed(self, row):
+        # An edit also moves the derived age and the timestamp, so repaint
+        # the whole row: one signal either way.
+        self.dataChanged.emit(self.index(row, 0), self.index(row, self.columnCount() - 1))
+
+    @contextmanager
+    def inserting(self, first, last):
+        self.beginInsertRows(QModelIndex(), first, last)
+        try:
+            yield
+        finally:
+            self.endInsertRows()
 
-class TableModel:
-    def __init__(self):
-        self._data = []
-
-    def row_count(self):
-        return len(self._data)
-
-    def col_count(self):
-        return 5
-
-    def data(self, row, col):
-        row_data = self._data[row]
-        if col == 0:
-            return row_data["uuid"]
-        elif col == 1:
-            return row_data["name"]
-        elif col == 2:
-            return row_data["dob"].strftime("%Y-%m-%d")
-        elif col == 3:
-            return calculate_age(row_data["dob"])
-        elif col == 4:
-            return row_data["updated"].strftime("%Y-%m-%d %H:%M:%S")
-
-    def set_data(self, row, col, value):
-        if col == 1:
-            self._data[row]["name"] = value
-        elif col == 2:
-            try:
-                dob = datetime.strptime(value, "%Y-%m-%d").date()
-                self._data[row]["dob"] = dob
-            except ValueError:
-                raise ValueError("Invalid date format. Use YYYY-MM-DD.")
-        self._data[row]["updated"] = datetime.now()
-
-    def add_row(self, name="New Name", dob=date(2000, 1, 1)):
-        self._data.append({
-            "uuid": str(uuid.uuid4()),
-            "name": name,
-            "dob": dob,
-            "updated": datetime.now()
-        })
-
-    def remove_row(self, row):
-        if 0 <= row < self.row_count():
-            del self._data[row]
-
-    def get_all_data(self):
-        return [
-            {
-                "uuid": row["uuid"],
-                "name": row["name"],
-                "dob": row["dob"].strftime("%Y-%m-%d"),
-                "age": calculate_age(row["dob"]),
-                "updated": row["updated"].strftime("%Y-%m-%d %H:%M:%S")
-            }
-            for row in self._data
-        ]
+    @contextmanager
+    def removing(self, first, last):
+        self.beginRemoveRows(QModelIndex(), first, last)
+        try:
+            yield
+        finally:
+            self.endRemoveRows()
+
+    @contextmanager
+    def moving(self, row, to):
+        # Qt counts the destination before the row is taken out.
+        self.beginMoveRows(QModelIndex(), row, row, QModelIndex(), to + 1 if to > row else to)
+        try:
+            yield
+        finally:
+            self.endMoveRows()
+
+    @contextmanager
+    def rearranging(self):
+        """Wrap a change of the display order, such as a sort.
+
+        Selection and the current cell follow their rows: persistent indexes
+        are remapped by position, through the model row each one showed
+        (``source_row`` before, ``view_row`` after).  A sort only changes
+        the display order, never the model rows, so no uuid lookup is needed.
+        """
+        self.layoutAboutToBeChanged.emit()
+        persistent = self.persistentIndexList()
+        sources = [self.rows.source_row(index.row()) for index in persistent]
+        try:
+            yield
+        finally:
+            self.changePersistentIndexList(persistent, [
+                self.index(self.rows.view_row(source), index.column())
+                for source, index in zip(sources, persistent)
+            ])
+            self.layoutChanged.emit()
 
 class TableView(QWidget):
     cell_edited = pyqtSignal(int, int, object)
@@ -77,12 +131,12 @@ class TableView(QWidget):
     print_data_clicked = pyqtSignal()
     sort_by_name_clicked = pyqtSignal()
     sort_by_age_clicked = pyqtSignal()
-    header_clicked = pyqtSignal(int)
+    header_clicked = pyqtSignal(int, bool)
     voice_add_clicked = pyqtSignal()
 
     def __init__(self):
         super().__init__()
-        self.table = QTableWidget()
+        self.table = QTableView()
         self.table.setSelectionBehavior(self.table.SelectRows)
         self.table.setSelectionMode(self.table.SingleSelection)
         self.table.setSortingEnabled(False)
@@ -107,8 +161,6 @@ class TableView(QWidget):
         layout.addLayout(btn_layout)
         self.setLayout(layout)
 
-        self.table.itemChanged.connect(self._on_item_changed)
-
         btn_add.clicked.connect(lambda: self.add_row_clicked.emit())
         btn_remove.clicked.connect(lambda: self.remove_row_clicked.emit())
         btn_print.clicked.connect(lambda: self.print_data_clicked.emit())
@@ -117,38 +169,24 @@ class TableView(QWidget):
         btn_voice.clicked.connect(lambda: self.voice_add_clicked.emit())
 
         header = self.table.horizontalHeader()
-        header.sectionClicked.connect(self.header_clicked.emit)
-
-        self._updating = False
+        header.sectionClicked.connect(self._on_header_clicked)
 
-    def set_row_count(self, count):
-        self.table.setRowCount(count)
+    def _on_header_clicked(self, col):
+        shift = bool(QApplication.keyboardModifiers() & Qt.ShiftModifier)
+        self.header_clicked.emit(col, shift)
 
-    def set_col_count(self, count):
-        self.table.setColumnCount(count)
+    def show_sort(self, keys):
+        # The header shows the primary key only.
+        header = self.table.horizontalHeader()
+        header.setSortIndicatorShown(bool(keys))
+        if keys:
+            col, ascending = keys[0]
+            header.setSortIndicator(col, Qt.AscendingOrder if ascending else Qt.DescendingOrder)
 
-    def set_horizontal_headers(self, headers):
-        self.table.setHorizontalHeaderLabels(headers)
+    def set_model(self, table_model):
+        self.table.setModel(table_model)
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-
-    def set_item(self, row, col, text, editable=True):
-        self._updating = True
-        item = QTableWidgetItem(str(text))
-        item.setFlags(item.flags() | Qt.ItemIsSelectable | Qt.ItemIsEnabled)
-        if editable:
-            item.setFlags(item.flags() | Qt.ItemIsEditable)
-        else:
-            item.setFlags(item.flags() & ~Qt.ItemIsEditable)
-        self.table.setItem(row, col, item)
-        self._updating = False
-
-    def _on_item_changed(self, item):
-        if self._updating:
-            return
-        row = item.row()
-        col = item.column()
-        new_value = item.text()
-        self.cell_edited.emit(row, col, new_value)
+        table_model.edit_requested.connect(self.cell_edited.emit)
 
     def get_selected_row(self):
         selected = self.table.selectionModel().selectedRows()
@@ -177,9 +215,11 @@ class TablePresenter:
     def __init__(self, model, view):
         self.model = model
         self.view = view
-        self.sort_ascending = True
-        self.last_sorted_column = -1
+        # Sorting only changes the display order; the model keeps its own.
+        self.sort_view = SortView(model)
+        self.table_model = QtTableAdapter(model, self.sort_view)
 
+        self.view.set_model(self.table_model)
         self.view.cell_edited.connect(self.update_model)
         self.view.add_row_clicked.connect(self.add_row)
         self.view.remove_row_clicked.connect(self.remove_row)
@@ -189,38 +229,67 @@ class TablePresenter:
         self.view.header_clicked.connect(self.sort_by_column)
         self.view.voice_add_clicked.connect(self.voice_add_row)
 
+        # Ages go stale at midnight; repaint the column then.
+        self.midnight_timer = QTimer(self.view)
+        self.midnight_timer.setSingleShot(True)
+        self.midnight_timer.timeout.connect(self.refresh_ages)
+        self.schedule_age_refresh()
+
         self.load_data()
 
     def load_data(self):
-        self.view.set_row_count(self.model.row_count())
-        self.view.set_col_count(self.model.col_count())
-        headers = ["UUID", "Name", "DOB", "Age", "Last Updated"]
-        self.view.set_horizontal_headers(headers)
-
-        for row in range(self.model.row_count()):
-            for col in range(self.model.col_count()):
-                editable = col in (1, 2)
-                val = self.model.data(row, col)
-                self.view.set_item(row, col, val, editable)
+        # Only for wholesale replacement of the model's rows; edits report
+        # just the rows they touch.
+        self.table_model.reset()
+
+    def schedule_age_refresh(self):
+        self.midnight_timer.start(int(self.model.seconds_to_midnight() * 1000) + 1000)
+
+    def refresh_ages(self):
+        # Every age may have moved on, so an age sort is redone.
+        if self.sort_view.sorts_on({3}):
+            with self.table_model.rearranging():
+                self.sort_view.touch({3})
+        else:
+            self.sort_view.touch({3})
+        self.table_model.column_changed(3)
+        self.schedule_age_refresh()
 
     def update_model(self, row, col, value):
         try:
-            self.model.set_data(row, col, value)
+            self.model.set_data(self.sort_view.source_row(row), col, value)
         except ValueError as e:
             QMessageBox.warning(self.view, "Invalid input", str(e))
-        self.load_data()
+            # Repainting the row puts the rejected value back.
+            self.table_model.row_changed(row)
+            return
+        self.table_model.row_changed(row)
+        # Keep a sorted table sorted: the row moves to its new place.
+        to = self.sort_view.edited_row(row, EDIT_TOUCHES[col])
+        if to != row:
+            with self.table_model.moving(row, to):
+                self.sort_view.move(row, to)
 
     def add_row(self):
         self.model.add_row()
-        self.load_data()
+        self.row_added()
+
+    def row_added(self):
+        # The view keeps the old row count until the insert is announced,
+        # and the new row goes straight to its place in the sort order.
+        row = self.sort_view.placement()
+        with self.table_model.inserting(row, row):
+            self.sort_view.row_added(row)
 
     def remove_row(self):
         row = self.view.get_selected_row()
         if row is None:
             QMessageBox.information(self.view, "Remove Row", "Please select a row to remove.")
             return
-        self.model.remove_row(row)
-        self.load_data()
+        source = self.sort_view.source_row(row)
+        with self.table_model.removing(row, row):
+            self.model.remove_row(source)
+            self.sort_view.row_removed(source)
 
     def print_model_data(self):
         data = self.model.get_all_data()
@@ -229,44 +298,37 @@ class TablePresenter:
             print(row)
 
     def sort_by_name(self):
-        self.model._data.sort(key=lambda x: x["name"].lower())
-        self.load_data()
+        self.sort([(1, True)])
 
     def sort_by_age(self):
-        self.model._data.sort(key=lambda x: calculate_age(x["dob"]))
-        self.load_data()
+        self.sort([(3, True)])
 
-    def sort_by_column(self, col):
-        if col == self.last_sorted_column:
-            self.sort_ascending = not self.sort_ascending
-        else:
-            self.sort_ascending = True
-            self.last_sorted_column = col
-
-        if col == 0:
-            self.model._data.sort(key=lambda x: x["uuid"], reverse=not self.sort_ascending)
-        elif col == 1:
-            self.model._data.sort(key=lambda x: x["name"].lower(), reverse=not self.sort_ascending)
-        elif col == 2:
-            self.model._data.sort(key=lambda x: x["dob"], reverse=not self.sort_ascending)
-        elif col == 3:
-            self.model._data.sort(key=lambda x: calculate_age(x["dob"]), reverse=not self.sort_ascending)
-        elif col == 4:
-            self.model._data.sort(key=lambda x: x["updated"], reverse=not self.sort_ascending)
+    def sort_by_column(self, col, extend=False):
+        # Shift-click (extend) adds col as a further key.
+        with self.table_model.rearranging():
+            self.sort_view.click(col, extend)
+        self.view.show_sort(self.sort_view.keys)
 
-        self.load_data()
+    def sort(self, keys):
+        with self.table_model.rearranging():
+            self.sort_view.sort(keys)
+        self.view.show_sort(self.sort_view.keys)
 
     def voice_add_row(self):
         name, dob = listen_and_parse()
         if name and dob:
             self.model.add_row(name=name, dob=dob)
-            self.load_data()
+            self.row_added()
         else:
             QMessageBox.warning(self.view, "Voice Input Failed", "Could not parse voice input correctly.")
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
-    model = TableModel()
+    if "--columnar" in sys.argv:
+        from columnar_model import ColumnarTableModel
+        model = ColumnarTableModel()
+    else:
+        model = TableModel()
     view = TableView()
     presenter = TablePresenter(model, view)
     view.setWindowTitle("MVP Table with Voice Insert")
@@ -0,0 +1,68 @@
+"""Columnar NumPy model vs the list-of-dicts TableModel.
+
+Run with ``python bench_columnar.py [rows]`` (default 1,000,000).  Times
+building the model, computing every age, and the sort permutation of each column in both
+directions.
+"""
+import sys
+import time
+import uuid
+from datetime import datetime
+
+import numpy as np
+
+from columnar_model import ColumnarTableModel
+from table_model import TableModel
+
+HEADERS = ["UUID", "Name", "DOB", "Age", "Last Updated"]
+
+
+def make_columns(rows):
+    rng = np.random.default_rng(7)
+    names = [f"Person {n}" for n in rng.integers(0, rows, rows).tolist()]
+    dobs = np.datetime64("1940-01-01") + rng.integers(0, 30000, rows).astype("timedelta64[D]")
+    start = np.datetime64(datetime(2024, 1, 1), "us")
+    updated = start + rng.integers(0, 10**13, rows).astype("timedelta64[us]")
+    uuids = [uuid.UUID(bytes=bytes(b)).int for b in rng.integers(0, 256, (rows, 16), dtype=np.uint8)]
+    return names, dobs, updated, uuids
+
+
+def build_dicts(names, dobs, updated, uuids):
+    model = TableModel()
+    model._data = [
+        {"uuid": str(uuid.UUID(int=u)), "name": name, "dob": dob, "updated": stamp}
+        for u, name, dob, stamp in zip(uuids, names, dobs.tolist(), updated.tolist())
+    ]
+    return model
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    columns = make_columns(rows)
+    print(f"{rows:,} rows".ljust(24) + "  dicts  columnar")
+    models = []
+    builds = []
+    for build in (build_dicts, lambda *c: ColumnarTableModel.from_columns(*c)):
+        start = time.perf_counter()
+        models.append(build(*columns))
+        builds.append(time.perf_counter() - start)
+    print(f"{'build':<24}{builds[0]:7.2f} s {builds[1]:8.2f} s")
+    ages = [timed(model.ages) for model in models]
+    print(f"{'ages':<24}{ages[0]:7.2f} s {ages[1]:8.2f} s")
+    for col, header in enumerate(HEADERS):
+        for reverse in (False, True):
+            orders = []
+            times = [timed(lambda: orders.append(model.argsort(col, reverse))) for model in models]
+            label = f"sort {header} {'desc' if reverse else 'asc'}"
+            print(f"{label:<24}{times[0]:7.2f} s {times[1]:8.2f} s")
+            assert orders[0] == orders[1].tolist()
+
+
+if __name__ == "__main__":
+    main()
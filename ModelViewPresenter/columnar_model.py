@@ -0,0 +1,237 @@
+import time
+import uuid
+from datetime import datetime, date, timedelta
+
+import numpy as np
+
+from table_model import date_key
+
+# Widest name (in characters) sorted as a fixed-width unicode array.
+MAX_NAME_WIDTH = 64
+
+
+class ColumnarTableModel:
+    """``TableModel`` with one NumPy array per field instead of a dict per row.
+
+    uuids are two ``uint64`` halves (high, low), names an object array with
+    a lowercased copy for sorting, DOBs ``datetime64[D]`` and timestamps
+    ``datetime64[us]``.  Arrays grow by doubling; only the first
+    ``row_count()`` entries are rows.  Sorting computes an ``argsort`` /
+    ``lexsort`` permutation for ``SortView``; the rows stay put.  Ages are one
+    vector expression, kept as a column that edits update in place and that
+    is recomputed after local midnight.
+    """
+
+    def __init__(self, capacity=16):
+        self._n = 0
+        self._uuid_hi = np.zeros(capacity, dtype=np.uint64)
+        self._uuid_lo = np.zeros(capacity, dtype=np.uint64)
+        self._names = np.empty(capacity, dtype=object)
+        self._names_lower = np.empty(capacity, dtype=object)
+        self._dob = np.zeros(capacity, dtype="datetime64[D]")
+        self._updated = np.zeros(capacity, dtype="datetime64[us]")
+        self._ages = np.zeros(capacity, dtype=np.int64)
+        self._ages_valid = False
+        self._today_key = 0
+        self._age_expires = 0.0
+
+    @classmethod
+    def from_columns(cls, names, dobs, updated=None, uuids=None):
+        """A model holding the given rows, built without per-row appends.
+
+        ``dobs`` and ``updated`` may be anything ``np.asarray`` turns into
+        datetime64; ``uuids`` are 128-bit ints, random when omitted.
+        """
+        n = len(names)
+        model = cls(capacity=max(n, 16))
+        if uuids is None:
+            halves = np.frombuffer(np.random.bytes(16 * n), dtype=">u8").reshape(n, 2)
+            model._uuid_hi[:n] = halves[:, 0]
+            model._uuid_lo[:n] = halves[:, 1]
+        else:
+            model._uuid_hi[:n] = [u >> 64 for u in uuids]
+            model._uuid_lo[:n] = [u & 0xFFFFFFFFFFFFFFFF for u in uuids]
+        model._names[:n] = names
+        model._names_lower[:n] = [name.lower() for name in names]
+        model._dob[:n] = np.asarray(dobs, dtype="datetime64[D]")
+        model._updated[:n] = np.datetime64(datetime.now(), "us") if updated is None else updated
+        model._n = n
+        return model
+
+    def row_count(self):
+        return self._n
+
+    def col_count(self):
+        return 5
+
+    def data(self, row, col):
+        if col == 0:
+            return str(uuid.UUID(int=(int(self._uuid_hi[row]) << 64) | int(self._uuid_lo[row])))
+        elif col == 1:
+            return self._names[row]
+        elif col == 2:
+            return str(self._dob[row])
+        elif col == 3:
+            return int(self.ages()[row])
+        elif col == 4:
+            return str(self._updated[row].astype("datetime64[s]")).replace("T", " ")
+
+    def set_data(self, row, col, value):
+        if col == 1:
+            self._names[row] = value
+            self._names_lower[row] = value.lower()
+        elif col == 2:
+            try:
+                dob = datetime.strptime(value, "%Y-%m-%d").date()
+                self._dob[row] = dob
+                self._check_day()
+                self._ages[row] = (self._today_key - date_key(dob)) // 10000
+            except ValueError:
+                raise ValueError("Invalid date format. Use YYYY-MM-DD.")
+        self._updated[row] = np.datetime64(datetime.now(), "us")
+
+    def add_row(self, name="New Name", dob=date(2000, 1, 1)):
+        if self._n == len(self._names):
+            self._grow()
+        row = self._n
+        value = uuid.uuid4().int
+        self._uuid_hi[row] = value >> 64
+        self._uuid_lo[row] = value & 0xFFFFFFFFFFFFFFFF
+        self._names[row] = name
+        self._names_lower[row] = name.lower()
+        self._dob[row] = dob
+        self._updated[row] = np.datetime64(datetime.now(), "us")
+        self._check_day()
+        self._ages[row] = (self._today_key - date_key(dob)) // 10000
+        self._n += 1
+
+    def remove_row(self, row):
+        if 0 <= row < self._n:
+            for column in self._columns():
+                column[row:self._n - 1] = column[row + 1:self._n]
+            self._n -= 1
+            self._names[self._n] = self._names_lower[self._n] = None
+
+    def ages(self):
+        """Every row's age as an ``int64`` array, in row order."""
+        self._check_day()
+        if not self._ages_valid:
+            self._ages[:self._n] = (self._today_key - self._dob_keys()) // 10000
+            self._ages_valid = True
+        return self._ages[:self._n]
+
+    def seconds_to_midnight(self):
+        self._check_day()
+        return max(0.0, self._age_expires - time.time())
+
+    def sort_keys(self, col):
+        """Column ``col``'s sort keys as arrays, least significant first."""
+        n = self._n
+        if col == 0:
+            return (self._uuid_lo[:n], self._uuid_hi[:n])
+        elif col == 1:
+            # Comparing fixed-width unicode in C beats comparing str objects,
+            # but the copy is as wide as the longest name, so a table with a
+            # very long one compares the objects instead.
+            names = self._names_lower[:n]
+            if max(map(len, names), default=0) <= MAX_NAME_WIDTH:
+                return (names.astype(str),)
+            return (names,)
+        elif col == 2:
+            return (self._dob[:n],)
+        elif col == 3:
+            return (self.ages(),)
+        else:
+            return (self._updated[:n],)
+
+    def sort_key(self, row, col):
+        """One row's key for ``col``, ordered the way ``argsort`` orders them."""
+        if col == 0:
+            return (int(self._uuid_hi[row]), int(self._uuid_lo[row]))
+        elif col == 1:
+            return self._names_lower[row]
+        elif col == 2:
+            return self._dob[row]
+        elif col == 3:
+            return int(self.ages()[row])
+        else:
+            return self._updated[row]
+
+    def argsort(self, col, reverse=False):
+        """The permutation that sorts the rows by ``col``; ties keep their order."""
+        return self._argsort(self.sort_keys(col), reverse)
+
+    def lexsort(self, keys):
+        """Like ``argsort`` for several ``(col, reverse)`` keys, the first one primary."""
+        ranks = []
+        for col, reverse in keys:
+            # Dense ranks turn any key into integers, which can be negated
+            # for a descending key and handed to one lexsort.
+            values = self.sort_keys(col)
+            order = self._argsort(values)
+            tied = np.ones(max(self._n - 1, 0), dtype=bool)
+            for value in values:
+                ordered = value[order]
+                tied &= ordered[1:] == ordered[:-1]
+            rank = np.empty(self._n, dtype=np.int64)
+            rank[order] = np.concatenate(([0], np.cumsum(~tied)))[:self._n]
+            ranks.append(-rank if reverse else rank)
+        return np.lexsort(ranks[::-1]) if ranks else np.arange(self._n)
+
+    def _argsort(self, keys, reverse=False):
+        n = self._n
+        if reverse:
+            # Sort the reversed rows, then flip: descending, ties still in
+            # row order, as list.sort(reverse=True) does.
+            keys = tuple(key[::-1] for key in keys)
+        order = np.argsort(keys[0], kind="stable") if len(keys) == 1 else np.lexsort(keys)
+        return (n - 1 - order)[::-1] if reverse else order
+
+    def get_all_data(self):
+        n = self._n
+        dobs = np.datetime_as_string(self._dob[:n]).tolist()
+        updated = np.datetime_as_string(self._updated[:n], unit="s").tolist()
+        return [
+            {
+                "uuid": str(uuid.UUID(int=(hi << 64) | lo)),
+                "name": name,
+                "dob": dob,
+                "age": age,
+                "updated": stamp.replace("T", " ")
+            }
+            for hi, lo, name, dob, age, stamp in zip(
+                self._uuid_hi[:n].tolist(), self._uuid_lo[:n].tolist(),
+                self._names[:n].tolist(), dobs, self.ages().tolist(), updated,
+            )
+        ]
+
+    def _columns(self):
+        return (
+            self._uuid_hi, self._uuid_lo, self._names, self._names_lower,
+            self._dob, self._updated, self._ages,
+        )
+
+    def _dob_keys(self):
+        dob = self._dob[:self._n]
+        months = dob.astype("datetime64[M]")
+        years = months.astype("datetime64[Y]").astype(np.int64) + 1970
+        month = months.astype(np.int64) % 12 + 1
+        day = (dob - months).astype(np.int64) + 1
+        return years * 10000 + month * 100 + day
+
+    def _check_day(self):
+        if time.time() < self._age_expires:
+            return
+        today = date.today()
+        midnight = datetime.combine(today + timedelta(days=1), datetime.min.time())
+        self._today_key = date_key(today)
+        self._age_expires = midnight.timestamp()
+        self._ages_valid = False
+
+    def _grow(self):
+        capacity = 2 * len(self._names)
+        for name in ("_uuid_hi", "_uuid_lo", "_names", "_names_lower", "_dob", "_updated", "_ages"):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
@@ -0,0 +1,195 @@
+from bisect import bisect_right
+from functools import partial
+
+
+class SortView:
+    """Display order over a table model, without reordering the model.
+
+    ``keys`` is the active sort as ``((col, ascending), ...)``, primary
+    column first; empty shows the model's own order.  Permutations (lists of
+    model rows in display order) are cached per key tuple until an edit
+    touches one of their columns.  A single column's descending order is its
+    ascending order reversed, so a direction toggle costs one list reversal.
+    Added and edited rows are placed by binary search, so the shown order
+    stays sorted without re-sorting.  Works with any model that has
+    ``row_count``, ``sort_key``, ``argsort`` and ``lexsort``.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.keys = ()
+        self._cache = {}
+        self._order = None
+        self._inverse = None
+        self._count = model.row_count()
+
+    def __len__(self):
+        # Follows the model through row_added/row_removed, so a view asking
+        # mid-change sees the old count.
+        return self._count
+
+    def reset(self):
+        """Start over after the model's rows were replaced wholesale."""
+        self._cache.clear()
+        self._count = self.model.row_count()
+        self.sort(self.keys)
+
+    def source_row(self, row):
+        """The model row shown at display row ``row``."""
+        return row if self._order is None else self._order[row]
+
+    def view_row(self, source_row):
+        """The display row showing model row ``source_row``."""
+        if self._order is None:
+            return source_row
+        if self._inverse is None:
+            inverse = [0] * len(self._order)
+            for row, source in enumerate(self._order):
+                inverse[source] = row
+            self._inverse = inverse
+        return self._inverse[source_row]
+
+    def click(self, col, extend=False):
+        """Handle a click on ``col``'s header.
+
+        A plain click sorts by ``col`` alone, flipping its direction when it
+        already was the only key.  With ``extend`` (shift-click) ``col``
+        becomes a further key, or flips if it already is one.
+        """
+        keys = list(self.keys)
+        position = next((n for n, (key, _) in enumerate(keys) if key == col), None)
+        if extend:
+            if position is None:
+                keys.append((col, True))
+            else:
+                keys[position] = (col, not keys[position][1])
+        elif len(keys) == 1 and position == 0:
+            keys = [(col, not keys[0][1])]
+        else:
+            keys = [(col, True)]
+        self.sort(keys)
+
+    def sort(self, keys):
+        self.keys = tuple(keys)
+        self._order = self._permutation(self.keys) if self.keys else None
+        self._inverse = None
+
+    def sorts_on(self, cols):
+        return any(col in cols for col, _ in self.keys)
+
+    def touch(self, cols):
+        """Forget the orders that depend on ``cols``, re-sorting if shown."""
+        self._forget(cols)
+        if self.sorts_on(cols):
+            self.sort(self.keys)
+
+    def placement(self):
+        """The display row for the row the model just appended."""
+        source = self.model.row_count() - 1
+        if self._order is None:
+            return source
+        return self._bisect(self._order, self.keys, source)
+
+    def row_added(self, row):
+        """Show the model's newest row at display row ``row`` (see ``placement``)."""
+        source = self.model.row_count() - 1
+        self._count += 1
+        for keys, order in self._cache.items():
+            if order is not self._order:
+                order.insert(self._bisect(order, keys, source), source)
+        if self._order is not None:
+            self._order.insert(row, source)
+            self._inverse = None
+
+    def edited_row(self, row, cols):
+        """Where display row ``row`` belongs after an edit changed ``cols``.
+
+        Returns the display row to ``move`` it to, which is ``row`` itself
+        when the order still holds.
+        """
+        self._forget(cols, keep=self.keys)
+        if not self.sorts_on(cols):
+            return row
+        order, source = self._order, self._order[row]
+        key = self._display_key(self.keys, source)
+        before = partial(self._display_key, self.keys)
+        if row > 0 and key < before(order[row - 1]):
+            return bisect_right(order, key, 0, row, key=before)
+        if row + 1 < len(order) and before(order[row + 1]) < key:
+            # Counted with the row already taken out.
+            return bisect_right(order, key, row + 1, len(order), key=before) - 1
+        return row
+
+    def move(self, row, to):
+        self._order.insert(to, self._order.pop(row))
+        self._inverse = None
+
+    def row_removed(self, source_row):
+        """The model deleted ``source_row``, moving the rows after it up one."""
+        self._count -= 1
+        # Renumbering is O(n) per order, so only the shown one is kept.
+        self._cache.clear()
+        if self._order is not None:
+            self._order = [row - (row > source_row) for row in self._order if row != source_row]
+            self._inverse = None
+            self._cache[self.keys] = self._order
+
+    def _forget(self, cols, keep=None):
+        for keys in [keys for keys in self._cache if keys != keep and any(col in cols for col, _ in keys)]:
+            del self._cache[keys]
+
+    def _bisect(self, order, keys, source):
+        key = partial(self._display_key, keys)
+        return bisect_right(order, key(source), key=key)
+
+    def _display_key(self, keys, source):
+        # The model row breaks ties, as it does in the stable sorts.  A
+        # single descending column is its ascending order reversed, ties
+        # included; with several keys only the descending columns flip.
+        if len(keys) == 1:
+            (col, ascending), = keys
+            key = (self.model.sort_key(source, col), source)
+            return key if ascending else _Descending(key)
+        return tuple(
+            self.model.sort_key(source, col) if ascending
+            else _Descending(self.model.sort_key(source, col))
+            for col, ascending in keys
+        ) + (source,)
+
+    def _permutation(self, keys):
+        order = self._cache.get(keys)
+        if order is not None:
+            return order
+        if len(keys) == 1:
+            (col, ascending), = keys
+            flipped = self._cache.get(((col, not ascending),))
+            if flipped is None:
+                ascending_order = _as_list(self.model.argsort(col))
+                self._cache[((col, True),)] = ascending_order
+                order = ascending_order if ascending else ascending_order[::-1]
+            else:
+                order = flipped[::-1]
+        else:
+            order = _as_list(self.model.lexsort([(col, not ascending) for col, ascending in keys]))
+        self._cache[keys] = order
+        return order
+
+
+class _Descending:
+    """Wraps a sort key so that it orders the other way round."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+def _as_list(order):
+    # ColumnarTableModel hands back arrays.
+    return order if isinstance(order, list) else order.tolist()
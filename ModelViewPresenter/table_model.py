@@ -0,0 +1,146 @@
+import time
+import uuid
+from datetime import datetime, date, timedelta
+
+def date_key(d):
+    # YYYYMMDD as an int: (today_key - dob_key) // 10000 is the age in whole
+    # years, birthday-not-yet-reached and Feb 29 included.
+    return d.year * 10000 + d.month * 100 + d.day
+
+class TableModel:
+    def __init__(self):
+        self._data = []
+        # Rows cache their age in row["_age"].  A DOB edit drops it, and so
+        # does the first call after local midnight (_age_expires, epoch
+        # seconds), once for all rows.
+        self._today_key = 0
+        self._age_expires = 0.0
+
+    def row_count(self):
+        return len(self._data)
+
+    def col_count(self):
+        return 5
+
+    def data(self, row, col):
+        row_data = self._data[row]
+        if col == 0:
+            return row_data["uuid"]
+        elif col == 1:
+            return row_data["name"]
+        elif col == 2:
+            return row_data["dob"].strftime("%Y-%m-%d")
+        elif col == 3:
+            return self.age(row_data)
+        elif col == 4:
+            return row_data["updated"].strftime("%Y-%m-%d %H:%M:%S")
+
+    def age(self, row_data):
+        self._check_day()
+        age = row_data.get("_age")
+        if age is None:
+            age = row_data["_age"] = (self._today_key - date_key(row_data["dob"])) // 10000
+        return age
+
+    def ages(self):
+        """Every row's age, in row order, in one pass with no per-row date calls."""
+        self._check_day()
+        today = self._today_key
+        ages = []
+        for row in self._data:
+            age = row.get("_age")
+            if age is None:
+                age = row["_age"] = (today - date_key(row["dob"])) // 10000
+            ages.append(age)
+        return ages
+
+    def seconds_to_midnight(self):
+        self._check_day()
+        return max(0.0, self._age_expires - time.time())
+
+    def _check_day(self):
+        if time.time() < self._age_expires:
+            return
+        today = date.today()
+        midnight = datetime.combine(today + timedelta(days=1), datetime.min.time())
+        self._today_key = date_key(today)
+        self._age_expires = midnight.timestamp()
+        for row in self._data:
+            row.pop("_age", None)
+
+    def set_data(self, row, col, value):
+        if col == 1:
+            self._data[row]["name"] = value
+        elif col == 2:
+            try:
+                dob = datetime.strptime(value, "%Y-%m-%d").date()
+                self._data[row]["dob"] = dob
+                self._data[row].pop("_age", None)
+            except ValueError:
+                raise ValueError("Invalid date format. Use YYYY-MM-DD.")
+        self._data[row]["updated"] = datetime.now()
+
+    def add_row(self, name="New Name", dob=date(2000, 1, 1)):
+        self._data.append({
+            "uuid": str(uuid.uuid4()),
+            "name": name,
+            "dob": dob,
+            "updated": datetime.now()
+        })
+
+    def remove_row(self, row):
+        if 0 <= row < self.row_count():
+            del self._data[row]
+
+    def sort_keys(self, col):
+        """Column ``col``'s sort key for every row, in row order."""
+        if col == 0:
+            return [row["uuid"] for row in self._data]
+        elif col == 1:
+            return [row["name"].lower() for row in self._data]
+        elif col == 2:
+            return [row["dob"] for row in self._data]
+        elif col == 3:
+            # One batch pass for the ages instead of a key call per row.
+            return self.ages()
+        elif col == 4:
+            return [row["updated"] for row in self._data]
+
+    def sort_key(self, row, col):
+        """``sort_keys(col)[row]`` without building the whole column."""
+        row_data = self._data[row]
+        if col == 0:
+            return row_data["uuid"]
+        elif col == 1:
+            return row_data["name"].lower()
+        elif col == 2:
+            return row_data["dob"]
+        elif col == 3:
+            return self.age(row_data)
+        elif col == 4:
+            return row_data["updated"]
+
+    def argsort(self, col, reverse=False):
+        """The row order sorted by ``col``, leaving the rows where they are; ties keep their order."""
+        keys = self.sort_keys(col)
+        return sorted(range(len(keys)), key=keys.__getitem__, reverse=reverse)
+
+    def lexsort(self, keys):
+        """Like ``argsort`` for several ``(col, reverse)`` keys, the first one primary."""
+        order = list(range(self.row_count()))
+        for col, reverse in reversed(keys):
+            values = self.sort_keys(col)
+            order.sort(key=values.__getitem__, reverse=reverse)
+        return order
+
+    def get_all_data(self):
+        return [
+            {
+                "uuid": row["uuid"],
+                "name": row["name"],
+                "dob": row["dob"].strftime("%Y-%m-%d"),
+                "age": age,
+                "updated": row["updated"].strftime("%Y-%m-%d %H:%M:%S")
+            }
+            for row, age in zip(self._data, self.ages())
+        ]
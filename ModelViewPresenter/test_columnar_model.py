@@ -0,0 +1,86 @@
+import random
+import uuid
+from datetime import date, datetime, timedelta
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from columnar_model import ColumnarTableModel  # noqa: E402
+from table_model import TableModel  # noqa: E402
+
+# Names that tie once lowercased, DOBs a few days either side of a birthday.
+NAMES = ["alice", "Bob", "bob", "Carol", "dave", "ALICE"]
+
+
+def make_models(count=40, seed=7):
+    """A ``TableModel`` and a ``ColumnarTableModel`` holding the same rows."""
+    rng = random.Random(seed)
+    uuids = [rng.getrandbits(128) for _ in range(count)]
+    names = [rng.choice(NAMES) for _ in range(count)]
+    dobs = [date.today() - timedelta(days=rng.randrange(7300, 7320)) for _ in range(count)]
+    updated = [datetime(2024, 1, 1, 12) + timedelta(seconds=rng.randrange(4)) for _ in range(count)]
+    dicts = TableModel()
+    dicts._data = [
+        {"uuid": str(uuid.UUID(int=u)), "name": name, "dob": dob, "updated": stamp}
+        for u, name, dob, stamp in zip(uuids, names, dobs, updated)
+    ]
+    columnar = ColumnarTableModel.from_columns(names, dobs, updated, uuids)
+    return dicts, columnar
+
+
+def rows(model, cols=range(5)):
+    return [[model.data(row, col) for col in cols] for row in range(model.row_count())]
+
+
+def test_data_and_ages_match_the_dict_model():
+    dicts, columnar = make_models()
+    assert rows(columnar) == rows(dicts)
+    assert columnar.ages().tolist() == dicts.ages()
+    assert columnar.get_all_data() == dicts.get_all_data()
+
+
+@pytest.mark.parametrize("reverse", [False, True])
+@pytest.mark.parametrize("col", range(5))
+def test_argsort_matches_the_dict_model(col, reverse):
+    dicts, columnar = make_models()
+    assert columnar.argsort(col, reverse).tolist() == dicts.argsort(col, reverse)
+
+
+@pytest.mark.parametrize("keys", [
+    [(1, False), (2, False)],
+    [(1, True), (3, False)],
+    [(3, True), (1, False), (4, True)],
+    [(4, False), (0, True)],
+])
+def test_lexsort_matches_the_dict_model(keys):
+    dicts, columnar = make_models()
+    assert columnar.lexsort(keys).tolist() == dicts.lexsort(keys)
+
+
+def test_edits_removals_and_appends_match_the_dict_model():
+    dicts, columnar = make_models()
+    for model in (dicts, columnar):
+        model.set_data(3, 1, "Zed")
+        model.set_data(5, 2, "1990-02-28")
+        with pytest.raises(ValueError, match="YYYY-MM-DD"):
+            model.set_data(6, 2, "28/02/1990")
+        for row in (0, 17, model.row_count() - 1, model.row_count()):
+            model.remove_row(row)
+        for n in range(20):  # past the columnar model's capacity
+            model.add_row(f"New {n % 3}", date(2000 + n % 2, 1, 1))
+
+    assert rows(columnar, range(1, 4)) == rows(dicts, range(1, 4))
+    assert rows(columnar, [0])[:-20] == rows(dicts, [0])[:-20]
+    for keys in ([(1, False)], [(3, True), (1, False)]):
+        assert columnar.lexsort(keys).tolist() == dicts.lexsort(keys)
+
+
+def test_a_very_long_name_sorts_without_a_fixed_width_copy():
+    dicts, columnar = make_models()
+    for model in (dicts, columnar):
+        model.set_data(9, 1, "b" * 10_000)
+
+    assert columnar.sort_keys(1)[0].dtype == object
+    assert columnar.argsort(1).tolist() == dicts.argsort(1)
+    assert columnar.lexsort([(1, True), (2, False)]).tolist() == dicts.lexsort([(1, True), (2, False)])
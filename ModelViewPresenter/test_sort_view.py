@@ -0,0 +1,205 @@
+import random
+from datetime import date
+
+import pytest
+
+from sort_view import SortView
+from table_model import TableModel
+
+# Names that tie once lowercased, and few distinct DOBs, so every column
+# but the uuid has ties to break.
+NAMES = ["alice", "Bob", "bob", "Carol", "dave", "ALICE"]
+DOBS = [date(1990, 1, 1), date(1990, 6, 30), date(1991, 1, 1), date(2001, 2, 3)]
+
+
+@pytest.fixture(params=["dicts", "columnar"])
+def model(request):
+    rng = random.Random(3)
+    names = [rng.choice(NAMES) for _ in range(30)]
+    dobs = [rng.choice(DOBS) for _ in range(30)]
+    if request.param == "columnar":
+        pytest.importorskip("numpy")
+        from columnar_model import ColumnarTableModel
+        return ColumnarTableModel.from_columns(names, dobs)
+    model = TableModel()
+    for name, dob in zip(names, dobs):
+        model.add_row(name, dob)
+    return model
+
+
+def fresh_sort(model, keys):
+    """The order ``keys`` ask for, sorted from scratch with ``list.sort``.
+
+    A single descending column is its ascending order reversed, ties
+    included; with several keys each is a stable sort, ties in row order.
+    """
+    order = list(range(model.row_count()))
+    if len(keys) == 1:
+        (col, ascending), = keys
+        order.sort(key=lambda row: model.sort_key(row, col))
+        return order if ascending else order[::-1]
+    for col, ascending in reversed(keys):
+        order.sort(key=lambda row: model.sort_key(row, col), reverse=not ascending)
+    return order
+
+
+def shown(view):
+    order = [view.source_row(row) for row in range(len(view))]
+    assert [view.view_row(source) for source in order] == list(range(len(order)))
+    return order
+
+
+def check(view):
+    assert len(view) == view.model.row_count()
+    assert shown(view) == fresh_sort(view.model, view.keys)
+
+
+def count_sorts(model):
+    """Make ``model`` count its ``argsort``/``lexsort`` calls in the returned list."""
+    calls = []
+    for name in ("argsort", "lexsort"):
+        method = getattr(model, name)
+
+        def counting(*args, method=method, name=name):
+            calls.append(name)
+            return method(*args)
+
+        setattr(model, name, counting)
+    return calls
+
+
+def test_unsorted_view_shows_the_model_order(model):
+    view = SortView(model)
+    assert view.keys == ()
+    assert shown(view) == list(range(model.row_count()))
+
+
+def test_clicks_match_a_fresh_sort(model):
+    view = SortView(model)
+    for col, extend, keys in [
+        (1, False, ((1, True),)),
+        (1, False, ((1, False),)),
+        (2, True, ((1, False), (2, True))),
+        (3, True, ((1, False), (2, True), (3, True))),
+        (2, True, ((1, False), (2, False), (3, True))),
+        (2, False, ((2, True),)),
+        (0, False, ((0, True),)),
+        (4, False, ((4, True),)),
+        (3, False, ((3, True),)),
+        (3, False, ((3, False),)),
+    ]:
+        view.click(col, extend)
+        assert view.keys == keys
+        check(view)
+    view.sort(())
+    assert shown(view) == list(range(model.row_count()))
+
+
+def test_direction_toggle_reuses_the_cached_order(model):
+    view = SortView(model)
+    calls = count_sorts(model)
+    for _ in range(3):
+        view.click(2)
+        check(view)
+    view.click(1)
+    view.click(2)
+    check(view)
+    assert calls == ["argsort", "argsort"]
+
+
+def test_touch_forgets_only_the_orders_on_edited_columns(model):
+    view = SortView(model)
+    view.sort([(1, True)])
+    view.sort([(2, False), (1, True)])
+    view.sort([(2, True)])
+    calls = count_sorts(model)
+
+    model.set_data(view.source_row(0), 2, "1985-06-01")
+    view.touch({2, 3, 4})
+    check(view)
+    assert calls == ["argsort"]
+    view.sort([(1, True)])  # its order did not depend on the DOBs
+    check(view)
+    assert calls == ["argsort"]
+    view.sort([(2, False), (1, True)])
+    check(view)
+    assert calls == ["argsort", "lexsort"]
+
+    model.set_data(view.source_row(3), 1, "Aaron")
+    view.touch({1, 4})
+    check(view)
+    view.click(1)
+    check(view)
+
+
+@pytest.mark.parametrize("keys", [(), ((1, True),), ((3, False),), ((2, False), (1, True))])
+def test_row_removed_matches_a_fresh_sort(model, keys):
+    view = SortView(model)
+    view.sort([(1, False)])
+    view.sort(keys)
+    for row in (0, 10, 27):  # 27 is the last row by then
+        source = view.source_row(row)
+        model.remove_row(source)
+        view.row_removed(source)
+        check(view)
+    for other in ([(1, False)], [(2, True), (3, False)]):
+        view.sort(other)
+        check(view)
+
+
+# Which sort columns an edit to column 1 or 2 changes, as in MVPv4.
+EDIT_TOUCHES = {1: {1, 4}, 2: {2, 3, 4}}
+PLACED_KEYS = [
+    ((1, True),),
+    ((1, False),),
+    ((2, False),),
+    ((1, True), (2, False)),
+    ((2, False), (1, True), (3, True)),
+]
+
+
+def other_orders(view, keys):
+    """Cache an order for every other key tuple, then show ``keys``."""
+    others = [other for other in PLACED_KEYS if other != keys]
+    for other in others:
+        view.sort(other)
+    view.sort(keys)
+    return others
+
+
+@pytest.mark.parametrize("keys", PLACED_KEYS)
+def test_added_rows_land_where_a_fresh_sort_puts_them(model, keys):
+    view = SortView(model)
+    others = other_orders(view, keys)
+    calls = count_sorts(model)
+    # Ties with existing rows on every column, then a new first and last.
+    for name, dob in [("BOB", DOBS[1]), ("alice", DOBS[0]), ("Aaron", DOBS[3]), ("zed", DOBS[2])]:
+        model.add_row(name, dob)
+        view.row_added(view.placement())
+        check(view)
+    for other in others:
+        view.sort(other)
+        check(view)
+    assert calls == []
+
+
+@pytest.mark.parametrize("keys", PLACED_KEYS)
+def test_edited_rows_move_where_a_fresh_sort_puts_them(model, keys):
+    view = SortView(model)
+    others = other_orders(view, keys)
+    for row, col, value in [
+        (0, 1, "zzz"),
+        (len(view) - 1, 1, "aaa"),
+        (5, 1, model.data(view.source_row(20), 1).upper()),  # a tie
+        (20, 2, model.data(view.source_row(4), 2)),  # a tie
+        (12, 2, "1950-01-01"),
+        (7, 1, model.data(view.source_row(7), 1)),  # unchanged
+    ]:
+        model.set_data(view.source_row(row), col, value)
+        to = view.edited_row(row, EDIT_TOUCHES[col])
+        if to != row:
+            view.move(row, to)
+        check(view)
+    for other in others:
+        view.sort(other)
+        check(view)
@@ -0,0 +1,104 @@
+from datetime import date, datetime, time, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+import table_model
+from table_model import TableModel
+
+try:
+    import columnar_model as columnar
+except ImportError:  # NumPy missing: the dict model is still tested
+    columnar = None
+
+
+TODAY = date(2024, 3, 14)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Local time frozen at noon on ``TODAY``; ``clock.set(day, hour)`` moves it."""
+    clock = SimpleNamespace()
+
+    class FrozenDate(date):
+        @classmethod
+        def today(cls):
+            return clock.day
+
+    def set(day, at=time(12)):
+        clock.day = day
+        clock.now = datetime.combine(day, at).timestamp()
+
+    clock.set = set
+    set(TODAY)
+    for module in [table_model] + ([] if columnar is None else [columnar]):
+        monkeypatch.setattr(module, "date", FrozenDate)
+        monkeypatch.setattr(module, "time", SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+def make_model():
+    model = TableModel()
+    model.add_row("Today", date(1990, 3, 14))  # 34th birthday today
+    model.add_row("Tomorrow", date(1990, 3, 15))  # turns 34 tomorrow
+    model.add_row("Leapling", date(2000, 2, 29))
+    return model
+
+
+def test_ages_are_cached_per_row(clock):
+    model = make_model()
+    assert model.ages() == [34, 33, 24]
+    assert [row["_age"] for row in model._data] == [34, 33, 24]
+
+    # Only set_data drops the cache, so a change behind its back is not seen.
+    model._data[0]["dob"] = date(2000, 1, 1)
+    assert model.data(0, 3) == 34
+    assert model.sort_keys(3) == [34, 33, 24]
+
+
+def test_a_dob_edit_recomputes_that_age_only(clock):
+    model = make_model()
+    model.ages()
+    model.set_data(1, 2, "1980-03-15")
+    assert "_age" not in model._data[1]
+    assert "_age" in model._data[0]
+    assert model.ages() == [34, 43, 24]
+
+    with pytest.raises(ValueError):
+        model.set_data(0, 2, "yesterday")
+    assert model.data(0, 3) == 34
+
+
+def test_ages_move_on_after_midnight(clock):
+    model = make_model()
+    assert model.ages() == [34, 33, 24]
+    clock.set(TODAY, time(23, 59, 59))
+    assert model.seconds_to_midnight() == pytest.approx(1)
+    assert model.ages() == [34, 33, 24]
+
+    clock.set(TODAY + timedelta(days=1), time(0, 0, 1))
+    assert model.ages() == [34, 34, 24]
+    assert model.data(1, 3) == 34
+    assert model.seconds_to_midnight() == pytest.approx(24 * 3600 - 1)
+
+    clock.set(date(2025, 3, 1))  # no Feb 29: a leapling ages on March 1
+    assert model.ages() == [34, 34, 25]
+
+
+def test_columnar_ages_move_on_after_midnight(clock):
+    if columnar is None:
+        pytest.skip("needs NumPy")
+    model = columnar.ColumnarTableModel.from_columns(
+        ["Today", "Tomorrow"], [date(1990, 3, 14), date(1990, 3, 15)]
+    )
+    assert model.ages().tolist() == [34, 33]
+    clock.set(TODAY + timedelta(days=1), time(0, 0, 1))
+    assert model.ages().tolist() == [34, 34]
+
+
+def test_cached_ages_stay_out_of_the_exported_rows(clock):
+    model = make_model()
+    model.ages()
+    rows = model.get_all_data()
+    assert [row["age"] for row in rows] == [34, 33, 24]
+    assert all(set(row) == {"uuid", "name", "dob", "age", "updated"} for row in rows)
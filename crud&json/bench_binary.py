@@ -0,0 +1,90 @@
+"""Snapshot size, load and save time: indented JSON vs ``lego_db.bin``.
+
+Run with ``python bench_binary.py [entries]`` (default 500,000).  Each load
+runs in a fresh interpreter, from the file in the page cache:
+
+* ``json.load``     the original ``load_db``: parse the whole indented file
+* ``json lazy``     ``load_lazy`` with its ``.idx``, then every bucket parsed
+* ``binary open``   ``load_binary``: header and block headers only
+* ``binary full``   ``load_binary``, then every bucket decoded
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+from lego_binary import write_binary
+from lego_storage import write_json_atomic
+from lego_stream import write_index
+
+COLORS = ["red", "blue", "green", "yellow", "black"]
+WEAPONS = ["blaster", "sword", "guitar", "flame", "bow"]
+RANKS = ["private", "captain", "major", "general"]
+
+LOADS = {
+    "json.load": "import json\nwith open(PATH) as f:\n    db = json.load(f)",
+    "json lazy": "from lego_stream import load_lazy\ndb = load_lazy(PATH)\nfor b in db.values(): b.items()",
+    "binary open": "from lego_binary import load_binary\ndb = load_binary(BIN)",
+    "binary full": "from lego_binary import load_binary\ndb = load_binary(BIN)\nfor b in db.values(): b.items()",
+}
+
+MEASURE = """
+import time
+PATH, BIN = {path!r}, {bin!r}
+start = time.perf_counter()
+{body}
+print(time.perf_counter() - start)
+"""
+
+
+def make_db(count):
+    return {
+        color: {
+            str(uuid.uuid4()): {
+                "name": f"Minifig {color} {i}", "helmet": i % 2 == 0,
+                "weapon": WEAPONS[i % len(WEAPONS)], "rank": RANKS[i % len(RANKS)],
+                "armor": "plastic", "has_jetpack": i % 3 == 0,
+            }
+            for i in range(count // len(COLORS))
+        }
+        for color in COLORS
+    }
+
+
+def measure(path, bin_path, body):
+    here = os.path.dirname(os.path.abspath(__file__))
+    out = subprocess.run(
+        [sys.executable, "-c", MEASURE.format(path=path, bin=bin_path, body=body)],
+        cwd=here, check=True, capture_output=True, text=True,
+    ).stdout
+    return float(out)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    db = make_db(count)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "lego_db.json")
+        bin_path = os.path.join(tmp, "lego_db.bin")
+        start = time.perf_counter()
+        write_json_atomic(path, db)
+        write_index(path)
+        json_save = time.perf_counter() - start
+        start = time.perf_counter()
+        write_binary(bin_path, db)
+        bin_save = time.perf_counter() - start
+
+        json_mb = os.path.getsize(path) / 1024 / 1024
+        bin_mb = os.path.getsize(bin_path) / 1024 / 1024
+        print(f"{count:,} entries")
+        print(f"  json: {json_mb:7.1f} MB, saved in {json_save:5.2f} s")
+        print(f"binary: {bin_mb:7.1f} MB, saved in {bin_save:5.2f} s ({bin_mb / json_mb:.0%} of the size)")
+        for label, body in LOADS.items():
+            elapsed = min(measure(path, bin_path, body) for _ in range(3))
+            print(f"{label:>12}: {elapsed * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
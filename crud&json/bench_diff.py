@@ -0,0 +1,68 @@
+"""JSON diff view refresh after one edit: cached fragments vs a full render.
+
+Run with ``python bench_diff.py [count]`` (default 100,000).  Each round
+edits one entry and refreshes, the way the apps do after a button press.
+"""
+import sys
+import time
+
+from lego_changes import ChangeTracker
+from lego_diff import DiffRenderer, render_entry
+
+COLORS = ["red", "blue", "green", "yellow", "black"]
+ROUNDS = 20
+
+
+def make_db(count):
+    db = {color: {} for color in COLORS}
+    for i in range(count):
+        db[COLORS[i % len(COLORS)]][f"{i:032x}"] = {
+            "name": f"Minifig {i}", "helmet": i % 2 == 0, "weapon": "sword",
+            "rank": "private", "armor": "plastic", "has_jetpack": False,
+        }
+    return db
+
+
+def full_render(db, changes):
+    output = ["<pre>"]
+    for color, entries in db.items():
+        output.append(f'"<span style="color:#888">{color}</span>": {{')
+        for entry_id, fields in entries.items():
+            output.append(render_entry(entry_id, fields, changes.get((color, entry_id), ())))
+        output.append("},")
+    output.append("</pre>")
+    return "\n".join(output)
+
+
+def edit(db, tracker, n):
+    color = COLORS[n % len(COLORS)]
+    entry_id = next(iter(db[color]))
+    db[color][entry_id]["rank"] = f"rank {n}"
+    tracker.touch(color, entry_id, ["rank"])
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    db = make_db(count)
+    tracker = ChangeTracker()
+    renderer = DiffRenderer()
+    start = time.perf_counter()
+    renderer.render(db, {}, tracker)
+    print(f"{count:,} entries, first render {time.perf_counter() - start:.3f} s")
+
+    cached = full = 0.0
+    for n in range(ROUNDS):
+        edit(db, tracker, n)
+        changes = tracker.take()
+        start = time.perf_counter()
+        html = renderer.render(db, changes, tracker)
+        cached += time.perf_counter() - start
+        start = time.perf_counter()
+        assert full_render(db, changes) == html
+        full += time.perf_counter() - start
+    print(f"refresh after one edit: cached {cached / ROUNDS * 1000:.1f} ms, "
+          f"full {full / ROUNDS * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Attribute filters: bitmap index vs a linear scan over the entries.
+
+Run with ``python bench_filter.py [count]`` (default 500,000).  Times the
+one-off index build, then each query resolved both ways, including mapping
+the hits back to ``(color, uuid)``.
+"""
+import random
+import sys
+import time
+
+from lego_filter import BitmapIndex, matches, parse_filter
+from lego_record import Minifig
+
+COLORS = ["red", "blue", "green", "yellow", "black"]
+RANKS = ["private", "corporal", "sergeant", "captain", "colonel"]
+WEAPONS = ["blaster", "sword", "flame", "guitar", "none"]
+QUERIES = [
+    "blue, helmet, jetpack, rank=captain",
+    "red|green, !helmet, weapon=sword",
+    "rank=colonel|captain, jetpack",
+    "!black, armor=plastic",
+]
+
+
+def make_db(count):
+    rng = random.Random(1)
+    db = {color: {} for color in COLORS}
+    for i in range(count):
+        db[rng.choice(COLORS)][f"{i:032x}"] = Minifig.from_dict({
+            "name": f"Minifig {i}", "helmet": rng.random() < 0.5,
+            "weapon": rng.choice(WEAPONS), "rank": rng.choice(RANKS),
+            "armor": "plastic", "has_jetpack": rng.random() < 0.2,
+        })
+    return db
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    db = make_db(count)
+    index = BitmapIndex()
+    _, build = timed(lambda: index.rebuild(db))
+    print(f"{count:,} entries, index build {build:.2f} s")
+    for text in QUERIES:
+        clauses = parse_filter(text)
+        hits, fast = timed(lambda: list(index.locations(index.query(clauses))))
+        scanned, slow = timed(lambda: [
+            (color, uid)
+            for color, entries in db.items()
+            for uid, entry in entries.items()
+            if matches(color, entry, clauses)
+        ])
+        assert sorted(hits) == sorted(scanned)
+        print(
+            f"{text:>38}: {len(hits):>8,} hits  bitmap {fast * 1e3:8.2f} ms"
+            f"  scan {slow * 1e3:8.2f} ms  ({slow / fast:5.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""pytest-benchmark suite for LegoStore at 10k, 100k and 1M entries.
+
+Run with ``python -m pytest bench_lego_store.py --benchmark-only``; add
+``-k 10000`` to stay on the small size.  Each size is built once per module
+with ``put_many`` so only the operation itself is timed.
+"""
+import itertools
+import uuid
+
+import pytest
+
+from lego_record import Minifig
+from lego_store import LegoStore
+
+pytest.importorskip("pytest_benchmark")
+
+SIZES = [10_000, 100_000, 1_000_000]
+COLORS = ["red", "blue", "green", "yellow", "black"]
+RANKS = ["private", "corporal", "sergeant", "captain", "colonel"]
+
+
+def make_entry(i):
+    return Minifig.from_dict({
+        "name": f"Minifig {i}", "helmet": i % 2 == 0, "weapon": "blaster",
+        "rank": RANKS[i % len(RANKS)], "armor": "plastic", "has_jetpack": i % 3 == 0,
+    })
+
+
+@pytest.fixture(scope="module", params=SIZES)
+def store(request, tmp_path_factory):
+    size = request.param
+    path = tmp_path_factory.mktemp(f"store{size}") / "lego_db.json"
+    store = LegoStore.open(str(path))
+    store.storage.put_many(
+        (COLORS[i % len(COLORS)], str(uuid.uuid4()), make_entry(i)) for i in range(size)
+    )
+    store.save()
+    store.size = size
+    return store
+
+
+def test_add(benchmark, store):
+    counter = iter(range(store.size, store.size * 10))
+    benchmark(lambda: store.add("red", make_entry(next(counter)).to_dict()))
+
+
+def test_update(benchmark, store):
+    color = COLORS[0]
+    entry_id = next(iter(store.db[color]))
+    ranks = itertools.cycle(RANKS)
+    benchmark(lambda: store.update(entry_id, {"rank": next(ranks)}))
+
+
+def test_delete(benchmark, store):
+    color = COLORS[1]
+    ids = iter(list(store.db[color]))
+    benchmark.pedantic(lambda: store.delete(next(ids)), rounds=200)
+
+
+def test_name_exists(benchmark, store):
+    assert benchmark(store.name_exists, f"minifig {store.size // 2}")
+
+
+def test_search(benchmark, store):
+    benchmark(store.search, "minifig 12345")
+
+
+def test_counts(benchmark, store):
+    assert sum(benchmark(store.counts).values()) >= store.size - 200
+
+
+def test_find(benchmark, store):
+    entry_id = next(iter(store.db[COLORS[-1]]))
+    assert benchmark(store.find, entry_id) == COLORS[-1]
@@ -0,0 +1,44 @@
+"""Duplicate-check latency: linear scan (old name_exists) vs NameIndex.
+
+Run with ``python bench_name_index.py``.
+"""
+import timeit
+import uuid
+
+from lego_index import NameIndex
+
+COLORS = ["red", "blue", "green", "yellow", "black"]
+
+
+def make_db(size):
+    db = {color: {} for color in COLORS}
+    for i in range(size):
+        db[COLORS[i % len(COLORS)]][str(uuid.uuid4())] = {"name": f"Minifig {i}"}
+    return db
+
+
+def scan_name_exists(db, name):
+    for entries in db.values():
+        for data in entries.values():
+            if data.get("name", "").lower() == name.lower():
+                return True
+    return False
+
+
+def main():
+    for size in (10_000, 100_000, 1_000_000):
+        db = make_db(size)
+        index = NameIndex()
+        build = timeit.timeit(lambda: index.rebuild(db), number=1)
+        probe = "minifig does not exist"
+        scan_runs = 3 if size >= 1_000_000 else 10
+        scan = timeit.timeit(lambda: scan_name_exists(db, probe), number=scan_runs) / scan_runs
+        lookup = timeit.timeit(lambda: probe in index, number=100_000) / 100_000
+        print(
+            f"{size:>9,} entries: scan {scan * 1e3:9.3f} ms | "
+            f"index {lookup * 1e6:6.3f} us | rebuild {build * 1e3:8.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Memory per entry: plain dicts from json.loads vs Minifig records.
+
+Run with ``python bench_records.py [count]`` (default 200,000).
+"""
+import json
+import sys
+import tracemalloc
+import uuid
+
+from lego_record import bucket_from_json
+
+RANKS = ["private", "corporal", "sergeant", "captain", "colonel"]
+WEAPONS = ["blaster", "sword", "flame", "guitar", "none"]
+
+
+def make_json(count):
+    return json.dumps({
+        str(uuid.uuid4()): {
+            "name": f"Minifig {i}",
+            "helmet": i % 2 == 0,
+            "weapon": WEAPONS[i % len(WEAPONS)],
+            "rank": RANKS[i % len(RANKS)],
+            "armor": "plastic",
+            "has_jetpack": i % 3 == 0,
+        }
+        for i in range(count)
+    })
+
+
+def measure(build, text):
+    tracemalloc.start()
+    bucket = build(text)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return bucket, size
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    text = make_json(count)
+    _, dict_bytes = measure(json.loads, text)
+    _, slot_bytes = measure(lambda t: bucket_from_json(json.loads(t)), text)
+    print(f"{count:,} entries")
+    print(f"  dict    : {dict_bytes / count:6.0f} B/entry, {dict_bytes / 2**20:7.1f} MB")
+    print(f"  Minifig : {slot_bytes / count:6.0f} B/entry, {slot_bytes / 2**20:7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
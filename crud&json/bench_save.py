@@ -0,0 +1,86 @@
+"""GUI-thread latency per edit for the ways ``save_db`` has persisted edits.
+
+Run with ``python bench_save.py [entries] [edits]`` (defaults 100,000 and 500).
+Each edit is timed the way ``LegoApp.update_entry`` pays for it on the GUI
+thread:
+
+* ``rewrite``    the original ``json.dump`` of the whole db per edit
+* ``journal``    one fsynced journal line per edit
+* ``background`` ``PersistWorker``: the line is queued, the fsync happens on
+  the worker thread and bursts share it
+
+The background total includes the final ``flush`` so nothing is left unwritten.
+"""
+import json
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+from lego_storage import JournalStorage
+
+COLORS = ["red", "blue", "green", "yellow", "black"]
+
+
+def make_db(count):
+    return {
+        color: {
+            str(uuid.uuid4()): {
+                "name": f"Minifig {color} {i}", "helmet": i % 2 == 0, "weapon": "blaster",
+                "rank": "private", "armor": "plastic", "has_jetpack": False,
+            }
+            for i in range(count // len(COLORS))
+        }
+        for color in COLORS
+    }
+
+
+def run(mode, count, edits):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = f"{tmp}/lego_db.json"
+        with open(path, 'w') as f:
+            json.dump(make_db(count), f, indent=4)
+        storage = JournalStorage(path, compact_min=edits + 1, background=mode == "background")
+        db = storage.load()
+        if mode == "rewrite":
+            # Truncating the file under the lazy loader's mmap would SIGBUS.
+            with open(path) as f:
+                db = json.load(f)
+        ids = list(db["red"])[:edits]
+        timings = []
+        start = time.perf_counter()
+        for n, entry_id in enumerate(ids):
+            t = time.perf_counter()
+            entry = db["red"][entry_id]
+            entry["rank"] = f"rank {n}"
+            if mode == "rewrite":
+                with open(path, 'w') as f:
+                    json.dump(db, f, indent=4)
+            else:
+                storage.put("red", entry_id, entry)
+            timings.append(time.perf_counter() - t)
+        storage.flush()
+        total = time.perf_counter() - start
+        writes = storage.worker.writes if storage.worker else len(ids)
+        storage.close()
+    return timings, total, writes
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    edits = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    print(f"{count:,} entries, {edits:,} edits")
+    for mode in ("rewrite", "journal", "background"):
+        n = edits if mode != "rewrite" else min(edits, 20)
+        timings, total, writes = run(mode, count, n)
+        timings.sort()
+        p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+        print(
+            f"{mode:>10}: median {statistics.median(timings) * 1e3:8.3f} ms"
+            f"  p99 {p99 * 1e3:8.3f} ms  total {total:6.2f} s  disk writes {writes}"
+        )
+
+
+if __name__ == "__main__":
+    main()
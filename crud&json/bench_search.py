@@ -0,0 +1,79 @@
+"""Search latency: trigram index vs the old per-keystroke name scan.
+
+Run with ``python bench_search.py [count]`` (default 1,000,000).  Names are
+random syllable pairs so trigrams are spread the way real names spread them.
+The scan only looks at names; the index covers all four text fields and
+adds fuzzy matches when there are few substring hits.
+"""
+import random
+import sys
+import time
+
+from lego_filter import BitmapIndex
+from lego_record import Minifig
+from lego_trigram import TrigramIndex, ranked_search
+
+COLORS = ["red", "blue", "green", "yellow", "black"]
+SYLLABLES = [
+    "ka", "zor", "bel", "tri", "mun", "dax", "vel", "qui", "ron", "sha",
+    "gil", "pho", "nek", "ula", "ter", "wix", "bo", "lan", "cyr", "emi",
+]
+RANKS = ["private", "corporal", "sergeant", "captain", "colonel"]
+WEAPONS = ["blaster", "sword", "flame", "guitar", "none"]
+QUERIES = ["captain", "zorbel", "kazortri", "zorbell", "kazrotri", "gitar", "ka"]
+
+
+def filter_by_name(db, query):
+    """The per-keystroke name scan the trigram index replaced."""
+    result = {}
+    for color, entries in db.items():
+        matches = result[color] = {}
+        for uid, data in entries.items():
+            if query in data.get("name", "").lower():
+                matches[uid] = data
+    return result
+
+
+def make_name(rng):
+    first = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+    last = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+    return f"{first.title()} {last.title()}"
+
+
+def make_db(count):
+    rng = random.Random(3)
+    db = {color: {} for color in COLORS}
+    for i in range(count):
+        db[rng.choice(COLORS)][f"{i:032x}"] = Minifig.from_dict({
+            "name": make_name(rng), "helmet": False, "weapon": rng.choice(WEAPONS),
+            "rank": rng.choice(RANKS), "armor": "plastic", "has_jetpack": False,
+        })
+    return db
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    db = make_db(count)
+    names = TrigramIndex()
+    _, build = timed(lambda: names.rebuild(db))
+    bitmap = BitmapIndex()
+    _, bitmap_build = timed(lambda: bitmap.rebuild(db))
+    print(f"{count:,} entries, trigram build {build:.2f} s, bitmap build {bitmap_build:.2f} s")
+    for query in QUERIES:
+        hits, fast = timed(lambda: ranked_search(names, bitmap, query))
+        scanned, slow = timed(lambda: filter_by_name(db, query))
+        scan_hits = sum(len(entries) for entries in scanned.values())
+        print(
+            f"{query:>10}: index {len(hits):>7,} hits {fast * 1e3:9.2f} ms"
+            f"   name scan {scan_hits:>7,} hits {slow * 1e3:9.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Startup time and peak memory: json.load vs the lazy snapshot loader.
+
+Run with ``python bench_startup.py [size_mb]`` (default 500).  The test file
+is generated in a temp directory in the indented layout ``save_db`` writes,
+and each loader runs in a fresh interpreter so peak RSS is comparable.
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import uuid
+
+COLORS = ["red", "blue", "green", "yellow", "black"]
+
+EAGER = """
+import json
+with open(PATH) as f:
+    db = json.load(f)
+counts = {color: len(entries) for color, entries in db.items()}
+"""
+
+LAZY = """
+from lego_stream import load_lazy
+db = load_lazy(PATH)
+counts = {color: len(entries) for color, entries in db.items()}
+"""
+
+MEASURE = """
+import resource, time
+PATH = {path!r}
+start = time.perf_counter()
+{body}
+elapsed = time.perf_counter() - start
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def write_db(path, size_mb):
+    target = size_mb * 1024 * 1024
+    with open(path, 'w') as f:
+        f.write("{")
+        per_color = target // len(COLORS)
+        for n, color in enumerate(COLORS):
+            f.write(("," if n else "") + f'\n    "{color}": {{')
+            written = 0
+            first = True
+            while written < per_color:
+                entry = {
+                    "name": f"Minifig {uuid.uuid4().hex[:8]}",
+                    "helmet": written % 2 == 0,
+                    "weapon": "blaster",
+                    "rank": "private",
+                    "armor": "plastic",
+                    "has_jetpack": written % 3 == 0,
+                }
+                body = json.dumps(entry, indent=4).replace("\n", "\n        ")
+                chunk = ("" if first else ",") + f'\n        "{uuid.uuid4()}": {body}'
+                f.write(chunk)
+                written += len(chunk)
+                first = False
+            f.write("\n    }")
+        f.write("\n}")
+
+
+def measure(path, body):
+    code = MEASURE.format(path=path, body=body)
+    here = os.path.dirname(os.path.abspath(__file__))
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=here, check=True,
+        capture_output=True, text=True,
+    ).stdout.split()
+    return float(out[0]), int(out[1]) / 1024
+
+
+def main():
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "lego_db.json")
+        write_db(path, size_mb)
+        actual_mb = os.path.getsize(path) / 1024 / 1024
+        print(f"{actual_mb:.0f} MB snapshot")
+        # The first lazy run scans the file and leaves the .idx sidecar behind.
+        for label, body in (("lazy scan", LAZY), ("lazy .idx", LAZY), ("json.load", EAGER)):
+            elapsed, peak_mb = measure(path, body)
+            print(f"{label:>10}: {elapsed:7.2f} s to counts, peak RSS {peak_mb:7.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,32 @@
+import html
 import sys
-import uuid
-import json
-import os
 from PySide6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel,
     QLineEdit, QPushButton, QComboBox, QTextEdit, QMessageBox, QCheckBox
 )
+from PySide6.QtGui import QKeySequence
 from PySide6.QtCore import Qt
+from lego_binary import SnapshotError
+from lego_diff import DiffRenderer
+from lego_store import LegoStore
+from lego_view import StoreWatcher
 
 
 DB_FILE = "lego_db.json"
+COLORS = ["red", "blue", "green", "yellow", "black"]
 
 
 class LegoApp(QWidget):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("LEGO Men Manager")
-        self.db = self.load_db()
-        self.previous_db = json.loads(json.dumps(self.db))  # Deep copy
+        self.store = self.load_db()
+        self.last_changes = {}
+        self.diff_renderer = DiffRenderer()
         self.setup_ui()
+        # Another instance's edits arrive through the shared journal.
+        self.watcher = StoreWatcher(self.store, self)
+        self.watcher.synced.connect(lambda _: self.refresh_view())
 
     def setup_ui(self):
         main_layout = QVBoxLayout()
@@ -27,7 +35,7 @@ class LegoApp(QWidget):
 
         # Color selector
         self.color_box = QComboBox()
-        self.color_box.addItems(["red", "blue", "green", "yellow", "black"])
+        self.color_box.addItems(self.colors())
         control_layout.addWidget(QLabel("Color"))
         control_layout.addWidget(self.color_box)
 
@@ -77,6 +85,17 @@ class LegoApp(QWidget):
         self.delete_button.clicked.connect(self.delete_entry)
         control_layout.addWidget(self.delete_button)
 
+        history_layout = QHBoxLayout()
+        self.undo_button = QPushButton("Undo")
+        self.undo_button.setShortcut(QKeySequence.Undo)
+        self.undo_button.clicked.connect(self.undo_edit)
+        history_layout.addWidget(self.undo_button)
+        self.redo_button = QPushButton("Redo")
+        self.redo_button.setShortcut(QKeySequence.Redo)
+        self.redo_button.clicked.connect(self.redo_edit)
+        history_layout.addWidget(self.redo_button)
+        control_layout.addLayout(history_layout)
+
         control_layout.addStretch()
 
         # JSON display
@@ -112,23 +131,27 @@ class LegoApp(QWidget):
         self.refresh_view()
 
     def load_db(self):
-        if os.path.exists(DB_FILE):
-            with open(DB_FILE, 'r') as f:
-                try:
-                    return json.load(f)
-                except json.JSONDecodeError:
-                    QMessageBox.critical(self, "Error", "Failed to parse JSON file.")
-                    return {}
-        return {}
+        try:
+            return LegoStore.open(DB_FILE, background=True, binary=True)
+        except SnapshotError as e:
+            # Starting empty would overwrite the file on the next save.
+            QMessageBox.critical(self, "Error", f"Failed to read {DB_FILE}: {e}")
+            raise
 
     def save_db(self):
-        with open(DB_FILE, 'w') as f:
-            json.dump(self.db, f, indent=4)
+        self.store.save()
+
+    def closeEvent(self, event):
+        self.watcher.stop()
+        self.save_db()
+        self.store.close()
+        super().closeEvent(event)
 
     def refresh_view(self):
+        self.update_history_buttons()
+        self.last_changes = self.store.take_changes()
         formatted = self.format_json_diff()
         self.json_view.setHtml(formatted)
-        self.previous_db = json.loads(json.dumps(self.db))  # deep copy
         self.update_counts()
 
     def validate_form(self):
@@ -157,55 +180,49 @@ class LegoApp(QWidget):
 
     def add_entry(self):
         color = self.color_box.currentText()
-        entry_id = str(uuid.uuid4())
-        entry = self.get_entry_data()
-
-        self.db.setdefault(color, {})[entry_id] = entry
-        self.save_db()
+        entry_id = self.store.add(color, self.get_entry_data(), unique=False)
         self.refresh_view()
 
         QMessageBox.information(self, "Added", f"LEGO Man created with UUID:\n{entry_id}")
         self.clear_form()
 
     def update_entry(self):
-        color = self.color_box.currentText()
         entry_id = self.uuid_input.text().strip()
 
         if not entry_id:
             QMessageBox.warning(self, "Missing UUID", "Please enter a UUID to update.")
             return
 
-        if entry_id in self.db.get(color, {}):
-            existing = self.db[color][entry_id]
-            new_data = self.get_entry_data()
-
-            for key, value in new_data.items():
-                if isinstance(value, bool):
-                    existing[key] = value
-                elif isinstance(value, str) and value.strip() != "":
-                    existing[key] = value
-
-            self.save_db()
+        if self.store.update(entry_id, self.get_entry_data()):
             self.refresh_view()
             QMessageBox.information(self, "Updated", f"LEGO Man {entry_id} updated.")
         else:
-            QMessageBox.warning(self, "Update Failed", f"No entry with UUID {entry_id} in {color} section.")
+            QMessageBox.warning(self, "Update Failed", f"No entry with UUID {entry_id}.")
 
     def delete_entry(self):
-        color = self.color_box.currentText()
         entry_id = self.uuid_input.text().strip()
 
         if not entry_id:
             QMessageBox.warning(self, "Missing UUID", "Please enter a UUID to delete.")
             return
 
-        if entry_id in self.db.get(color, {}):
-            del self.db[color][entry_id]
-            self.save_db()
+        if self.store.delete(entry_id):
             self.refresh_view()
             QMessageBox.information(self, "Deleted", f"LEGO Man {entry_id} deleted.")
         else:
-            QMessageBox.warning(self, "Delete Failed", f"No entry with UUID {entry_id} in {color} section.")
+            QMessageBox.warning(self, "Delete Failed", f"No entry with UUID {entry_id}.")
+
+    def undo_edit(self):
+        if self.store.undo() is not None:
+            self.refresh_view()
+
+    def redo_edit(self):
+        if self.store.redo() is not None:
+            self.refresh_view()
+
+    def update_history_buttons(self):
+        self.undo_button.setEnabled(self.store.history.can_undo)
+        self.redo_button.setEnabled(self.store.history.can_redo)
 
     def clear_form(self):
         self.name_input.clear()
@@ -217,50 +234,18 @@ class LegoApp(QWidget):
         self.uuid_input.clear()
 
     def format_json_diff(self):
-        def html_escape(text):
-            return str(text).replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
-
-        output = ["<pre>"]
-        for color, entries in self.db.items():
-            output.append(f'"<span style="color:#888">{color}</span>": {{')
-            for uuid_key, fields in entries.items():
-                output.append(f'  "<span style="color:orange">{uuid_key}</span>": {{')
-
-                old_fields = self.previous_db.get(color, {}).get(uuid_key, {})
-
-                for k, v in fields.items():
-                    old_exists = k in old_fields
-                    old_v = old_fields.get(k, None)
-
-                    if isinstance(v, bool):
-                        v_str = "true" if v else "false"
-                    else:
-                        v_str = str(v)
-
-                    v_html = html_escape(v_str)
-
-                    if not old_exists:
-                        color_code = "green"
-                    elif old_v != v:
-                        color_code = "red"
-                    else:
-                        color_code = "green"
-
-                    output.append(
-                        f'    "<span style="color:#888">{k}</span>": '
-                        f'<span style="color:{color_code}">"{v_html}"</span>,'
-                    )
+        return self.diff_renderer.render(self.store.db, self.last_changes, self.store.changes)
 
-                output.append("  },")
-            output.append("},")
-        output.append("</pre>")
-        return "\n".join(output)
+    def colors(self):
+        """The five standard colors, then any other color found in the file."""
+        extra = [color for color in self.store.counts() if color not in COLORS]
+        return COLORS + extra
 
     def update_counts(self):
-        counts = {color: len(self.db.get(color, {})) for color in ["red", "blue", "green", "yellow", "black"]}
+        counts = self.store.counts()
         parts = [
-            f'<span style="color:{color}">{color}: {count}</span>'
-            for color, count in counts.items()
+            f'<span style="color:{html.escape(color)}">{html.escape(color)}: {counts.get(color, 0)}</span>'
+            for color in self.colors()
         ]
         self.status_label.setText(" | ".join(parts))
 
@@ -1,25 +1,38 @@
-import sys
-import uuid
-import json
+import html
 import os
+import sys
 from PySide6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel,
     QLineEdit, QPushButton, QComboBox, QTextEdit, QMessageBox,
-    QCheckBox, QSpacerItem, QSizePolicy
+    QCheckBox, QSpacerItem, QSizePolicy, QTabWidget, QTreeView
 )
-from PySide6.QtGui import QPalette, QColor
+from PySide6.QtGui import QPalette, QColor, QKeySequence
 from PySide6.QtCore import Qt
-
-DB_FILE = "lego_db.json"
+from lego_binary import SnapshotError
+from lego_diff import DiffRenderer
+from lego_filter import FilterError, parse_filter
+from lego_store import LegoStore
+from lego_view import LegoTreeModel, SearchController, StoreWatcher, SummaryLoader
+
+JSON_FILE = "lego_db.json"
+# Point at a .sqlite file or a .shards directory to use that backend instead;
+# either migrates JSON_FILE once.
+DB_FILE = os.environ.get("LEGO_DB_FILE", JSON_FILE)
+COLORS = ["red", "blue", "green", "yellow", "black"]
 
 class LegoApp(QWidget):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("LEGO Men Manager")
-        self.db = self.load_db()
-        self.previous_db = json.loads(json.dumps(self.db))
+        self.store = self.load_db()
+        self.last_changes = {}
+        self.diff_renderer = DiffRenderer()
+        self.view_data = {}
+        self.filters = None
         self.dark_mode = False
         self.setup_ui()
+        self.watcher = StoreWatcher(self.store, self)
+        self.watcher.synced.connect(self.apply_external_changes)
 
     def setup_ui(self):
         main_layout = QVBoxLayout()
@@ -27,11 +40,21 @@ class LegoApp(QWidget):
         # Top bar with search and theme toggle
         top_bar = QHBoxLayout()
         self.search_bar = QLineEdit()
-        self.search_bar.setPlaceholderText("Search by name...")
-        self.search_bar.textChanged.connect(self.refresh_view)
+        self.search_bar.setPlaceholderText("Search name, weapon, rank, armor...")
+        self.search = SearchController(self.search_db, self)
+        self.search.results_ready.connect(self.show_results)
+        self.summaries = SummaryLoader(self.store, self.search.pool, self)
+        self.summaries.ready.connect(self.summary_ready)
+        self.search_bar.textChanged.connect(self.search.schedule)
         top_bar.addWidget(QLabel("Search:"))
         top_bar.addWidget(self.search_bar)
 
+        self.filter_bar = QLineEdit()
+        self.filter_bar.setPlaceholderText("e.g. blue, helmet, jetpack, rank=captain")
+        self.filter_bar.textChanged.connect(self.set_filter)
+        top_bar.addWidget(QLabel("Filter:"))
+        top_bar.addWidget(self.filter_bar)
+
         self.theme_toggle = QPushButton("Toggle Dark Mode")
         self.theme_toggle.clicked.connect(self.toggle_theme)
         top_bar.addWidget(self.theme_toggle)
@@ -42,7 +65,7 @@ class LegoApp(QWidget):
         control_layout = QVBoxLayout()
 
         self.color_box = QComboBox()
-        self.color_box.addItems(["red", "blue", "green", "yellow", "black"])
+        self.color_box.addItems(self.colors())
         control_layout.addWidget(QLabel("Color"))
         control_layout.addWidget(self.color_box)
 
@@ -72,6 +95,10 @@ class LegoApp(QWidget):
         control_layout.addWidget(QLabel("UUID (for update/delete)"))
         control_layout.addWidget(self.uuid_input)
 
+        self.jump_button = QPushButton("Jump to UUID")
+        self.jump_button.clicked.connect(self.jump_to_entry)
+        control_layout.addWidget(self.jump_button)
+
         self.add_button = QPushButton("Create LEGO Man")
         self.add_button.clicked.connect(self.add_entry)
         control_layout.addWidget(self.add_button)
@@ -84,12 +111,33 @@ class LegoApp(QWidget):
         self.delete_button.clicked.connect(self.delete_entry)
         control_layout.addWidget(self.delete_button)
 
+        history_layout = QHBoxLayout()
+        self.undo_button = QPushButton("Undo")
+        self.undo_button.setShortcut(QKeySequence.Undo)
+        self.undo_button.clicked.connect(self.undo_edit)
+        history_layout.addWidget(self.undo_button)
+        self.redo_button = QPushButton("Redo")
+        self.redo_button.setShortcut(QKeySequence.Redo)
+        self.redo_button.clicked.connect(self.redo_edit)
+        history_layout.addWidget(self.redo_button)
+        control_layout.addLayout(history_layout)
+
         control_layout.addStretch()
         mid_layout.addLayout(control_layout, 1)
 
+        self.tree_model = LegoTreeModel(self)
+        self.tree_view = QTreeView()
+        self.tree_view.setModel(self.tree_model)
+        self.tree_view.setUniformRowHeights(True)
+
         self.json_view = QTextEdit()
         self.json_view.setReadOnly(True)
-        mid_layout.addWidget(self.json_view, 2)
+
+        self.view_tabs = QTabWidget()
+        self.view_tabs.addTab(self.tree_view, "Tree")
+        self.view_tabs.addTab(self.json_view, "JSON")
+        self.view_tabs.currentChanged.connect(lambda _: self.render_json_view())
+        mid_layout.addWidget(self.view_tabs, 2)
 
         main_layout.addLayout(mid_layout)
 
@@ -110,32 +158,75 @@ class LegoApp(QWidget):
         self.refresh_view()
 
     def load_db(self):
-        if os.path.exists(DB_FILE):
-            with open(DB_FILE, 'r') as f:
-                try:
-                    return json.load(f)
-                except json.JSONDecodeError:
-                    return {}
-        return {}
+        try:
+            return LegoStore.open(DB_FILE, JSON_FILE, background=True, binary=True)
+        except SnapshotError as e:
+            # Starting empty would overwrite the file on the next save.
+            QMessageBox.critical(self, "Error", f"Failed to read {DB_FILE}: {e}")
+            raise
 
     def save_db(self):
-        with open(DB_FILE, 'w') as f:
-            json.dump(self.db, f, indent=4)
+        self.store.save()
+
+    def closeEvent(self, event):
+        self.watcher.stop()
+        self.search.shutdown()
+        self.save_db()
+        self.store.close()
+        super().closeEvent(event)
+
+    def search_db(self, query, cancelled):
+        return self.store.search(query, cancelled, self.filters)
+
+    def set_filter(self, text):
+        try:
+            self.filters = parse_filter(text)
+        except FilterError as e:
+            self.filter_bar.setStyleSheet("color: red")
+            self.filter_bar.setToolTip(str(e))
+            return
+        self.filter_bar.setStyleSheet("")
+        self.filter_bar.setToolTip("")
+        self.search.schedule(self.search_bar.text())
 
     def refresh_view(self):
-        query = self.search_bar.text().strip().lower()
-        filtered = {
-            color: {
-                uid: data for uid, data in entries.items()
-                if query in data.get("name", "").lower()
-            } for color, entries in self.db.items()
-        } if query else self.db
-
-        formatted = self.format_json_diff(filtered)
-        self.json_view.setHtml(formatted)
-        self.previous_db = json.loads(json.dumps(self.db))
+        self.update_history_buttons()
+        self.search.run_now(self.search_bar.text())
+
+    def show_results(self, filtered):
+        self.last_changes = self.store.take_changes()
+        self.view_data = filtered
+        self.refresh_tree_view()
+        self.render_json_view()
+        self.update_counts()
+
+    def apply_external_changes(self, delta):
+        # Another instance edited the shared db.  With everything on screen
+        # only the affected rows are redrawn; search results are redone.
+        if self.view_data is not self.store.db:
+            self.refresh_view()
+            return
+        self.last_changes = self.store.take_changes()
+        self.tree_model.update_entries(delta, self.last_changes)
+        self.render_json_view()
         self.update_counts()
 
+    def refresh_tree_view(self):
+        expanded = [
+            color for row, color in enumerate(self.tree_model.colors())
+            if self.tree_view.isExpanded(self.tree_model.index(row, 0))
+        ]
+        self.tree_model.set_db(self.view_data, self.last_changes)
+        for color in expanded:
+            row = self.tree_model.color_row(color)
+            if row >= 0:
+                self.tree_view.expand(self.tree_model.index(row, 0))
+
+    def render_json_view(self):
+        # The rich-text view lays out every entry, so only build it when shown.
+        if self.view_tabs.currentWidget() is self.json_view:
+            self.json_view.setHtml(self.format_json_diff(self.view_data))
+
     def validate_form(self):
         uuid_present = bool(self.uuid_input.text().strip())
         other_filled = any([
@@ -149,6 +240,7 @@ class LegoApp(QWidget):
         self.add_button.setEnabled(not uuid_present and other_filled)
         self.update_button.setEnabled(uuid_present)
         self.delete_button.setEnabled(uuid_present)
+        self.jump_button.setEnabled(uuid_present)
 
     def get_entry_data(self):
         return {
@@ -160,56 +252,64 @@ class LegoApp(QWidget):
             "has_jetpack": self.jetpack_check.isChecked()
         }
 
-    def name_exists(self, name):
-        for entries in self.db.values():
-            for data in entries.values():
-                if data.get("name", "").lower() == name.lower():
-                    return True
-        return False
-
     def add_entry(self):
-        name = self.name_input.text().strip()
-        if self.name_exists(name):
-            QMessageBox.warning(self, "Duplicate Name", f"A LEGO man named '{name}' already exists.")
-            return
-
         color = self.color_box.currentText()
-        entry_id = str(uuid.uuid4())
-        entry = self.get_entry_data()
-
-        self.db.setdefault(color, {})[entry_id] = entry
-        self.save_db()
+        try:
+            entry_id = self.store.add(color, self.get_entry_data())
+        except ValueError as e:
+            QMessageBox.warning(self, "Duplicate Name", str(e))
+            return
         self.refresh_view()
         QMessageBox.information(self, "Added", f"LEGO Man created with UUID:\n{entry_id}")
         self.clear_form()
 
     def update_entry(self):
-        color = self.color_box.currentText()
         entry_id = self.uuid_input.text().strip()
         if not entry_id:
             return
 
-        if entry_id in self.db.get(color, {}):
-            entry = self.db[color][entry_id]
-            new_data = self.get_entry_data()
-            for key, value in new_data.items():
-                if isinstance(value, bool):
-                    entry[key] = value
-                elif value.strip():
-                    entry[key] = value
-            self.save_db()
+        if self.store.update(entry_id, self.get_entry_data()):
             self.refresh_view()
             QMessageBox.information(self, "Updated", f"LEGO Man {entry_id} updated.")
 
     def delete_entry(self):
-        color = self.color_box.currentText()
         entry_id = self.uuid_input.text().strip()
-        if entry_id in self.db.get(color, {}):
-            del self.db[color][entry_id]
-            self.save_db()
+        if self.store.delete(entry_id):
             self.refresh_view()
             QMessageBox.information(self, "Deleted", f"LEGO Man {entry_id} deleted.")
 
+    def jump_to_entry(self):
+        entry_id = self.uuid_input.text().strip()
+        color = self.store.find(entry_id)
+        if color is None:
+            QMessageBox.warning(self, "Not Found", f"No entry with UUID {entry_id}.")
+            return
+
+        self.color_box.setCurrentText(color)
+        index = self.tree_model.entry_index(color, entry_id)
+        if not index.isValid() and (self.search_bar.text() or self.filters):
+            # The search or the filter is hiding it.
+            self.search_bar.clear()
+            self.filter_bar.clear()  # resets self.filters through set_filter
+            self.refresh_view()
+            index = self.tree_model.entry_index(color, entry_id)
+        self.view_tabs.setCurrentWidget(self.tree_view)
+        self.tree_view.expand(index.parent())
+        self.tree_view.setCurrentIndex(index)
+        self.tree_view.scrollTo(index)
+
+    def undo_edit(self):
+        if self.store.undo() is not None:
+            self.refresh_view()
+
+    def redo_edit(self):
+        if self.store.redo() is not None:
+            self.refresh_view()
+
+    def update_history_buttons(self):
+        self.undo_button.setEnabled(self.store.history.can_undo)
+        self.redo_button.setEnabled(self.store.history.can_redo)
+
     def clear_form(self):
         self.name_input.clear()
         self.weapon_input.clear()
@@ -220,30 +320,43 @@ class LegoApp(QWidget):
         self.uuid_input.clear()
 
     def format_json_diff(self, display_data):
-        def escape(s):
-            return str(s).replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
-
-        html = ["<pre>"]
-        for color, entries in display_data.items():
-            html.append(f'"<span style=\"color:#888\">{color}</span>": {{')
-            for uid, data in entries.items():
-                html.append(f'  "<span style=\"color:orange\">{uid}</span>": {{')
-                for k, v in data.items():
-                    old = self.previous_db.get(color, {}).get(uid, {}).get(k, None)
-                    changed = old != v
-                    color_code = "red" if changed else "green"
-                    val = "true" if v is True else "false" if v is False else escape(v)
-                    html.append(f'    "<span style=\"color:#888\">{k}</span>": <span style=\"color:{color_code}\">"{val}"</span>,')
-                html.append("  },")
-            html.append("},")
-        html.append("</pre>")
-        return "\n".join(html)
+        return self.diff_renderer.render(
+            display_data, self.last_changes, self.store.changes,
+            complete=display_data is self.store.db,
+        )
+
+    def colors(self):
+        """The five standard colors, then any other color found in the file."""
+        extra = [color for color in self.store.counts() if color not in COLORS]
+        return COLORS + extra
 
     def update_counts(self):
-        counts = {color: len(self.db.get(color, {})) for color in ["red", "blue", "green", "yellow", "black"]}
-        parts = [f'<span style="color:{c}">{c}: {n}</span>' for c, n in counts.items()]
+        counts = self.store.counts()
+        parts = [
+            f'<span style="color:{html.escape(c)}">{html.escape(c)}: {counts.get(c, 0)}</span>'
+            for c in self.colors()
+        ]
+        color = self.color_box.currentText()
+        stats = self.store.summary(color, compute=False)
+        if stats is None:
+            # The counts show now, the rest once the worker has tallied it.
+            self.summaries.request(color)
+            parts.append(f"{html.escape(color)}: …")
+            self.status_label.setText(" | ".join(parts))
+            return
+        ranks = ", ".join(
+            f"{html.escape(rank)} {n}" for rank, n in list(stats["ranks"].items())[:5]
+        )
+        parts.append(
+            f'{html.escape(color)}: helmets {stats["helmet_ratio"]:.0%}, '
+            f'jetpacks {stats["jetpacks"]}' + (f"; {ranks}" if ranks else "")
+        )
         self.status_label.setText(" | ".join(parts))
 
+    def summary_ready(self, color):
+        if color == self.color_box.currentText():
+            self.update_counts()
+
     def toggle_theme(self):
         palette = QPalette()
         if not self.dark_mode:
@@ -0,0 +1,243 @@
+"""Binary snapshot format: ``lego_db.bin``.
+
+Layout, little-endian throughout::
+
+    header   magic "LEGOSNAP", u16 version, u16 reserved, u32 buckets, u64 body length
+    body     one block per color:
+             u32 block length, u32 crc32 of the block, then the block itself
+
+A block stores a color's entries column by column, so decoding slices a few
+large strings instead of parsing every entry::
+
+    u16 color length, u32 entries, u32 table size, color (utf-8)
+    table    the distinct weapon/rank/armor values, as a string column
+    uuids    string column
+    names    string column
+    weapon, rank, armor
+             u32 per entry: 0 when missing, else 1 + index into the table
+    helmet, has_jetpack
+             one byte per entry: 0 missing, 1 false, 2 true
+    extras   string column of JSON objects ("" when none): unknown keys, and
+             known fields whose value does not fit their column
+
+A string column is a u32 byte length, a u32 character length per string
+(0xFFFFFFFF when missing), then all the strings as one utf-8 blob.
+
+``load_binary`` maps the file and reads only the block headers; each
+bucket decodes (and verifies its checksum) the first time it is touched.
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from itertools import accumulate
+from operator import attrgetter
+
+from lego_record import FIELDS, KNOWN, MISSING, Minifig, jsonable
+from lego_stream import LazyDB
+
+MAGIC = b"LEGOSNAP"
+VERSION = 1
+HEADER = struct.Struct("<8sHHIQ")
+BLOCK = struct.Struct("<II")
+COUNTS = struct.Struct("<HII")
+U32 = struct.Struct("<I")
+ABSENT = 0xFFFFFFFF
+VALUE_FIELDS = ("weapon", "rank", "armor")
+BOOL_FIELDS = ("helmet", "has_jetpack")
+BOOL_CODES = {MISSING: 0, False: 1, True: 2}
+BOOLS = (MISSING, False, True)
+COLUMN_TYPES = {"name": str, "weapon": str, "rank": str, "armor": str, "helmet": bool, "has_jetpack": bool}
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+def write_binary(path, db):
+    """Write ``db`` to ``path`` atomically: temp file, fsync, rename."""
+    tmp_path = path + ".tmp"
+    blocks = 0
+    body = 0
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, 0, 0))
+        for color, entries in db.items():
+            block = encode_bucket(color, entries)
+            f.write(BLOCK.pack(len(block), zlib.crc32(block)))
+            f.write(block)
+            blocks += 1
+            body += BLOCK.size + len(block)
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, 0, blocks, body))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_binary(path):
+    """Map a binary snapshot; buckets decode on first use."""
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < HEADER.size:
+            raise SnapshotError(f"{path}: truncated header")
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, _, count, body = HEADER.unpack_from(mm, 0)
+    if magic != MAGIC:
+        raise SnapshotError(f"{path}: not a LEGO snapshot")
+    if version != VERSION:
+        raise SnapshotError(f"{path}: unsupported version {version}")
+    if HEADER.size + body != size:
+        raise SnapshotError(f"{path}: expected {HEADER.size + body} bytes, found {size}")
+    buckets = []
+    pos = HEADER.size
+    for _ in range(count):
+        length, _ = BLOCK.unpack_from(mm, pos)
+        start = pos + BLOCK.size
+        color_len, entries, _ = COUNTS.unpack_from(mm, start)
+        color_start = start + COUNTS.size
+        color = bytes(mm[color_start:color_start + color_len]).decode()
+        buckets.append((color, pos, start + length, entries))
+        pos = start + length
+    if pos != size:
+        raise SnapshotError(f"{path}: block lengths do not add up")
+    return LazyDB(mm, buckets, parse=decode_block)
+
+
+def encode_bucket(color, entries):
+    items = list(entries.items())
+    ids = [entry_id for entry_id, _ in items]
+    values = [entry for _, entry in items]
+    extras = [_extra(entry) for entry in values]
+    columns = {}
+    for field in FIELDS:
+        column = _column(values, field)
+        kind = COLUMN_TYPES[field]
+        if not set(map(type, column)) <= {kind, type(MISSING)}:
+            for n, value in enumerate(column):
+                if value is not MISSING and type(value) is not kind:
+                    extras[n] = dict(extras[n] or {}, **{field: value})
+                    column[n] = MISSING
+        columns[field] = column
+
+    table = sorted({value for field in VALUE_FIELDS for value in columns[field]} - {MISSING})
+    codes = {value: n for n, value in enumerate(table, 1)}
+    codes[MISSING] = 0
+    color_bytes = color.encode()
+    parts = [COUNTS.pack(len(color_bytes), len(ids), len(table)), color_bytes]
+    parts += _strings(table)
+    parts += _strings(ids)
+    parts += _strings(columns["name"])
+    for field in VALUE_FIELDS:
+        parts.append(_u32s(map(codes.__getitem__, columns[field])))
+    for field in BOOL_FIELDS:
+        parts.append(bytes(map(BOOL_CODES.__getitem__, columns[field])))
+    parts += _strings([
+        json.dumps(extra, default=jsonable) if extra else "" for extra in extras
+    ])
+    return b"".join(parts)
+
+
+def decode_block(mm, start, end):
+    """``{uuid: Minifig}`` from the block at ``mm[start:end]``."""
+    _, crc = BLOCK.unpack_from(mm, start)
+    block = memoryview(mm)[start + BLOCK.size:end]
+    try:
+        if zlib.crc32(block) != crc:
+            raise SnapshotError("snapshot block checksum mismatch")
+        color_len, n, table_size = COUNTS.unpack_from(block, 0)
+        pos = COUNTS.size + color_len
+        table, pos = _read_strings(block, pos, table_size)
+        table = [MISSING] + [sys.intern(value) for value in table]
+        ids, pos = _read_strings(block, pos, n)
+        names, pos = _read_strings(block, pos, n)
+        fields = {"name": names}
+        for field in VALUE_FIELDS:
+            codes, pos = _read_u32s(block, pos, n)
+            fields[field] = list(map(table.__getitem__, codes))
+        for field in BOOL_FIELDS:
+            fields[field] = list(map(BOOLS.__getitem__, block[pos:pos + n]))
+            pos += n
+        extras, pos = _read_strings(block, pos, n)
+    finally:
+        block.release()
+
+    new = Minifig.__new__
+    entries = {}
+    for entry_id, name, helmet, weapon, rank, armor, jetpack in zip(
+        ids, names, fields["helmet"], fields["weapon"], fields["rank"],
+        fields["armor"], fields["has_jetpack"],
+    ):
+        fig = new(Minifig)
+        fig.name = name
+        fig.helmet = helmet
+        fig.weapon = weapon
+        fig.rank = rank
+        fig.armor = armor
+        fig.has_jetpack = jetpack
+        fig.extra = None
+        entries[entry_id] = fig
+    if any(extras):
+        for entry_id, extra in zip(ids, extras):
+            if extra:
+                fig = entries[entry_id]
+                for key, value in json.loads(extra).items():
+                    fig[key] = value
+    return entries
+
+
+def _column(values, field):
+    try:
+        return list(map(attrgetter(field), values))  # Minifig slots
+    except AttributeError:
+        return [entry.get(field, MISSING) for entry in values]
+
+
+def _extra(entry):
+    if isinstance(entry, Minifig):
+        return dict(entry.extra) if entry.extra else None
+    extra = {key: value for key, value in entry.items() if key not in KNOWN}
+    return extra or None
+
+
+def _strings(values):
+    if MISSING in values:
+        lengths = [ABSENT if value is MISSING else len(value) for value in values]
+        values = [value for value in values if value is not MISSING]
+    else:
+        lengths = map(len, values)
+    blob = "".join(values).encode()
+    return [U32.pack(len(blob)), _u32s(lengths), blob]
+
+
+def _read_strings(block, pos, n):
+    (size,) = U32.unpack_from(block, pos)
+    lengths, pos = _read_u32s(block, pos + U32.size, n)
+    text = str(block[pos:pos + size], "utf-8")
+    if ABSENT in lengths:
+        ends = list(accumulate(0 if length == ABSENT else length for length in lengths))
+        strings = [
+            MISSING if length == ABSENT else text[end - length:end]
+            for length, end in zip(lengths, ends)
+        ]
+    else:
+        ends = list(accumulate(lengths))
+        strings = list(map(text.__getitem__, map(slice, [0] + ends[:-1], ends)))
+    return strings, pos + size
+
+
+def _u32s(values):
+    data = array('I', values)
+    if sys.byteorder == "big":
+        data.byteswap()
+    return data.tobytes()
+
+
+def _read_u32s(block, pos, n):
+    data = array('I')
+    data.frombytes(block[pos:pos + 4 * n])
+    if sys.byteorder == "big":
+        data.byteswap()
+    return data, pos + 4 * n
@@ -0,0 +1,44 @@
+from itertools import count
+
+
+class ChangeTracker:
+    """Records which entry fields the CRUD methods touched since the last refresh.
+
+    ``versions`` holds a per-entry stamp taken from a counter that every change
+    bumps, so a stamp is never reused, even for an entry that was deleted and
+    put back; ``color_versions`` does the same per color, deletions included.
+    The dirty map collects the changed keys until ``take`` hands them to the
+    renderer, so nothing ever has to snapshot the whole database to work out a
+    diff.
+    """
+
+    def __init__(self):
+        self.versions = {}
+        self.color_versions = {}
+        self._clock = count(1)
+        self._dirty = {}
+
+    def touch(self, color, entry_id, keys):
+        keys = set(keys)
+        if not keys:
+            return
+        stamp = next(self._clock)
+        self.versions[entry_id] = stamp
+        self.color_versions[color] = stamp
+        self._dirty.setdefault((color, entry_id), set()).update(keys)
+
+    def forget(self, color, entry_id):
+        self.versions.pop(entry_id, None)
+        self.color_versions[color] = next(self._clock)
+        self._dirty.pop((color, entry_id), None)
+
+    def version(self, entry_id):
+        return self.versions.get(entry_id, 0)
+
+    def color_version(self, color):
+        return self.color_versions.get(color, 0)
+
+    def take(self):
+        dirty = self._dirty
+        self._dirty = {}
+        return dirty
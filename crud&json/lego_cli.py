@@ -0,0 +1,220 @@
+"""Headless bulk import/export for the LEGO database.
+
+    python lego_cli.py import minifigs.jsonl
+    python lego_cli.py import minifigs.csv --db lego.sqlite
+    python lego_cli.py export - --format csv > minifigs.csv
+    python lego_cli.py export lego_db.json
+
+Exporting to ``.json`` writes the indented ``lego_db.json`` layout, the
+export format of a database whose snapshot is the binary ``lego_db.bin``.
+
+Records are flat: ``color``, optional ``uuid``, and the entry fields.  Imports
+are validated and deduplicated by name the same way ``LegoStore.name_exists``
+does, then written as one batch with a single fsync.  Exports stream one
+record at a time.  Throughput goes to stderr.
+"""
+import argparse
+import csv
+import json
+import sys
+import time
+import uuid
+
+from lego_index import NameIndex
+from lego_record import FIELDS, Minifig, jsonable
+from lego_storage import open_storage, write_json_atomic
+from lego_stream import dump_snapshot
+
+DB_FILE = "lego_db.json"
+COLUMNS = ["color", "uuid", *FIELDS]
+BOOL_FIELDS = {"helmet", "has_jetpack"}
+TRUE = {"true", "1", "yes", "y"}
+FALSE = {"false", "0", "no", "n", ""}
+
+
+class RecordError(ValueError):
+    pass
+
+
+def parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in TRUE:
+        return True
+    if text in FALSE:
+        return False
+    raise RecordError(f"not a boolean: {value!r}")
+
+
+def validate(record):
+    """Turn one input record into ``(color, uuid, Minifig)`` or raise RecordError."""
+    if isinstance(record, RecordError):
+        raise record
+    if not isinstance(record, dict):
+        raise RecordError("not an object")
+    color = str(record.get("color") or "").strip()
+    if not color:
+        raise RecordError("missing color")
+    name = str(record.get("name") or "").strip()
+    if not name:
+        raise RecordError("missing name")
+    entry_id = str(record.get("uuid") or "").strip()
+    if entry_id:
+        try:
+            entry_id = str(uuid.UUID(entry_id))
+        except ValueError:
+            raise RecordError(f"invalid uuid: {entry_id!r}")
+    else:
+        entry_id = str(uuid.uuid4())
+    entry = {"name": name}
+    for field in FIELDS[1:]:
+        value = record.get(field)
+        if field in BOOL_FIELDS:
+            entry[field] = parse_bool(value if value is not None else False)
+        else:
+            entry[field] = "" if value is None else str(value)
+    return color, entry_id, Minifig.from_dict(entry)
+
+
+def read_records(stream, fmt):
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                yield RecordError(f"invalid JSON: {e}")
+
+
+def detect_format(path, fmt):
+    if fmt:
+        return fmt
+    if path.endswith(".csv"):
+        return "csv"
+    return "json" if path.endswith(".json") else "jsonl"
+
+
+def open_input(path):
+    return sys.stdin if path == "-" else open(path, 'r', newline='')
+
+
+def open_output(path):
+    return sys.stdout if path == "-" else open(path, 'w', newline='')
+
+
+def import_records(storage, db, records, errors=None):
+    """Validate and dedupe ``records``; write the survivors in one batch.
+
+    Returns ``(imported, rejected)``.
+    """
+    errors = errors or sys.stderr
+    if storage.indexed:
+        taken = storage.name_exists
+
+        def known_id(entry_id):
+            return storage.find(entry_id) is not None
+    else:
+        names = NameIndex()
+        names.rebuild(db)
+        taken = names.__contains__
+        known_id = {entry_id for entries in db.values() for entry_id in entries}.__contains__
+
+    batch = []
+    seen_names = set()
+    seen_ids = set()
+    rejected = 0
+    for line_num, record in enumerate(records, start=1):
+        try:
+            color, entry_id, entry = validate(record)
+            key = NameIndex.key(entry["name"])
+            if key in seen_names or taken(entry["name"]):
+                raise RecordError(f"duplicate name: {entry['name']!r}")
+            if entry_id in seen_ids or known_id(entry_id):
+                raise RecordError(f"duplicate uuid: {entry_id}")
+        except RecordError as e:
+            rejected += 1
+            print(f"record {line_num}: {e}", file=errors)
+            continue
+        seen_names.add(key)
+        seen_ids.add(entry_id)
+        batch.append((color, entry_id, entry))
+
+    imported = storage.put_many(batch) if batch else 0
+    storage.maybe_compact(db)
+    return imported, rejected
+
+
+def export_records(db, stream, fmt):
+    if fmt == "json":
+        dump_snapshot(db, stream)
+        return sum(len(entries) for entries in db.values())
+    if fmt == "csv":
+        writer = csv.DictWriter(stream, fieldnames=COLUMNS, extrasaction="ignore")
+        writer.writeheader()
+    count = 0
+    for color, entries in db.items():
+        for entry_id, entry in entries.items():
+            row = {"color": color, "uuid": entry_id, **jsonable(entry)}
+            if fmt == "csv":
+                writer.writerow(row)
+            else:
+                stream.write(json.dumps(row) + "\n")
+            count += 1
+    return count
+
+
+def report(verb, count, elapsed, extra=""):
+    rate = count / elapsed if elapsed > 0 else float("inf")
+    print(
+        f"{verb} {count:,} records{extra} in {elapsed:.2f} s ({rate:,.0f} records/s)",
+        file=sys.stderr,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import/export for the LEGO database.")
+    parser.add_argument("--db", default=DB_FILE, help="lego_db.json or a .sqlite file")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, formats in (("import", ["jsonl", "csv"]), ("export", ["jsonl", "csv", "json"])):
+        cmd = sub.add_parser(name)
+        cmd.add_argument("path", help="file to read/write, or - for stdin/stdout")
+        cmd.add_argument("--format", choices=formats)
+    args = parser.parse_args(argv)
+
+    storage = open_storage(args.db)
+    db = storage.load()
+    fmt = detect_format(args.path, args.format)
+    if args.command == "import" and fmt == "json":
+        parser.error("import reads jsonl or csv records")
+    start = time.perf_counter()
+
+    if args.command == "import":
+        stream = open_input(args.path)
+        try:
+            imported, rejected = import_records(storage, db, read_records(stream, fmt))
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        report("imported", imported, time.perf_counter() - start, f" ({rejected:,} rejected)")
+        return 1 if rejected else 0
+
+    if fmt == "json" and args.path != "-":
+        # Written aside and renamed in: the db may be mapped from this very file.
+        write_json_atomic(args.path, db)
+        report("exported", sum(len(entries) for entries in db.values()), time.perf_counter() - start)
+        return 0
+    stream = open_output(args.path)
+    try:
+        count = export_records(db, stream, fmt)
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+    report("exported", count, time.perf_counter() - start)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
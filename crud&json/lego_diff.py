@@ -0,0 +1,78 @@
+"""Incremental HTML for the apps' JSON diff view."""
+
+
+def escape(text):
+    return str(text).replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+class DiffRenderer:
+    """Renders ``{color: {uuid: entry}}`` as highlighted JSON, reusing HTML.
+
+    Each entry's fragment is cached under its ``ChangeTracker`` version and
+    the keys highlighted in it, and each color's stitched block under the
+    color's version, its size, the entries dict it came from and its
+    highlights.  A refresh after one edit therefore renders one entry and
+    joins one block; every other color is a cache hit.  Changes have to go
+    through the tracker for this to hold, as every ``LegoStore`` mutation
+    does.
+    """
+
+    def __init__(self):
+        self._fragments = {}
+        self._blocks = {}
+
+    def render(self, db, changes, tracker, complete=True):
+        """HTML for ``db``; ``changes`` is ``{(color, uuid): keys}`` to show in red.
+
+        ``complete`` says ``db`` is the whole database rather than, say,
+        search results, so cached fragments of entries missing from it can go.
+        """
+        highlighted = {}
+        for (color, entry_id), keys in changes.items():
+            highlighted.setdefault(color, {})[entry_id] = frozenset(keys)
+        output = ["<pre>"]
+        blocks = {}
+        for color, entries in db.items():
+            marks = highlighted.get(color, {})
+            key = (tracker.color_version(color), len(entries), frozenset(marks.items()))
+            cached = self._blocks.get(color)
+            if cached is None or cached[0] is not entries or cached[1] != key:
+                html = self._render_color(color, entries, marks, tracker, complete)
+                cached = (entries, key, html)
+            blocks[color] = cached
+            output.append(cached[2])
+        output.append("</pre>")
+        self._blocks = blocks
+        if complete:
+            for color in [color for color in self._fragments if color not in db]:
+                del self._fragments[color]
+        return "\n".join(output)
+
+    def _render_color(self, color, entries, marks, tracker, complete):
+        fragments = self._fragments.setdefault(color, {})
+        output = [f'"<span style="color:#888">{color}</span>": {{']
+        for entry_id, fields in entries.items():
+            changed = marks.get(entry_id, frozenset())
+            key = (tracker.version(entry_id), changed)
+            cached = fragments.get(entry_id)
+            if cached is None or cached[0] != key:
+                cached = fragments[entry_id] = (key, render_entry(entry_id, fields, changed))
+            output.append(cached[1])
+        output.append("},")
+        if complete and len(fragments) > len(entries):
+            for entry_id in [entry_id for entry_id in fragments if entry_id not in entries]:
+                del fragments[entry_id]
+        return "\n".join(output)
+
+
+def render_entry(entry_id, fields, changed):
+    output = [f'  "<span style="color:orange">{entry_id}</span>": {{']
+    for k, v in fields.items():
+        color_code = "red" if k in changed else "green"
+        val = "true" if v is True else "false" if v is False else escape(v)
+        output.append(
+            f'    "<span style="color:#888">{k}</span>": '
+            f'<span style="color:{color_code}">"{val}"</span>,'
+        )
+    output.append("  },")
+    return "\n".join(output)
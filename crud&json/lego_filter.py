@@ -0,0 +1,309 @@
+"""Attribute filters such as ``blue, helmet, jetpack, rank=captain``.
+
+Terms separated by commas must all hold; alternatives inside a term are
+separated by ``|`` and reuse the field named before them
+(``rank=captain|major``).  A term is ``field=value``
+for color, rank, armor, weapon, helmet or jetpack, or a bare word:
+``helmet`` and ``jetpack`` mean the flag is set, anything else is a color.
+``!`` in front of a term negates it.  Text values compare case-insensitively.
+"""
+import threading
+from itertools import repeat
+from operator import attrgetter, itemgetter
+
+from lego_record import MISSING
+
+FIELDS = {
+    "color": "color", "rank": "rank", "armor": "armor", "weapon": "weapon",
+    "helmet": "helmet", "jetpack": "has_jetpack", "has_jetpack": "has_jetpack",
+}
+BOOL_FIELDS = frozenset(("helmet", "has_jetpack"))
+FLAGS = {"helmet": "helmet", "jetpack": "has_jetpack"}
+TRUE = {"true", "yes", "y", "1"}
+FALSE = {"false", "no", "n", "0"}
+INDEXED = ("rank", "armor", "weapon", "helmet", "has_jetpack")
+
+
+class FilterError(ValueError):
+    pass
+
+
+def parse_filter(text):
+    """Parse ``text`` into clauses: a list of AND-ed lists of OR-ed tests.
+
+    Each test is ``(field, value, negated)``.
+    """
+    clauses = []
+    for term in text.split(","):
+        if not term.strip():
+            continue
+        clause = []
+        field = None
+        for alt in term.split("|"):
+            test = _parse_test(alt, field)
+            if "=" in alt:
+                field = test[0]
+            clause.append(test)
+        clauses.append(clause)
+    return clauses
+
+
+def _parse_test(text, field=None):
+    text = text.strip()
+    negated = text.startswith("!")
+    if negated:
+        text = text[1:].strip()
+    if not text:
+        raise FilterError("empty filter term")
+    if "=" in text or field is not None:
+        if "=" in text:
+            name, _, value = text.partition("=")
+            field = FIELDS.get(name.strip().lower())
+            if field is None:
+                raise FilterError(f"unknown field: {name.strip()!r}")
+        else:
+            value = text
+        value = value.strip()
+        if field in BOOL_FIELDS:
+            if value.lower() in TRUE:
+                value = True
+            elif value.lower() in FALSE:
+                value = False
+            else:
+                raise FilterError(f"not a boolean: {value!r}")
+    elif text.lower() in FLAGS:
+        field, value = FLAGS[text.lower()], True
+    else:
+        field, value = "color", text
+    return field, _key(value), negated
+
+
+def _key(value):
+    return value.casefold() if isinstance(value, str) else value
+
+
+def matches(color, entry, clauses):
+    """Evaluate ``clauses`` against one entry; the linear-scan reference."""
+    for clause in clauses:
+        for field, value, negated in clause:
+            actual = color if field == "color" else entry.get(field)
+            if (_key(actual) == value) != negated:
+                break
+        else:
+            return False
+    return True
+
+
+class BitmapIndex:
+    """One bitset per color and per distinct rank/armor/weapon/flag value.
+
+    Every entry gets a slot number; bit ``slot`` is set in the bitset of each
+    value the entry has.  Python ints serve as bitsets, so a filter resolves
+    with ``&``/``|``/``~`` over whole sets without touching the entries, and
+    only the matching slots are mapped back to ``(color, uuid)``.  Slots of
+    deleted entries are reused.  ``bind`` defers the build to the first query,
+    which may run on a worker thread; as in ``TrigramIndex``, ``add`` and
+    ``discard`` calls made during the build are queued and replayed.
+    """
+
+    def __init__(self):
+        self._bits = {}
+        self._all = 0
+        self._slots = []
+        self._slot_of = {}
+        self._free = []
+        self._pending = None
+        self._queued = None  # changes made during a rebuild
+        self._lock = threading.Lock()
+        self._building = threading.Lock()
+
+    def bind(self, db):
+        with self._lock:
+            self._pending = db
+
+    def _ensure(self):
+        if self._pending is None and self._queued is None:
+            return
+        with self._building:
+            if self._pending is not None:
+                self.rebuild(self._pending)
+
+    def rebuild(self, db):
+        # Each bucket fills a contiguous run of slots, and each field is
+        # indexed a column at a time so the per-entry work stays in C.
+        with self._lock:
+            self._pending = None
+            self._queued = []
+        slots = []
+        slot_of = {}
+        bits = {}
+        for color, entries in list(db.items()):
+            # One snapshot of the bucket, which the GUI thread may be changing.
+            items = list(entries.items())
+            if not items:
+                continue
+            ids = list(map(itemgetter(0), items))
+            values = list(map(itemgetter(1), items))
+            base = len(slots)
+            slots.extend(zip(repeat(color), ids))
+            slot_of.update(zip(ids, range(base, base + len(ids))))
+            _merge(bits, ("color", _key(color)), ((1 << len(ids)) - 1) << base)
+            for field in INDEXED:
+                for value, value_bits in _column_bits(values, field):
+                    _merge(bits, (field, _key(value)), value_bits << base)
+        with self._lock:
+            self._slots = slots
+            self._slot_of = slot_of
+            self._free = []
+            self._bits = bits
+            self._all = (1 << len(slots)) - 1
+            queued, self._queued = self._queued, None
+            # The build saw a queued entry in whichever state it was in then,
+            # so its slot is cleared from every bitset before the replay.
+            for entry_id in {entry_id for _, entry_id, _ in queued}:
+                slot = self._slot_of.get(entry_id)
+                if slot is not None:
+                    self._release(entry_id, [key for key, value in self._bits.items() if value >> slot & 1])
+            for color, entry_id, keys in queued:
+                if color is None:
+                    self._release(entry_id, keys)
+                else:
+                    self._claim(color, entry_id, keys)
+
+    @staticmethod
+    def _keys(entry):
+        keys = []
+        for field in INDEXED:
+            value = entry.get(field)
+            if value is not None:
+                keys.append((field, _key(value)))
+        return keys
+
+    def add(self, color, entry_id, entry):
+        with self._lock:
+            if self._pending is not None:
+                return  # the pending rebuild will pick it up from the db
+            # The keys are taken now: the entry may change before a replay.
+            keys = self._keys(entry)
+            if self._queued is not None:
+                self._queued.append((color, entry_id, keys))
+            else:
+                self._claim(color, entry_id, keys)
+
+    def discard(self, entry_id, entry):
+        """Drop an entry; ``entry`` must still hold the values it was added with."""
+        with self._lock:
+            if self._pending is not None:
+                return
+            keys = self._keys(entry)
+            if self._queued is not None:
+                self._queued.append((None, entry_id, keys))
+            else:
+                self._release(entry_id, keys)
+
+    def _claim(self, color, entry_id, keys):
+        if self._free:
+            slot = self._free.pop()
+            self._slots[slot] = (color, entry_id)
+        else:
+            slot = len(self._slots)
+            self._slots.append((color, entry_id))
+        self._slot_of[entry_id] = slot
+        bit = 1 << slot
+        self._all |= bit
+        for key in [("color", _key(color)), *keys]:
+            self._bits[key] = self._bits.get(key, 0) | bit
+
+    def _release(self, entry_id, keys):
+        slot = self._slot_of.pop(entry_id, None)
+        if slot is None:
+            return
+        color, _ = self._slots[slot]
+        self._slots[slot] = None
+        self._free.append(slot)
+        mask = ~(1 << slot)
+        self._all &= mask
+        for key in [("color", _key(color)), *keys]:
+            bits = self._bits.get(key, 0) & mask
+            if bits:
+                self._bits[key] = bits
+            else:
+                self._bits.pop(key, None)
+
+    def query(self, clauses):
+        """Bitset of the slots matching ``clauses`` (see ``parse_filter``)."""
+        self._ensure()
+        result = self._all
+        for clause in clauses:
+            hits = 0
+            for field, value, negated in clause:
+                bits = self._bits.get((field, value), 0)
+                hits |= self._all & ~bits if negated else bits
+            result &= hits
+        return result
+
+    def values(self, field):
+        """Distinct indexed values of ``field``, casefolded."""
+        self._ensure()
+        return [value for key, value in list(self._bits) if key == field]
+
+    def bits(self, field, value):
+        self._ensure()
+        return self._bits.get((field, value), 0)
+
+    def locations(self, bits):
+        """Yield ``(color, uuid)`` for each set bit, lowest slot first."""
+        digits = bin(bits)[:1:-1]
+        slot = digits.find("1")
+        while slot >= 0:
+            location = self._slots[slot]
+            if location is not None:  # freed since ``bits`` was computed
+                yield location
+            slot = digits.find("1", slot + 1)
+
+    def count(self, clauses):
+        return self.query(clauses).bit_count()
+
+    def __len__(self):
+        self._ensure()
+        return len(self._slot_of)
+
+
+def _merge(bits, key, value_bits):
+    bits[key] = bits.get(key, 0) | value_bits
+
+
+def _column_bits(values, field):
+    """Yield ``(value, bitset)`` for every distinct ``field`` value in ``values``.
+
+    Bit ``i`` stands for ``values[i]``.  Entries without the field are left out.
+    """
+    try:
+        column = list(map(attrgetter(field), values))  # Minifig slots
+    except AttributeError:
+        column = [entry.get(field, MISSING) for entry in values]
+    codes = {MISSING: 0, None: 0}
+    for value in set(column):
+        codes.setdefault(value, len(codes) - 1)
+    if len(codes) > 256:
+        yield from _grouped_bits(column)
+        return
+    # One byte per entry holding its value's code; translating the codes to
+    # ASCII 0/1 gives each value's bitset as a base-2 literal.
+    encoded = bytes(map(codes.__getitem__, column))[::-1]
+    for value, code in codes.items():
+        if code:
+            table = b"0" * code + b"1" + b"0" * (255 - code)
+            yield value, int(encoded.translate(table), 2)
+
+
+def _grouped_bits(column):
+    groups = {}
+    for n, value in enumerate(column):
+        if value is not MISSING and value is not None:
+            groups.setdefault(value, []).append(n)
+    for value, slots in groups.items():
+        data = bytearray(len(column) // 8 + 1)
+        for slot in slots:
+            data[slot >> 3] |= 1 << (slot & 7)
+        yield value, int.from_bytes(data, "little")
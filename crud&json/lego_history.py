@@ -0,0 +1,46 @@
+from collections import deque
+
+DEPTH = 100
+
+
+class History:
+    """Bounded undo/redo stacks of inverse operations.
+
+    A step is the operation that reverts one edit: ``("delete", uuid)`` for
+    an add, ``("insert", color, uuid, entry)`` for a delete, and
+    ``("update", uuid, {field: old value})`` for an update, holding only the
+    fields that changed.  So a step costs the size of its change, never a
+    copy of the db, and the undo stack keeps only the latest ``depth`` steps.
+    Recording a new edit clears the redo stack.
+    """
+
+    def __init__(self, depth=DEPTH):
+        self._undo = deque(maxlen=depth)
+        self._redo = deque(maxlen=depth)
+
+    def record(self, step):
+        self._undo.append(step)
+        self._redo.clear()
+
+    def pop_undo(self):
+        return self._undo.pop() if self._undo else None
+
+    def pop_redo(self):
+        return self._redo.pop() if self._redo else None
+
+    def push_undo(self, step):
+        self._undo.append(step)
+
+    def push_redo(self, step):
+        self._redo.append(step)
+
+    @property
+    def can_undo(self):
+        return bool(self._undo)
+
+    @property
+    def can_redo(self):
+        return bool(self._redo)
+
+    def __len__(self):
+        return len(self._undo)
@@ -0,0 +1,117 @@
+class NameIndex:
+    """Case-folded name -> (color, uuid) lookup kept in step with the db.
+
+    Files written before duplicate names were rejected can still hold two
+    entries with the same name; those are parked in ``_shadowed`` so removing
+    one of them does not hide the other.
+
+    ``bind`` defers the rebuild to the first lookup, so a lazily loaded db is
+    not parsed just to open the window.
+    """
+
+    def __init__(self):
+        self._names = {}
+        self._shadowed = {}
+        self._pending = None
+
+    @staticmethod
+    def key(name):
+        return name.casefold()
+
+    def bind(self, db):
+        self._pending = db
+
+    def _ensure(self):
+        if self._pending is not None:
+            self.rebuild(self._pending)
+
+    def rebuild(self, db):
+        self._pending = None
+        self._names = {}
+        self._shadowed = {}
+        for color, entries in db.items():
+            for entry_id, data in entries.items():
+                self.add(data.get("name", ""), color, entry_id)
+
+    def add(self, name, color, entry_id):
+        if self._pending is not None:
+            return  # the pending rebuild will pick it up from the db
+        key = self.key(name)
+        if key in self._names:
+            self._shadowed.setdefault(key, []).append((color, entry_id))
+        else:
+            self._names[key] = (color, entry_id)
+
+    def discard(self, name, color, entry_id):
+        if self._pending is not None:
+            return
+        key = self.key(name)
+        location = (color, entry_id)
+        shadowed = self._shadowed.get(key)
+        if shadowed and location in shadowed:
+            shadowed.remove(location)
+        elif self._names.get(key) == location:
+            if shadowed:
+                self._names[key] = shadowed.pop(0)
+            else:
+                del self._names[key]
+        if shadowed == []:
+            del self._shadowed[key]
+
+    def lookup(self, name):
+        self._ensure()
+        return self._names.get(self.key(name))
+
+    def __contains__(self, name):
+        self._ensure()
+        return self.key(name) in self._names
+
+    def __len__(self):
+        self._ensure()
+        return len(self._names) + sum(len(v) for v in self._shadowed.values())
+
+
+class UuidIndex:
+    """uuid -> color for every entry, so an entry is found without its color.
+
+    Like ``NameIndex``, ``bind`` defers the build to the first lookup.
+    """
+
+    def __init__(self):
+        self._colors = {}
+        self._pending = None
+
+    def bind(self, db):
+        self._pending = db
+
+    def _ensure(self):
+        if self._pending is not None:
+            self.rebuild(self._pending)
+
+    def rebuild(self, db):
+        self._pending = None
+        self._colors = {
+            entry_id: color
+            for color, entries in db.items()
+            for entry_id in entries
+        }
+
+    def add(self, entry_id, color):
+        if self._pending is None:
+            self._colors[entry_id] = color
+
+    def discard(self, entry_id):
+        if self._pending is None:
+            self._colors.pop(entry_id, None)
+
+    def get(self, entry_id):
+        self._ensure()
+        return self._colors.get(entry_id)
+
+    def __contains__(self, entry_id):
+        self._ensure()
+        return entry_id in self._colors
+
+    def __len__(self):
+        self._ensure()
+        return len(self._colors)
@@ -0,0 +1,38 @@
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+@contextmanager
+def file_lock(path, shared=False, blocking=True):
+    """Hold an advisory lock on ``path`` (created if missing) for a ``with`` block.
+
+    Every process sharing a database takes it around journal writes,
+    snapshots and reads of other processes' edits.  Each call opens its own
+    file description, so two threads of one process exclude each other the
+    same way two processes do.  Raises ``BlockingIOError`` when ``blocking``
+    is False and the lock is taken.  Windows has no shared mode, so readers
+    lock exclusively there.
+    """
+    with open(path, 'a+b') as f:
+        if fcntl is not None:
+            flags = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+            fcntl.flock(f.fileno(), flags if blocking else flags | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+            except OSError as e:
+                raise BlockingIOError(*e.args) from e
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
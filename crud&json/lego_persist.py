@@ -0,0 +1,112 @@
+import threading
+import time
+
+
+class PersistWorker:
+    """Runs a storage backend's disk writes on one background thread.
+
+    The GUI thread applies each mutation to the in-memory db itself and only
+    hands over the encoded journal lines.  Everything queued while the worker
+    was busy (or within ``delay`` seconds of waking up) goes out as a single
+    write with one fsync, so a burst of edits costs one disk round trip.
+    Checkpoints run on the same thread, in submission order.
+
+    ``flush`` blocks until everything submitted so far is on disk and
+    re-raises the first error the worker hit since the last flush.
+    """
+
+    def __init__(self, write_lines, checkpoint, delay=0.005):
+        self._write_lines = write_lines
+        self._checkpoint = checkpoint
+        self.delay = delay
+        self.writes = 0
+        self._cond = threading.Condition()
+        self._queue = []
+        self._submitted = 0
+        self._done = 0
+        self._checkpoints = 0
+        self._error = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="lego-persist", daemon=True)
+        self._thread.start()
+
+    def submit(self, lines):
+        self._put(("lines", lines))
+
+    def checkpoint(self, *args):
+        with self._cond:
+            self._checkpoints += 1
+        self._put(("checkpoint", args))
+
+    @property
+    def checkpointing(self):
+        with self._cond:
+            return self._checkpoints > 0
+
+    def _put(self, item):
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("persistence worker is closed")
+            self._queue.append(item)
+            self._submitted += 1
+            self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        """Wait for queued writes; False if ``timeout`` ran out first."""
+        with self._cond:
+            target = self._submitted
+            drained = self._cond.wait_for(lambda: self._done >= target, timeout)
+            error, self._error = self._error, None
+        if error is not None:
+            raise error
+        return drained
+
+    def close(self, timeout=None):
+        try:
+            self.flush(timeout)
+        finally:
+            with self._cond:
+                self._closed = True
+                self._cond.notify_all()
+            self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue or self._closed)
+                if not self._queue:
+                    return
+            if self.delay:
+                time.sleep(self.delay)
+            with self._cond:
+                items, self._queue = self._queue, []
+            self._process(items)
+            with self._cond:
+                self._done += len(items)
+                self._cond.notify_all()
+
+    def _process(self, items):
+        lines = []
+        for kind, payload in items:
+            if kind == "lines":
+                lines.extend(payload)
+                continue
+            self._write(lines)
+            lines = []
+            self._guard(self._checkpoint, *payload)
+            with self._cond:
+                self._checkpoints -= 1
+        self._write(lines)
+
+    def _write(self, lines):
+        if lines:
+            self.writes += 1
+            self._guard(self._write_lines, lines)
+
+    def _guard(self, func, *args):
+        try:
+            func(*args)
+        except Exception as e:
+            with self._cond:
+                if self._error is None:
+                    self._error = e
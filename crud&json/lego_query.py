@@ -0,0 +1,36 @@
+CHECK_EVERY = 4096
+
+
+def filter_by_bitmap(db, bitmap, clauses, query="", cancelled=lambda: False):
+    """``{color: {uuid: entry}}`` of the entries matching ``clauses`` whose
+    name contains ``query`` (lowercased).
+
+    The attribute filter resolves on ``bitmap`` first, so only its hits are
+    looked up and name-checked.  Every color group of ``db`` is kept, empty
+    or not.  ``cancelled`` is polled every few thousand hits so a background
+    search can be abandoned early; in that case ``None`` is returned.
+    """
+    result = {color: {} for color in list(db)}
+    for n, (color, uid) in enumerate(bitmap.locations(bitmap.query(clauses))):
+        if n % CHECK_EVERY == 0 and cancelled():
+            return None
+        data = db.get(color, {}).get(uid)
+        if data is not None and query in data.get("name", "").lower():
+            result.setdefault(color, {})[uid] = data
+    return result
+
+
+def group_by_color(db, locations, allowed=None):
+    """``{color: {uuid: entry}}`` for ranked ``(color, uuid)`` hits, in order.
+
+    Every color group of ``db`` is kept, as in ``filter_by_bitmap``; ``allowed``
+    optionally limits the hits to a set of locations.
+    """
+    result = {color: {} for color in list(db)}
+    for color, uid in locations:
+        if allowed is not None and (color, uid) not in allowed:
+            continue
+        data = db.get(color, {}).get(uid)
+        if data is not None:
+            result.setdefault(color, {})[uid] = data
+    return result
@@ -0,0 +1,115 @@
+import sys
+from collections.abc import MutableMapping
+
+FIELDS = ("name", "helmet", "weapon", "rank", "armor", "has_jetpack")
+# Few distinct values across many minifigs, so each one is stored only once.
+INTERNED = frozenset(("weapon", "rank", "armor"))
+KNOWN = frozenset(FIELDS)
+# Marks a field the source dict did not have, so to_dict leaves it out too.
+MISSING = object()
+
+
+class Minifig(MutableMapping):
+    """A minifig entry in ``__slots__`` instead of a per-entry dict.
+
+    It behaves like the ``{"name": ..., "helmet": ...}`` dict it replaces, so
+    ``get``/``items``/``entry[key] = value`` and ``dict(entry)`` keep working,
+    and ``to_dict``/``from_dict`` round-trip the JSON schema.  Fields absent
+    from the source stay absent; unknown keys are kept in ``extra``.
+    """
+
+    __slots__ = FIELDS + ("extra",)
+
+    def __init__(self, **fields):
+        for field in FIELDS:
+            setattr(self, field, MISSING)
+        self.extra = None
+        for key, value in fields.items():
+            self[key] = value
+
+    @classmethod
+    def from_dict(cls, data):
+        if isinstance(data, cls):
+            return data
+        # Unrolled rather than going through __setitem__: this runs once per
+        # entry whenever a bucket is parsed.
+        fig = cls.__new__(cls)
+        get = data.get
+        fig.name = get("name", MISSING)
+        fig.helmet = get("helmet", MISSING)
+        fig.weapon = _intern(get("weapon", MISSING))
+        fig.rank = _intern(get("rank", MISSING))
+        fig.armor = _intern(get("armor", MISSING))
+        fig.has_jetpack = get("has_jetpack", MISSING)
+        if data.keys() <= KNOWN:
+            fig.extra = None
+        else:
+            fig.extra = {key: value for key, value in data.items() if key not in KNOWN}
+        return fig
+
+    def to_dict(self):
+        data = {}
+        for field in FIELDS:
+            value = getattr(self, field)
+            if value is not MISSING:
+                data[field] = value
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def __getitem__(self, key):
+        if key in FIELDS:
+            value = getattr(self, key)
+            if value is not MISSING:
+                return value
+        elif self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in FIELDS:
+            setattr(self, key, _intern(value) if key in INTERNED else value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __delitem__(self, key):
+        if key in FIELDS and getattr(self, key) is not MISSING:
+            setattr(self, key, MISSING)
+        elif self.extra and key in self.extra:
+            del self.extra[key]
+        else:
+            raise KeyError(key)
+
+    def __iter__(self):
+        for field in FIELDS:
+            if getattr(self, field) is not MISSING:
+                yield field
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"Minifig({self.to_dict()!r})"
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+def jsonable(obj):
+    """``default`` hook for json: Minifig records and lazy mappings as plain dicts."""
+    if isinstance(obj, Minifig):
+        return obj.to_dict()
+    return dict(obj)
+
+
+def bucket_from_json(entries):
+    return {entry_id: Minifig.from_dict(data) for entry_id, data in entries.items()}
+
+
+def db_from_json(db):
+    return {color: bucket_from_json(entries) for color, entries in db.items()}
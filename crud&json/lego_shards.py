@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+import re
+import threading
+
+from lego_lock import file_lock
+from lego_storage import JournalStorage, SettledDB, write_json_atomic
+from lego_stream import load_lazy, write_index
+
+MANIFEST = "manifest.json"
+SHARD_SUFFIX = ".shard.json"
+
+
+class ShardedStorage(JournalStorage):
+    """``JournalStorage`` with one snapshot file per color.
+
+    ``<directory>/manifest.json`` maps every color to its shard, a one-color
+    ``lego_db.json`` that loads lazily and gets its own ``.idx``.  The journal
+    (``manifest.json.journal``) works as before, so a mutation still appends a
+    single line.  Compaction rewrites only the shards of colors the journal
+    touched since the last one, under new file names, then renames a new
+    manifest into place and deletes the shards it replaced; a crash before
+    the rename leaves the old manifest and its shards intact.  With
+    ``background=True`` that happens on the persistence worker.  A missing
+    manifest is created once from the single-file ``migrate_from``.
+    """
+
+    def __init__(self, directory, migrate_from=None, **kwargs):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.migrate_from = migrate_from
+        self.shards = {}
+        self.generation = 0
+        self._dirty = set()
+        self._dirty_lock = threading.Lock()
+        super().__init__(os.path.join(directory, MANIFEST), **kwargs)
+
+    def load(self):
+        if not os.path.exists(self.path) and self.migrate_from and os.path.exists(self.migrate_from):
+            self.migrate_json(self.migrate_from)
+        return super().load()
+
+    def migrate_json(self, json_path):
+        source = JournalStorage(json_path)
+        db = source.load()
+        source.close()
+        with file_lock(self.lock_path):
+            if os.path.exists(self.path):
+                return  # another process migrated first
+            with self._dirty_lock:
+                self._dirty.update(db)
+            self._write_snapshot(db, list(db))
+
+    def _load_snapshot(self):
+        self._read_manifest()
+        db = {}
+        for color, name in self.shards.items():
+            db[color] = load_lazy(os.path.join(self.directory, name)).get(color, {})
+        return db
+
+    def _read_manifest(self):
+        try:
+            with open(self.path) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            manifest = {"generation": 0, "shards": {}}
+        self.generation = manifest["generation"]
+        self.shards = manifest["shards"]
+
+    def _touched(self, color):
+        with self._dirty_lock:
+            self._dirty.add(color)
+
+    def maybe_compact(self, db):
+        if self.worker is not None and self.worker.checkpointing:
+            return
+        with self._dirty_lock:
+            dirty = list(self._dirty)
+        # Only the touched shards get rewritten, so only they count.
+        pending = sum(len(db[color]) for color in dirty if color in db)
+        if self.journal_len >= max(self.compact_min, pending):
+            self.compact(db)
+
+    def _write_snapshot(self, db, colors):
+        # Runs under the file lock.  Another process may have compacted since
+        # this one last looked, so start from the manifest on disk.
+        self._read_manifest()
+        with self._dirty_lock:
+            dirty, self._dirty = self._dirty, set()
+        generation = self.generation + 1
+        shards = {color: self.shards[color] for color in colors if color in self.shards}
+        try:
+            for color in colors:
+                if color in dirty or color not in shards:
+                    name = shard_name(color, generation)
+                    path = os.path.join(self.directory, name)
+                    write_json_atomic(path, SettledDB(db, [color]))
+                    write_index(path)
+                    shards[color] = name
+            write_manifest(self.path, {"generation": generation, "shards": shards})
+        except BaseException:
+            with self._dirty_lock:
+                self._dirty |= dirty
+            raise
+        self.generation, self.shards = generation, shards
+        self._remove_unlisted()
+
+    def _remove_unlisted(self):
+        # Shards the new manifest replaced, and leftovers of a compaction
+        # that crashed before its manifest got written.
+        listed = set(self.shards.values())
+        for name in os.listdir(self.directory):
+            shard = name[:name.index(SHARD_SUFFIX) + len(SHARD_SUFFIX)] if SHARD_SUFFIX in name else None
+            if shard is not None and shard not in listed:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+
+
+def shard_name(color, generation):
+    """File name for ``color``'s shard: readable, unique per color and generation."""
+    slug = re.sub(r"[^A-Za-z0-9_-]", "_", color)[:32]
+    digest = hashlib.sha1(color.encode()).hexdigest()[:8]
+    return f"{slug}-{digest}.{generation}{SHARD_SUFFIX}"
+
+
+def write_manifest(path, manifest):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=4)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
@@ -0,0 +1,254 @@
+import os
+import sqlite3
+from collections.abc import Mapping
+
+from lego_storage import JournalStorage
+
+FIELDS = ["name", "helmet", "weapon", "rank", "armor", "has_jetpack"]
+BOOL_FIELDS = {"helmet", "has_jetpack"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS minifigs (
+    uuid TEXT PRIMARY KEY,
+    color TEXT NOT NULL,
+    name TEXT NOT NULL DEFAULT '',
+    name_key TEXT NOT NULL DEFAULT '',
+    helmet INTEGER NOT NULL DEFAULT 0,
+    weapon TEXT NOT NULL DEFAULT '',
+    rank TEXT NOT NULL DEFAULT '',
+    armor TEXT NOT NULL DEFAULT '',
+    has_jetpack INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS minifigs_color ON minifigs (color);
+CREATE INDEX IF NOT EXISTS minifigs_name_key ON minifigs (name_key);
+"""
+
+UPSERT = """
+INSERT INTO minifigs (uuid, color, name, name_key, helmet, weapon, rank, armor, has_jetpack)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (uuid) DO UPDATE SET
+    color = excluded.color, name = excluded.name, name_key = excluded.name_key,
+    helmet = excluded.helmet, weapon = excluded.weapon, rank = excluded.rank,
+    armor = excluded.armor, has_jetpack = excluded.has_jetpack
+"""
+
+# Walks the color index one distinct value at a time instead of scanning it.
+DISTINCT_COLORS = """
+WITH RECURSIVE colors (color) AS (
+    SELECT MIN(color) FROM minifigs
+    UNION ALL
+    SELECT (SELECT MIN(color) FROM minifigs WHERE color > colors.color)
+    FROM colors WHERE colors.color IS NOT NULL
+)
+SELECT color FROM colors WHERE color IS NOT NULL
+"""
+# The stored spellings of one casefolded color, for ``color IN (...)``.  It
+# runs as part of the filtered query, so building the filter never touches
+# the connection, which belongs to the thread that opened it.
+COLOR_SPELLINGS = DISTINCT_COLORS.rstrip() + " AND casefold(color) = ?"
+
+
+def _casefold(value):
+    return value.casefold() if isinstance(value, str) else value
+
+
+def entry_to_row(color, entry_id, entry):
+    name = entry.get("name", "")
+    return (
+        entry_id, color, name, name.casefold(),
+        int(bool(entry.get("helmet", False))),
+        entry.get("weapon", ""), entry.get("rank", ""), entry.get("armor", ""),
+        int(bool(entry.get("has_jetpack", False))),
+    )
+
+
+def row_to_entry(row):
+    return {
+        field: bool(value) if field in BOOL_FIELDS else value
+        for field, value in zip(FIELDS, row)
+    }
+
+
+class SqliteStorage:
+    """Minifigs in an indexed SQLite table instead of an in-memory dict.
+
+    ``load`` returns a read-only ``SqliteDB`` mapping that answers
+    ``db[color][uuid]`` with indexed queries, so nothing is held in memory.
+    Name checks, search and counts run as SQL.  An empty database is filled
+    once from ``migrate_from`` (a ``lego_db.json`` plus its journal).
+    """
+
+    indexed = True
+    # SQLite does its own locking and every read goes to the database, so
+    # other processes' edits need no journal following.
+    watched = ()
+
+    def __init__(self, path, migrate_from=None):
+        self.path = path
+        self.migrate_from = migrate_from
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.create_function("casefold", 1, _casefold, deterministic=True)
+        self.conn.executescript(SCHEMA)
+
+    def load(self):
+        empty = self.conn.execute("SELECT 1 FROM minifigs LIMIT 1").fetchone() is None
+        if empty and self.migrate_from and os.path.exists(self.migrate_from):
+            self.migrate_json(self.migrate_from)
+        return SqliteDB(self.conn)
+
+    def migrate_json(self, json_path):
+        db = JournalStorage(json_path).load()
+        with self.conn:
+            self.conn.executemany(UPSERT, (
+                entry_to_row(color, entry_id, entry)
+                for color, entries in db.items()
+                for entry_id, entry in entries.items()
+            ))
+
+    def put(self, color, entry_id, entry):
+        with self.conn:
+            self.conn.execute(UPSERT, entry_to_row(color, entry_id, entry))
+
+    def put_many(self, records):
+        rows = [entry_to_row(color, entry_id, entry) for color, entry_id, entry in records]
+        with self.conn:
+            self.conn.executemany(UPSERT, rows)
+        return len(rows)
+
+    def delete(self, color, entry_id):
+        with self.conn:
+            self.conn.execute(
+                "DELETE FROM minifigs WHERE uuid = ? AND color = ?", (entry_id, color)
+            )
+
+    def maybe_compact(self, db):
+        pass
+
+    def needs_compact(self):
+        return True  # a WAL checkpoint costs nothing when the WAL is empty
+
+    def compact(self, db):
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def poll(self):
+        return []
+
+    def flush(self, timeout=None):
+        return True  # every put/delete has already committed
+
+    def close(self):
+        self.conn.close()
+
+    def name_exists(self, name):
+        row = self.conn.execute(
+            "SELECT 1 FROM minifigs WHERE name_key = ? LIMIT 1", (name.casefold(),)
+        ).fetchone()
+        return row is not None
+
+    def find(self, entry_id):
+        row = self.conn.execute(
+            "SELECT color FROM minifigs WHERE uuid = ?", (entry_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def search(self, query, filters=None):
+        """Entries with ``query`` in a text field that match ``filters``.
+
+        ``filters`` are clauses from ``lego_filter.parse_filter``.
+        """
+        terms, params = [], []
+        if query:
+            terms.append(
+                "(instr(name_key, ?) > 0 OR instr(casefold(weapon), ?) > 0"
+                " OR instr(casefold(rank), ?) > 0 OR instr(casefold(armor), ?) > 0)"
+            )
+            params.extend([query.casefold()] * 4)
+        for clause in filters or ():
+            tests = []
+            for field, value, negated in clause:
+                test, args = self._filter_test(field, value)
+                tests.append(f"NOT ({test})" if negated else test)
+                params.extend(args)
+            terms.append("(" + " OR ".join(tests) + ")")
+        if not terms:
+            return SqliteDB(self.conn)
+        return SqliteDB(self.conn, " AND ".join(terms), tuple(params))
+
+    def _filter_test(self, field, value):
+        if field in BOOL_FIELDS:
+            return f"{field} = ?", (int(value),)
+        if field == "color":
+            # Resolved against the distinct colors so the color index applies.
+            return f"color IN ({COLOR_SPELLINGS})", (value,)
+        return f"casefold({field}) = ?", (value,)
+
+    def counts(self):
+        return dict(self.conn.execute(
+            "SELECT color, COUNT(*) FROM minifigs GROUP BY color"
+        ))
+
+
+class SqliteDB(Mapping):
+    """``{color: {uuid: entry}}`` view over the minifigs table, optionally filtered."""
+
+    def __init__(self, conn, where="1", params=()):
+        self.conn = conn
+        self.where = where
+        self.params = params
+
+    def _colors(self):
+        colors = [color for color, in self.conn.execute(DISTINCT_COLORS)]
+        if self.where == "1":
+            return colors
+        return [color for color in colors if color in self]
+
+    def __contains__(self, color):
+        row = self.conn.execute(
+            f"SELECT 1 FROM minifigs WHERE color = ? AND ({self.where}) LIMIT 1",
+            (color, *self.params),
+        ).fetchone()
+        return row is not None
+
+    def __getitem__(self, color):
+        if color not in self:
+            raise KeyError(color)
+        return SqliteBucket(self, color)
+
+    def __iter__(self):
+        return iter(self._colors())
+
+    def __len__(self):
+        return len(self._colors())
+
+
+class SqliteBucket(Mapping):
+    def __init__(self, db, color):
+        self.db = db
+        self.color = color
+
+    def _query(self, select, extra="", params=()):
+        return self.db.conn.execute(
+            f"SELECT {select} FROM minifigs WHERE color = ? AND ({self.db.where}){extra}",
+            (self.color, *self.db.params, *params),
+        )
+
+    def __getitem__(self, entry_id):
+        row = self._query(", ".join(FIELDS), " AND uuid = ?", (entry_id,)).fetchone()
+        if row is None:
+            raise KeyError(entry_id)
+        return row_to_entry(row)
+
+    def __contains__(self, entry_id):
+        return self._query("1", " AND uuid = ?", (entry_id,)).fetchone() is not None
+
+    def __iter__(self):
+        return (uid for uid, in self._query("uuid", " ORDER BY rowid"))
+
+    def __len__(self):
+        return self._query("COUNT(*)").fetchone()[0]
+
+    def items(self):
+        rows = self._query("uuid, " + ", ".join(FIELDS), " ORDER BY rowid")
+        return ((row[0], row_to_entry(row[1:])) for row in rows)
@@ -0,0 +1,123 @@
+from collections import Counter
+
+
+class ColorStats:
+    __slots__ = ("helmets", "jetpacks", "ranks")
+
+    def __init__(self):
+        self.helmets = 0
+        self.jetpacks = 0
+        self.ranks = Counter()
+
+    def apply(self, entry, sign):
+        if entry.get("helmet") is True:
+            self.helmets += sign
+        if entry.get("has_jetpack") is True:
+            self.jetpacks += sign
+        rank = entry.get("rank")
+        if isinstance(rank, str) and rank:
+            self.ranks[rank] += sign
+            if self.ranks[rank] <= 0:
+                del self.ranks[rank]
+
+
+class StatsIndex:
+    """Per-color entry counts and helmet/jetpack/rank aggregates.
+
+    Counts cover every color in the db and start from ``counts()`` (``len`` of
+    each bucket by default, which a lazily loaded bucket knows without being
+    parsed), taken on first use; ``add``/``discard`` before that are no-ops.  The aggregates of a color are computed the first time that
+    color is asked for.  From then on ``add``/``discard`` keep both current,
+    so reading them is O(1) per color.
+
+    Tallying a large lazily loaded color parses it, so the GUI can move that
+    off its thread: ``tally`` only reads the db, and ``install`` takes the
+    result unless ``add``/``discard`` touched the color since ``version``.
+    """
+
+    def __init__(self):
+        self._db = {}
+        self._initial = None
+        self._counts = None
+        self._stats = {}
+        self._versions = Counter()
+
+    def bind(self, db, counts=None):
+        self._db = db
+        self._initial = counts
+        self._counts = None
+        self._stats = {}
+
+    def _ensure_counts(self):
+        if self._counts is None:
+            if self._initial is not None:
+                self._counts = dict(self._initial())
+            else:
+                self._counts = {color: len(entries) for color, entries in self._db.items() if entries}
+        return self._counts
+
+    def add(self, color, entry):
+        self._versions[color] += 1
+        counts = self._counts
+        if counts is None:
+            return  # the pending count will pick it up from the db
+        counts[color] = counts.get(color, 0) + 1
+        stats = self._stats.get(color)
+        if stats is not None:
+            stats.apply(entry, 1)
+
+    def discard(self, color, entry):
+        self._versions[color] += 1
+        counts = self._counts
+        if counts is None:
+            return
+        remaining = counts.get(color, 0) - 1
+        if remaining > 0:
+            counts[color] = remaining
+        else:
+            counts.pop(color, None)
+        stats = self._stats.get(color)
+        if stats is not None:
+            stats.apply(entry, -1)
+
+    def counts(self):
+        return dict(self._ensure_counts())
+
+    def summary(self, color, compute=True):
+        """``count``, ``helmets``, ``helmet_ratio``, ``jetpacks`` and ``ranks`` of ``color``.
+
+        With ``compute=False`` returns None rather than tallying the color.
+        """
+        count = self._ensure_counts().get(color, 0)
+        stats = self._stats.get(color)
+        if stats is None:
+            if not compute:
+                return None
+            stats = self._stats[color] = self.tally(color)
+        return {
+            "count": count,
+            "helmets": stats.helmets,
+            "helmet_ratio": stats.helmets / count if count else 0.0,
+            "jetpacks": stats.jetpacks,
+            "ranks": dict(stats.ranks.most_common()),
+        }
+
+    def version(self, color):
+        return self._versions[color]
+
+    def tally(self, color):
+        """A fresh ``ColorStats`` of ``color``, touching nothing but the db.
+
+        Raises ``RuntimeError`` if the bucket changes size meanwhile.
+        """
+        stats = ColorStats()
+        for entry in self._db.get(color, {}).values():
+            stats.apply(entry, 1)
+        return stats
+
+    def install(self, color, stats, version):
+        """Keep ``tally(color)`` taken at ``version``; False if it went stale."""
+        if self._versions[color] != version:
+            return False
+        self._stats.setdefault(color, stats)
+        return True
@@ -0,0 +1,465 @@
+import json
+import os
+import shutil
+import threading
+from collections import Counter
+
+from lego_binary import SnapshotError, load_binary, write_binary
+from lego_lock import file_lock
+from lego_persist import PersistWorker
+from lego_record import Minifig, jsonable
+from lego_stream import dump_snapshot, load_lazy, write_index
+
+
+class JournalStorage:
+    """Snapshot file plus an append-only journal of mutations.
+
+    The snapshot is the plain ``lego_db.json`` layout ({color: {uuid: entry}}).
+    Every mutation is appended to ``<snapshot>.journal`` as one compact JSON
+    line and fsynced, so a write costs O(1) in database size.  ``load`` replays
+    the journal on top of the snapshot and returns the in-memory db, which
+    ``put``/``delete`` then keep current.  ``compact`` folds the journal into
+    a fresh snapshot once it has grown as large as the database itself.
+
+    With ``background=True`` the fsyncs and snapshot writes move to a
+    ``PersistWorker`` thread: mutations return as soon as the in-memory db is
+    updated, bursts share one fsync, and ``flush``/``close`` wait for the disk.
+
+    Several processes can share the files.  Writes and snapshots hold the
+    ``<snapshot>.lock`` file lock, and each process follows the journal past
+    what it has already seen: ``poll`` returns the records the others have
+    appended since.  A snapshot is only taken once every record in the
+    journal is reflected in this process's db, and the journal is replaced
+    rather than truncated, so a process still reading the old one loses
+    nothing.
+    """
+
+    indexed = False
+
+    def __init__(self, path, journal_path=None, compact_min=1000, background=False, binary=False):
+        self.path = path
+        # The binary snapshot wins whenever it exists; ``binary`` only picks
+        # which format snapshots are written in.
+        self.binary = binary
+        self.binary_path = os.path.splitext(path)[0] + ".bin"
+        self.journal_path = journal_path or path + ".journal"
+        # A journal set aside by a background checkpoint until the new
+        # snapshot that covers it has been renamed into place.
+        self.old_journal_path = self.journal_path + ".old"
+        self.lock_path = path + ".lock"
+        self.watched = [self.journal_path]
+        self.compact_min = compact_min
+        self.journal_len = 0
+        self.db = {}
+        # Read handle on the journal and how far this process has seen it.
+        # ``_own`` holds ``(inode, start, end, uuids)`` of the batches this
+        # process wrote beyond ``_offset``, after records it has not read yet.
+        self._tail = None
+        self._tail_inode = None
+        self._offset = 0
+        self._own = []
+        # Entries with lines queued on the worker but not yet written.
+        self._unwritten = Counter()
+        self._unwritten_lock = threading.Lock()
+        self.worker = None
+        if background:
+            self.worker = PersistWorker(self._write_lines, self._checkpoint)
+
+    def load(self):
+        with file_lock(self.lock_path):
+            db = self._load_snapshot()
+            self.journal_len = self._replay(db, self.old_journal_path)
+            self.journal_len += self._replay(db, self.journal_path)
+            if not os.path.exists(self.journal_path):
+                open(self.journal_path, 'a').close()
+            self._follow()
+        self.db = db
+        return db
+
+    def _load_snapshot(self):
+        if os.path.exists(self.binary_path):
+            return load_binary(self.binary_path)
+        if os.path.exists(self.path):
+            try:
+                return load_lazy(self.path)
+            except json.JSONDecodeError as e:
+                # Starting empty would overwrite the file on the next save.
+                raise SnapshotError(f"{self.path}: {e}") from e
+        return {}
+
+    def _replay(self, db, journal_path):
+        if not os.path.exists(journal_path):
+            return 0
+        count = 0
+        offset = good_offset = 0
+        batch = None
+        with open(journal_path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # torn write from a crash, drop the tail
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                offset += len(line)
+                op = record["op"]
+                if op == "begin":
+                    batch = []
+                    continue
+                if op == "commit":
+                    records, batch = batch or [], None
+                elif batch is not None:
+                    batch.append(record)
+                    continue
+                else:
+                    records = [record]
+                for r in records:
+                    apply_record(db, r)
+                    self._touched(r["color"])
+                count += len(records)
+                good_offset = offset
+        if good_offset != os.path.getsize(journal_path):
+            with open(journal_path, 'r+b') as f:
+                f.truncate(good_offset)
+        return count
+
+    def put(self, color, entry_id, entry):
+        self._append({"op": "put", "color": color, "uuid": entry_id, "entry": entry})
+
+    def delete(self, color, entry_id):
+        self._append({"op": "del", "color": color, "uuid": entry_id})
+
+    def put_many(self, records):
+        """Write ``(color, uuid, entry)`` records as one batch with a single fsync.
+
+        The batch is framed by begin/commit lines, so replay applies all of it
+        or, after a crash mid-write, none of it.
+        """
+        lines = []
+        for color, entry_id, entry in records:
+            record = {"op": "put", "color": color, "uuid": entry_id, "entry": entry}
+            apply_record(self.db, record)
+            self._touched(color)
+            lines.append((entry_id, _journal_line(record)))
+        if lines:
+            self._submit(lines)
+        self.journal_len += len(lines)
+        return len(lines)
+
+    def _append(self, record):
+        apply_record(self.db, record)
+        self._touched(record["color"])
+        self._submit([(record["uuid"], _journal_line(record))])
+        self.journal_len += 1
+
+    def _submit(self, lines):
+        if self.worker is None:
+            self._write_lines(lines)
+            return
+        with self._unwritten_lock:
+            self._unwritten.update(entry_id for entry_id, _ in lines)
+        self.worker.submit(lines)
+
+    def _write_lines(self, lines):
+        """Append ``(uuid, line)`` pairs to the journal under the file lock."""
+        try:
+            with file_lock(self.lock_path), open(self.journal_path, 'a') as f:
+                start = f.tell()
+                try:
+                    if len(lines) > 1:
+                        f.write('{"op":"begin"}\n' + "".join(line for _, line in lines) + '{"op":"commit"}\n')
+                    else:
+                        f.write(lines[0][1])
+                    f.flush()
+                except BaseException:
+                    f.truncate(start)
+                    raise
+                os.fsync(f.fileno())
+                self._wrote(os.fstat(f.fileno()).st_ino, start, f.tell(), {entry_id for entry_id, _ in lines})
+        finally:
+            if self.worker is not None:
+                with self._unwritten_lock:
+                    self._unwritten.subtract(entry_id for entry_id, _ in lines)
+                    self._unwritten = +self._unwritten
+
+    def _wrote(self, inode, start, end, entry_ids):
+        if self._tail is None:
+            return
+        if not self._own and inode == self._tail_inode and start == self._offset:
+            self._offset = end  # nothing from anyone else in between
+        else:
+            self._own.append((inode, start, end, entry_ids))
+
+    def poll(self):
+        """Records other processes appended to the journal since the last call.
+
+        Apply them in order with ``apply_record``.  A record is left out when
+        this process wrote (or has queued) a later record for the same
+        entry, which supersedes it in the journal as well.  Returns None when
+        another process holds the lock; try again shortly.
+        """
+        if self._tail is None:
+            return []
+        try:
+            with file_lock(self.lock_path, shared=True, blocking=False):
+                return self._read_foreign()
+        except BlockingIOError:
+            return None
+
+    def _read_foreign(self):
+        records = []
+        while True:
+            records.extend(self._read_tail())
+            try:
+                inode = os.stat(self.journal_path).st_ino
+            except FileNotFoundError:
+                break
+            if inode == self._tail_inode:
+                break
+            # Another process took a snapshot and replaced the journal.  The
+            # old file is complete by now; carry on from the new one's start.
+            self.journal_len = 0
+            self._follow(at_end=False)
+        self.journal_len += len(records)
+        return records
+
+    def _read_tail(self):
+        self._tail.seek(self._offset)
+        data = self._tail.read()
+        own = [(start, end, ids) for inode, start, end, ids in self._own if inode == self._tail_inode]
+        found = []
+        position = consumed = self._offset
+        batch = None
+        for line in data.splitlines(keepends=True):
+            start = position
+            position += len(line)
+            if not line.endswith(b"\n"):
+                break  # still being written
+            if any(s <= start < e for s, e, _ in own):
+                consumed = position
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            op = record["op"]
+            if op == "begin":
+                batch = []
+                continue
+            if op == "commit":
+                records, batch = batch or [], None
+            elif batch is not None:
+                batch.append((start, record))
+                continue
+            else:
+                records = [(start, record)]
+            found.extend(records)
+            for _, record in records:
+                self._touched(record["color"])
+            consumed = position
+        result = [record for start, record in found if not self._superseded(record["uuid"], start)]
+        self._offset = consumed
+        self._own = [o for o in self._own if o[0] != self._tail_inode or o[1] >= consumed]
+        return result
+
+    def _superseded(self, entry_id, position):
+        with self._unwritten_lock:
+            if self._unwritten[entry_id] > 0:
+                return True
+        return any(
+            entry_id in ids and (inode != self._tail_inode or start > position)
+            for inode, start, _, ids in self._own
+        )
+
+    def _follow(self, at_end=True):
+        if self._tail is not None:
+            self._tail.close()
+        self._tail = open(self.journal_path, 'rb')
+        st = os.fstat(self._tail.fileno())
+        self._tail_inode = st.st_ino
+        self._offset = st.st_size if at_end else 0
+        self._own = [o for o in self._own if o[0] == self._tail_inode and o[1] >= self._offset]
+
+    def _caught_up(self):
+        """Whether every record in the journal is reflected in this process's db."""
+        if self._tail is None:
+            return True
+        try:
+            st = os.stat(self.journal_path)
+        except FileNotFoundError:
+            return True
+        if st.st_ino != self._tail_inode:
+            return False
+        position = self._offset
+        for inode, start, end, _ in self._own:
+            if inode != self._tail_inode or start != position:
+                return False
+            position = end
+        return position == st.st_size
+
+    def maybe_compact(self, db):
+        if self.worker is not None and self.worker.checkpointing:
+            return
+        entries = sum(len(bucket) for bucket in db.values())
+        if self.journal_len >= max(self.compact_min, entries):
+            self.compact(db)
+
+    def needs_compact(self):
+        """Whether the journal holds anything a fresh snapshot would fold in."""
+        return self.journal_len > 0
+
+    def compact(self, db):
+        if self.worker is not None:
+            # Only the color list is taken here; the worker reads the buckets
+            # while this thread keeps editing them.
+            self.worker.checkpoint(db, list(db))
+            self.journal_len = 0
+            return
+        with file_lock(self.lock_path):
+            if not self._caught_up():
+                return  # other processes' edits would be left out; poll first
+            self._write_snapshot(db, list(db))
+            if os.path.exists(self.old_journal_path):
+                os.remove(self.old_journal_path)
+            # Replaying an old journal over the new snapshot is idempotent, so
+            # a crash between the two renames loses nothing.
+            self._new_journal()
+            self._follow()
+        self.journal_len = 0
+
+    def _checkpoint(self, db, colors):
+        # A fuzzy checkpoint: edits made while the snapshot is written may or
+        # may not be in it, but all of them are in the fresh journal, and
+        # replaying a put or delete over a state that already has it is a
+        # no-op.  The set-aside journal covers everything before this point
+        # until the snapshot is in place.
+        with file_lock(self.lock_path):
+            if not self._caught_up():
+                return
+            self._set_journal_aside()
+            self._write_snapshot(db, colors)
+            os.remove(self.old_journal_path)
+            self._follow()
+
+    def _touched(self, color):
+        """Called for every journal record that reaches the db."""
+
+    def _write_snapshot(self, db, colors):
+        if self.binary:
+            write_binary(self.binary_path, SettledDB(db, colors))
+            return
+        write_json_atomic(self.path, SettledDB(db, colors))
+        write_index(self.path)
+        if os.path.exists(self.binary_path):
+            os.remove(self.binary_path)  # it would shadow the new snapshot
+
+    def _set_journal_aside(self):
+        if not os.path.exists(self.old_journal_path):
+            if os.path.exists(self.journal_path):
+                os.replace(self.journal_path, self.old_journal_path)
+            else:
+                open(self.old_journal_path, 'w').close()
+        else:
+            # Left over from a checkpoint that did not finish: keep its records.
+            with open(self.journal_path, 'a+b') as src, open(self.old_journal_path, 'ab') as dst:
+                src.seek(0)
+                shutil.copyfileobj(src, dst)
+                dst.flush()
+                os.fsync(dst.fileno())
+        self._new_journal()
+
+    def _new_journal(self):
+        # Replaced rather than truncated: another process may still be
+        # reading the old one through its own handle.
+        tmp_path = self.journal_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.journal_path)
+
+    def flush(self, timeout=None):
+        """Wait until every mutation so far is on disk."""
+        if self.worker is None:
+            return True
+        return self.worker.flush(timeout)
+
+    def close(self):
+        if self.worker is not None:
+            self.worker.close()
+        if self._tail is not None:
+            self._tail.close()
+            self._tail = None
+
+
+class SettledDB:
+    """Just enough of a db for ``dump_snapshot`` while another thread edits it.
+
+    Each bucket is copied to a list of items as it is reached, so a concurrent
+    insert or delete cannot break the iteration.
+    """
+
+    def __init__(self, db, colors):
+        self._db = db
+        self._colors = colors
+
+    def __bool__(self):
+        return bool(self._colors)
+
+    def items(self):
+        for color in self._colors:
+            yield color, SettledBucket(self._db.get(color, {}))
+
+
+class SettledBucket:
+    def __init__(self, bucket):
+        self._bucket = bucket
+
+    def __bool__(self):
+        return len(self._bucket) > 0
+
+    def items(self):
+        while True:
+            try:
+                return list(self._bucket.items())
+            except RuntimeError:
+                continue  # resized mid-copy by the GUI thread; take it again
+
+
+# Built once: json.dumps with non-default options makes a new encoder per call.
+JOURNAL_ENCODER = json.JSONEncoder(separators=(",", ":"), default=jsonable)
+
+
+def _journal_line(record):
+    return JOURNAL_ENCODER.encode(record) + "\n"
+
+
+def apply_record(db, record):
+    color = record["color"]
+    entry_id = record["uuid"]
+    if record["op"] == "put":
+        db.setdefault(color, {})[entry_id] = Minifig.from_dict(record["entry"])
+    elif record["op"] == "del":
+        db.get(color, {}).pop(entry_id, None)
+
+
+def write_json_atomic(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        dump_snapshot(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def open_storage(path, json_path="lego_db.json", background=False, binary=False):
+    """Pick the backend from the path.
+
+    ``.sqlite`` files and ``.shards`` directories migrate ``json_path`` once.
+    ``binary`` makes a JSON-file backend write ``lego_db.bin`` snapshots.
+    """
+    if path.endswith((".sqlite", ".sqlite3", ".db")):
+        from lego_sqlite import SqliteStorage
+        return SqliteStorage(path, migrate_from=json_path)
+    if path.endswith(".shards"):
+        from lego_shards import ShardedStorage
+        return ShardedStorage(path, migrate_from=json_path, background=background)
+    return JournalStorage(path, background=background, binary=binary)
@@ -0,0 +1,322 @@
+import uuid
+
+from lego_changes import ChangeTracker
+from lego_filter import BitmapIndex
+from lego_history import History
+from lego_index import NameIndex, UuidIndex
+from lego_query import filter_by_bitmap, group_by_color
+from lego_record import MISSING
+from lego_stats import StatsIndex
+from lego_storage import apply_record, open_storage
+from lego_trigram import TrigramIndex, ranked_search
+
+
+class LegoStore:
+    """GUI-free data access for the LEGO database.
+
+    Owns the storage backend, the in-memory ``db`` (or the SQLite view of
+    it), the name, uuid, attribute and trigram indexes, the per-color stats,
+    the change tracker and the undo history.  The crudjson apps only read their widgets and call into this.
+    Errors a user can fix, such as a duplicate name, are raised as
+    ``ValueError`` with a displayable message.
+    """
+
+    def __init__(self, storage):
+        self.storage = storage
+        self.names = NameIndex()
+        self.uuids = UuidIndex()
+        self.bitmap = BitmapIndex()
+        self.trigrams = TrigramIndex()
+        self.stats = StatsIndex()
+        self.changes = ChangeTracker()
+        self.history = History()
+        self.db = self.storage.load()
+        self.stats.bind(self.db, self.storage.counts if self.storage.indexed else None)
+        if not self.storage.indexed:
+            self.names.bind(self.db)
+            self.uuids.bind(self.db)
+            self.bitmap.bind(self.db)
+            self.trigrams.bind(self.db)
+
+    @classmethod
+    def open(cls, path, json_path="lego_db.json", background=False, binary=False):
+        return cls(open_storage(path, json_path, background, binary))
+
+    def name_exists(self, name):
+        if self.storage.indexed:
+            return self.storage.name_exists(name)
+        return name in self.names
+
+    def find(self, entry_id):
+        """Return the color holding ``entry_id``, or None."""
+        if self.storage.indexed:
+            return self.storage.find(entry_id)
+        return self.uuids.get(entry_id)
+
+    def get(self, entry_id):
+        color = self.find(entry_id)
+        return None if color is None else self.db[color][entry_id]
+
+    def add(self, color, entry, unique=True):
+        name = entry.get("name", "").strip()
+        if unique and self.name_exists(name):
+            raise ValueError(f"A LEGO man named '{name}' already exists.")
+        entry_id = str(uuid.uuid4())
+        self._insert(color, entry_id, entry)
+        self.history.record(("delete", entry_id))
+        return entry_id
+
+    def update(self, entry_id, fields):
+        """Apply ``fields`` to an entry; blank strings leave a field untouched.
+
+        Returns the entry's color, or None when there is no such entry.
+        """
+        values = {
+            key: value for key, value in fields.items()
+            if isinstance(value, bool) or value.strip()
+        }
+        change = self._set_fields(entry_id, values)
+        if change is None:
+            return None
+        color, old = change
+        if old:
+            self.history.record(("update", entry_id, old))
+        return color
+
+    def delete(self, entry_id):
+        """Remove an entry; returns its color, or None when there is none."""
+        removed = self._remove(entry_id)
+        if removed is None:
+            return None
+        color, entry = removed
+        self.history.record(("insert", color, entry_id, entry))
+        return color
+
+    def undo(self):
+        """Revert the latest edit; returns ``(color, uuid)`` of the entry.
+
+        None when there is nothing to undo.  A step whose entry another
+        instance has since deleted is dropped.
+        """
+        while True:
+            step = self.history.pop_undo()
+            if step is None:
+                return None
+            done = self._replay(step)
+            if done is not None:
+                location, inverse = done
+                self.history.push_redo(inverse)
+                return location
+
+    def redo(self):
+        """Re-apply the latest undone edit; like ``undo`` otherwise."""
+        while True:
+            step = self.history.pop_redo()
+            if step is None:
+                return None
+            done = self._replay(step)
+            if done is not None:
+                location, inverse = done
+                self.history.push_undo(inverse)
+                return location
+
+    def _replay(self, step):
+        """Apply a history step; returns ``((color, uuid), inverse step)`` or None."""
+        op = step[0]
+        if op == "delete":
+            _, entry_id = step
+            removed = self._remove(entry_id)
+            if removed is None:
+                return None
+            color, entry = removed
+            return (color, entry_id), ("insert", color, entry_id, entry)
+        if op == "insert":
+            _, color, entry_id, entry = step
+            if self.find(entry_id) is not None:
+                return None
+            self._insert(color, entry_id, entry)
+            return (color, entry_id), ("delete", entry_id)
+        _, entry_id, fields = step
+        change = self._set_fields(entry_id, fields)
+        if change is None:
+            return None
+        color, old = change
+        return (color, entry_id), ("update", entry_id, old)
+
+    def _insert(self, color, entry_id, entry):
+        self.names.add(entry.get("name", ""), color, entry_id)
+        self.uuids.add(entry_id, color)
+        self.bitmap.add(color, entry_id, entry)
+        self.trigrams.add(color, entry_id, entry)
+        self.stats.add(color, entry)
+        self.changes.touch(color, entry_id, entry)
+        self.storage.put(color, entry_id, entry)
+        self.storage.maybe_compact(self.db)
+
+    def _set_fields(self, entry_id, values):
+        """Set fields (``MISSING`` removes one); returns ``(color, old values)``.
+
+        ``old values`` maps each field that changed to its previous value.
+        """
+        color = self.find(entry_id)
+        if color is None:
+            return None
+        entry = self.db[color][entry_id]
+        self.names.discard(entry.get("name", ""), color, entry_id)
+        self.bitmap.discard(entry_id, entry)
+        self.trigrams.discard(entry_id)
+        self.stats.discard(color, entry)
+        old = {}
+        for key, value in values.items():
+            previous = entry.get(key, MISSING)
+            if previous != value:
+                old[key] = previous
+            if value is MISSING:
+                entry.pop(key, None)
+            else:
+                entry[key] = value
+        self.changes.touch(color, entry_id, old)
+        self.names.add(entry.get("name", ""), color, entry_id)
+        self.bitmap.add(color, entry_id, entry)
+        self.trigrams.add(color, entry_id, entry)
+        self.stats.add(color, entry)
+        self.storage.put(color, entry_id, entry)
+        self.storage.maybe_compact(self.db)
+        return color, old
+
+    def _remove(self, entry_id):
+        color = self.find(entry_id)
+        if color is None:
+            return None
+        entry = self.db[color][entry_id]
+        self.names.discard(entry.get("name", ""), color, entry_id)
+        self.uuids.discard(entry_id)
+        self.bitmap.discard(entry_id, entry)
+        self.trigrams.discard(entry_id)
+        self.stats.discard(color, entry)
+        self.changes.forget(color, entry_id)
+        self.storage.delete(color, entry_id)
+        self.storage.maybe_compact(self.db)
+        return color, entry
+
+    def search(self, query, cancelled=lambda: False, filters=None):
+        """Entries matching ``query``, as ``{color: {uuid: entry}}``.
+
+        The JSON backend ranks entries with ``query`` in any text field
+        first, then close fuzzy matches (see ``ranked_search``); SQLite
+        does the substring part only.  ``filters`` are attribute clauses from
+        ``lego_filter.parse_filter``.  Safe to call from a worker thread for
+        the JSON backend; returns None if ``cancelled`` fires.
+        """
+        query = query.strip().lower()
+        if self.storage.indexed:
+            return self.storage.search(query, filters)
+        if not query:
+            if filters:
+                return filter_by_bitmap(self.db, self.bitmap, filters, "", cancelled)
+            return self.db
+        hits = ranked_search(self.trigrams, self.bitmap, query, cancelled)
+        if hits is None:
+            return None
+        allowed = None
+        if filters:
+            allowed = set(self.bitmap.locations(self.bitmap.query(filters)))
+        return group_by_color(self.db, hits, allowed)
+
+    def counts(self):
+        return self.stats.counts()
+
+    def summary(self, color, compute=True):
+        """Aggregates of ``color`` (see ``StatsIndex.summary``).
+
+        With ``compute=False`` a color not tallied yet gives None instead of
+        being parsed here; ``lego_view.SummaryLoader`` tallies it off the GUI
+        thread.  SQLite answers either way, as its rows cannot leave this
+        thread.
+        """
+        return self.stats.summary(color, compute or self.storage.indexed)
+
+    def sync(self):
+        """Apply the edits other processes have made to the shared files.
+
+        Returns ``{(color, uuid): keys}`` for the entries that changed, where
+        ``keys`` are the changed fields, or None for a deleted entry.  The
+        change tracker records them like local edits.  Returns None when the
+        files are locked; call again shortly.
+        """
+        records = self.storage.poll()
+        if records is None:
+            return None
+        delta = {}
+        for record in records:
+            change = self._apply_external(record)
+            if change is None:
+                continue
+            location, keys = change
+            if keys is not None and delta.get(location):
+                keys = keys | delta[location]
+            delta[location] = keys
+        return delta
+
+    def _apply_external(self, record):
+        entry_id = record["uuid"]
+        old_color = self.find(entry_id)
+        old = None
+        if old_color is not None:
+            old = self.db[old_color][entry_id]
+            self.names.discard(old.get("name", ""), old_color, entry_id)
+            self.uuids.discard(entry_id)
+            self.bitmap.discard(entry_id, old)
+            self.trigrams.discard(entry_id)
+            self.stats.discard(old_color, old)
+            if record["op"] == "del" or record["color"] != old_color:
+                del self.db[old_color][entry_id]
+                if record["op"] != "del":
+                    self.changes.forget(old_color, entry_id)
+        apply_record(self.db, record)
+        if record["op"] == "del":
+            if old is None:
+                return None
+            self.changes.forget(old_color, entry_id)
+            return (old_color, entry_id), None
+        color = record["color"]
+        entry = self.db[color][entry_id]
+        self.names.add(entry.get("name", ""), color, entry_id)
+        self.uuids.add(entry_id, color)
+        self.bitmap.add(color, entry_id, entry)
+        self.trigrams.add(color, entry_id, entry)
+        self.stats.add(color, entry)
+        if old is None or old_color != color:
+            keys = set(entry)
+        else:
+            keys = {key for key in set(old) | set(entry) if old.get(key) != entry.get(key)}
+        if not keys:
+            return None
+        self.changes.touch(color, entry_id, keys)
+        return (color, entry_id), keys
+
+    def watched(self):
+        """Files whose changes ``sync`` should be called for."""
+        return list(self.storage.watched)
+
+    def take_changes(self):
+        return self.changes.take()
+
+    def save(self):
+        """Fold the journal into a fresh snapshot and wait for it to land.
+
+        With nothing journaled the snapshot already is the db, so it is left
+        alone rather than parsed and rewritten in full.
+        """
+        # Other processes' edits have to be in the db before a snapshot of
+        # it can replace the journal.
+        self.sync()
+        if self.storage.needs_compact():
+            self.storage.compact(self.db)
+        self.storage.flush()
+
+    def flush(self, timeout=None):
+        return self.storage.flush(timeout)
+
+    def close(self):
+        self.storage.close()
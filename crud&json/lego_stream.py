@@ -0,0 +1,230 @@
+import json
+import mmap
+import os
+import re
+import threading
+from collections.abc import MutableMapping
+
+from lego_record import bucket_from_json, db_from_json, jsonable
+
+# json.dump(..., indent=4) puts every color key at exactly four spaces and every
+# uuid key at exactly eight.  JSON strings cannot hold a raw newline, so these
+# patterns only ever match structure, never text inside a value.
+COLOR_KEY = re.compile(rb',?\n    "((?:[^"\\\n]|\\.)*)": \{')
+BUCKET_CLOSE = b"\n    }"
+ENTRY_KEY = b'\n        "'
+CHUNK = 16 * 1024 * 1024
+# Encodes a flat entry straight into its indent=4 body using the C encoder;
+# json.dump(..., indent=4) would run the pure-Python one over every entry.
+ENTRY_ENCODER = json.JSONEncoder(separators=(",\n            ", ": "))
+SCALARS = (str, bool, int, float, type(None))
+
+
+def load_lazy(path):
+    """Open a ``lego_db.json`` snapshot without parsing the entries.
+
+    Files in the indented layout written by ``save_db`` are only scanned for
+    color boundaries and entry counts (or not at all when the ``.idx`` sidecar
+    from ``write_index`` still matches the file); each bucket is parsed the
+    first time it is touched.  Anything else falls back to ``json.load``.
+    """
+    with open(path, 'rb') as f:
+        head = f.read(7)
+        if head.rstrip() in (b"", b"{}"):
+            return {}
+        if head != b'{\n    "':
+            f.seek(0)
+            return db_from_json(json.load(f))
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        st = os.fstat(f.fileno())
+    buckets = _read_index(path, st)
+    if buckets is None:
+        buckets = _index(mm)
+        if buckets is None:
+            return db_from_json(json.loads(mm[:]))
+        _save_index(path, st, buckets)
+    return LazyDB(mm, buckets)
+
+
+def write_index(path):
+    """Record bucket offsets and counts next to ``path`` for the next startup."""
+    with open(path, 'rb') as f:
+        st = os.fstat(f.fileno())
+        if st.st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            buckets = _index(mm) if mm[:7] == b'{\n    "' else None
+    if buckets is not None:
+        _save_index(path, st, buckets)
+
+
+def _save_index(path, st, buckets):
+    with open(path + ".idx", 'w') as f:
+        json.dump({"size": st.st_size, "mtime_ns": st.st_mtime_ns, "buckets": buckets}, f)
+
+
+def _read_index(path, st):
+    try:
+        with open(path + ".idx", 'r') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if index.get("size") != st.st_size or index.get("mtime_ns") != st.st_mtime_ns:
+        return None
+    return [tuple(bucket) for bucket in index["buckets"]]
+
+
+def _index(mm):
+    buckets = []
+    pos = 1
+    match = COLOR_KEY.match(mm, pos)
+    while match:
+        color = json.loads(b'"' + match.group(1) + b'"')
+        start = match.end() - 1
+        if mm[start:start + 2] == b"{}":
+            end = start + 2
+        else:
+            close = mm.find(BUCKET_CLOSE, start)
+            if close < 0:
+                return None
+            end = close + len(BUCKET_CLOSE)
+        buckets.append((color, start, end, _count_entries(mm, start, end)))
+        pos = end
+        match = COLOR_KEY.match(mm, pos)
+    if mm[pos:].strip() != b"}":
+        return None
+    return buckets
+
+
+def _count_entries(mm, start, end):
+    count = 0
+    overlap = len(ENTRY_KEY) - 1
+    pos = start
+    while pos < end:
+        stop = min(pos + CHUNK, end)
+        count += mm[pos:min(stop + overlap, end)].count(ENTRY_KEY)
+        pos = stop
+    return count
+
+
+def dump_snapshot(db, f):
+    """Write ``db`` to ``f`` byte-for-byte as ``json.dump(db, f, indent=4)`` would."""
+    if not db:
+        f.write("{}")
+        return
+    parts = ["{"]
+    for n, (color, entries) in enumerate(db.items()):
+        parts.append(f'{"," if n else ""}\n    {json.dumps(color)}: ')
+        if not entries:
+            parts.append("{}")
+            continue
+        parts.append("{")
+        for m, (entry_id, entry) in enumerate(entries.items()):
+            parts.append(f'{"," if m else ""}\n        {json.dumps(entry_id)}: {_entry_text(entry)}')
+            if len(parts) >= 4096:
+                f.write("".join(parts))
+                parts = []
+        parts.append("\n    }")
+    parts.append("\n}")
+    f.write("".join(parts))
+
+
+def _entry_text(entry):
+    data = jsonable(entry)
+    if not data:
+        return "{}"
+    if all(isinstance(value, SCALARS) for value in data.values()):
+        return "{\n            " + ENTRY_ENCODER.encode(data)[1:-1] + "\n        }"
+    return json.dumps(data, indent=4, default=jsonable).replace("\n", "\n        ")
+
+
+class LazyDB(MutableMapping):
+    """``{color: bucket}`` whose buckets parse their slice of the file on demand.
+
+    ``parse(mm, start, end)`` turns a slice into ``{uuid: entry}``; the default
+    reads the JSON layout.
+    """
+
+    def __init__(self, mm, buckets, parse=None):
+        self._mm = mm
+        self._buckets = {
+            color: LazyBucket(mm, start, end, count, parse)
+            for color, start, end, count in buckets
+        }
+
+    def __getitem__(self, color):
+        return self._buckets[color]
+
+    def __setitem__(self, color, entries):
+        # Stored as given: setdefault hands the caller this very object back.
+        self._buckets[color] = entries
+
+    def __delitem__(self, color):
+        del self._buckets[color]
+
+    def __iter__(self):
+        return iter(self._buckets)
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def loaded_colors(self):
+        return [
+            color for color, bucket in self._buckets.items()
+            if getattr(bucket, "loaded", True)
+        ]
+
+
+class LazyBucket(MutableMapping):
+    """One color's ``{uuid: entry}``; ``len`` is known up front, the rest parses."""
+
+    def __init__(self, mm, start, end, count, parse=None):
+        self._mm = mm
+        self._span = (start, end)
+        self._count = count
+        self._parse = parse or parse_json_bucket
+        self._entries = None if mm is not None else {}
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._entries is not None
+
+    def _load(self):
+        entries = self._entries
+        if entries is None:
+            with self._lock:
+                if self._entries is None:
+                    self._entries = self._parse(self._mm, *self._span)
+                entries = self._entries
+        return entries
+
+    def __getitem__(self, entry_id):
+        return self._load()[entry_id]
+
+    def __setitem__(self, entry_id, entry):
+        self._load()[entry_id] = entry
+
+    def __delitem__(self, entry_id):
+        del self._load()[entry_id]
+
+    def __contains__(self, entry_id):
+        return entry_id in self._load()
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __len__(self):
+        if self._entries is None:
+            return self._count
+        return len(self._entries)
+
+    def items(self):
+        return self._load().items()
+
+    def values(self):
+        return self._load().values()
+
+
+def parse_json_bucket(mm, start, end):
+    return bucket_from_json(json.loads(mm[start:end]))
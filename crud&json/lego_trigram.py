@@ -0,0 +1,267 @@
+"""Trigram search: substring and typo-tolerant matches over the text fields."""
+import math
+import threading
+from array import array
+from collections import Counter
+from itertools import repeat
+from operator import itemgetter
+
+# Few distinct values each, so they are matched per value through the
+# BitmapIndex bitsets rather than per entry.
+VALUE_FIELDS = ("weapon", "rank", "armor")
+# Substring hits below this count get topped up with fuzzy matches.
+FUZZY_BELOW = 50
+THRESHOLD = 0.3
+CHECK_EVERY = 4096
+
+
+def trigrams(text):
+    """Trigrams of ``text`` padded pg_trgm-style: two spaces in front, one behind.
+
+    Every trigram of a substring of ``text`` is among them, and the padding
+    lets word starts and ends count towards fuzzy matches.
+    """
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(query_grams, text):
+    grams = trigrams(text)
+    shared = len(query_grams & grams)
+    return shared / (len(query_grams) + len(grams) - shared) if shared else 0.0
+
+
+class TrigramIndex:
+    """Trigram -> slots posting lists over the entry names.
+
+    Each entry gets a slot, and its casefolded name posts the slot under each
+    of its trigrams.  Postings are append-only ``array('I')``: ``discard``
+    only frees the slot, and candidates are always checked against the live
+    entry, so stale postings are harmless.  The index rebuilds itself once the
+    freed slots outnumber the live ones.  ``bind`` defers the build to the
+    first search, which may run on a worker thread while the GUI thread keeps
+    calling ``add``/``discard``: the build fills locals, and the changes made
+    meanwhile are queued and replayed once it is swapped in.
+    """
+
+    def __init__(self):
+        self._db = {}
+        self._postings = {}
+        self._slots = []
+        self._slot_of = {}
+        self._free = []
+        self._pending = None
+        self._queued = None  # changes made during a rebuild
+        self._lock = threading.Lock()
+        self._building = threading.Lock()
+
+    def bind(self, db):
+        with self._lock:
+            self._db = db
+            self._pending = db
+
+    def _ensure(self):
+        if self._pending is None and self._queued is None and len(self._free) <= len(self._slot_of):
+            return
+        with self._building:
+            if self._pending is not None or len(self._free) > len(self._slot_of):
+                self.rebuild(self._db)
+
+    def rebuild(self, db):
+        with self._lock:
+            self._db = db
+            self._pending = None
+            self._queued = []
+        slots = []
+        slot_of = {}
+        postings = {}
+        slot = 0
+        for color, entries in list(db.items()):
+            # One snapshot of the bucket, which the GUI thread may be changing.
+            items = list(entries.items())
+            ids = list(map(itemgetter(0), items))
+            slots.extend(zip(repeat(color), ids))
+            slot_of.update(zip(ids, range(slot, slot + len(ids))))
+            for entry in map(itemgetter(1), items):
+                for gram in _name_grams(entry):
+                    try:
+                        postings[gram].append(slot)
+                    except KeyError:
+                        postings[gram] = [slot]
+                slot += 1
+        postings = {gram: array('I', slots) for gram, slots in postings.items()}
+        with self._lock:
+            self._slots = slots
+            self._slot_of = slot_of
+            self._free = []
+            self._postings = postings
+            queued, self._queued = self._queued, None
+            # The build may or may not have seen a queued entry; freeing its
+            # slot first makes each replayed change land the same either way.
+            for color, entry_id, entry in queued:
+                self._discard(entry_id)
+                if color is not None:
+                    self._add(color, entry_id, entry)
+
+    def add(self, color, entry_id, entry):
+        with self._lock:
+            if self._pending is not None:
+                return  # the pending rebuild will pick it up from the db
+            if self._queued is not None:
+                self._queued.append((color, entry_id, entry))
+            else:
+                self._add(color, entry_id, entry)
+
+    def discard(self, entry_id):
+        with self._lock:
+            if self._pending is not None:
+                return
+            if self._queued is not None:
+                self._queued.append((None, entry_id, None))
+            else:
+                self._discard(entry_id)
+
+    def _add(self, color, entry_id, entry):
+        if self._free:
+            slot = self._free.pop()
+            self._slots[slot] = (color, entry_id)
+        else:
+            slot = len(self._slots)
+            self._slots.append((color, entry_id))
+        self._slot_of[entry_id] = slot
+        for gram in _name_grams(entry):
+            posting = self._postings.get(gram)
+            if posting is None:
+                posting = self._postings[gram] = array('I')
+            posting.append(slot)
+
+    def _discard(self, entry_id):
+        slot = self._slot_of.pop(entry_id, None)
+        if slot is not None:
+            self._slots[slot] = None
+            self._free.append(slot)
+
+    def _name(self, slot):
+        location = self._slots[slot]
+        if location is None:
+            return None, ""
+        color, entry_id = location
+        entry = self._db.get(color, {}).get(entry_id)
+        name = entry.get("name") if entry is not None else None
+        if not isinstance(name, str):
+            return None, ""
+        return location, name.casefold()
+
+    def substring(self, query, cancelled=lambda: False):
+        """``(color, uuid)`` of names containing ``query``; None when cancelled."""
+        self._ensure()
+        grams = {query[i:i + 3] for i in range(len(query) - 2)}
+        if not grams:
+            return self._scan(query, cancelled)
+        postings = sorted((self._postings.get(gram, ()) for gram in grams), key=len)
+        candidates = set(postings[0]).intersection(*postings[1:])
+        hits = []
+        for n, slot in enumerate(sorted(candidates)):
+            if n % CHECK_EVERY == 0 and cancelled():
+                return None
+            location, name = self._name(slot)
+            if location is not None and query in name:
+                hits.append(location)
+        return hits
+
+    def _scan(self, query, cancelled):
+        # Under three characters there is no trigram to look up.
+        hits = []
+        n = 0
+        for color, entries in list(self._db.items()):
+            for uid, entry in entries.items():
+                n += 1
+                if n % CHECK_EVERY == 0 and cancelled():
+                    return None
+                if query in entry.get("name", "").casefold():
+                    hits.append((color, uid))
+        return hits
+
+    def fuzzy(self, query, threshold=THRESHOLD, cancelled=lambda: False):
+        """``(similarity, (color, uuid))`` for names at least ``threshold`` alike."""
+        self._ensure()
+        grams = trigrams(query)
+        # An entry with similarity >= threshold shares at least ``need`` of
+        # the query's trigrams; counting postings finds those without
+        # touching any other entry.
+        need = max(1, math.ceil(threshold * len(grams)))
+        counts = Counter()
+        for gram in grams:
+            counts.update(self._postings.get(gram, ()))
+        if cancelled():
+            return None
+        scored = []
+        for n, slot in enumerate(slot for slot, count in counts.items() if count >= need):
+            if n % CHECK_EVERY == 0 and cancelled():
+                return None
+            location, name = self._name(slot)
+            if location is not None:
+                score = similarity(grams, name)
+                if score >= threshold:
+                    scored.append((score, location))
+        return scored
+
+    def __len__(self):
+        self._ensure()
+        return len(self._slot_of)
+
+
+def _name_grams(entry):
+    name = entry.get("name")
+    if isinstance(name, str) and name:
+        return trigrams(name.casefold())
+    return ()
+
+
+def ranked_search(names, bitmap, query, cancelled=lambda: False, threshold=THRESHOLD):
+    """Ranked ``(color, uuid)`` hits for ``query`` over names and ``VALUE_FIELDS``.
+
+    Substring hits come first, names before values.  With fewer than
+    ``FUZZY_BELOW`` of them, fuzzy hits follow, best similarity first; a value
+    field's distinct values are scored once each, not once per entry.
+    Returns None when ``cancelled`` fires.
+    """
+    query = query.strip().casefold()
+    if not query:
+        return []
+    hits = names.substring(query, cancelled)
+    if hits is None:
+        return None
+    substring_bits = 0
+    fuzzy_groups = []
+    grams = trigrams(query)
+    for field in VALUE_FIELDS:
+        for value in bitmap.values(field):
+            if not isinstance(value, str):
+                continue
+            if query in value:
+                substring_bits |= bitmap.bits(field, value)
+            else:
+                score = similarity(grams, value)
+                if score >= threshold:
+                    fuzzy_groups.append((score, bitmap.bits(field, value)))
+    seen = set(hits)
+    for location in bitmap.locations(substring_bits):
+        if location not in seen:
+            seen.add(location)
+            hits.append(location)
+    if len(hits) >= FUZZY_BELOW:
+        return hits
+
+    fuzzy = names.fuzzy(query, threshold, cancelled)
+    if fuzzy is None:
+        return None
+    groups = [(score, [location]) for score, location in fuzzy]
+    groups.extend((score, bitmap.locations(bits)) for score, bits in fuzzy_groups)
+    groups.sort(key=lambda group: -group[0])
+    for _, locations in groups:
+        for location in locations:
+            if location not in seen:
+                seen.add(location)
+                hits.append(location)
+    return hits
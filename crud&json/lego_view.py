@@ -0,0 +1,416 @@
+import threading
+
+from PySide6.QtCore import (
+    QAbstractItemModel, QModelIndex, QObject, QRunnable, QThreadPool, QTimer,
+    Qt, Signal
+)
+from PySide6.QtGui import QColor
+
+from lego_watch import FileWatcher
+
+
+FIELDS = ["name", "helmet", "weapon", "rank", "armor", "has_jetpack"]
+HEADERS = ["Color / UUID", "Name", "Helmet", "Weapon", "Rank", "Armor", "Jetpack"]
+
+CHANGED = QColor("red")
+UNCHANGED = QColor("green")
+GROUP = QColor("#888")
+
+
+class LegoTreeModel(QAbstractItemModel):
+    """Two-level model over ``{color: {uuid: entry}}``.
+
+    Top-level rows are color groups; their children are entries, one column per
+    field.  Entry rows are handed to the view in batches through
+    ``canFetchMore``/``fetchMore``, so a group only materializes the rows the
+    user scrolls to, and ``QTreeView`` only paints the ones in the viewport.
+    Child indexes carry ``color row + 1`` as their internal id; groups use 0.
+    """
+
+    BATCH = 256
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._db = {}
+        self._colors = []
+        self._ids = {}
+        self._rows = {}
+        self._fetched = {}
+        self._changed = {}
+
+    def set_db(self, db, changed):
+        self.beginResetModel()
+        self._db = db
+        self._colors = list(db)
+        self._ids = {}
+        self._rows = {}
+        self._fetched = dict.fromkeys(self._colors, 0)
+        self._changed = changed
+        self.endResetModel()
+
+    def colors(self):
+        return list(self._colors)
+
+    def color_row(self, color):
+        try:
+            return self._colors.index(color)
+        except ValueError:
+            return -1
+
+    def entry_index(self, color, entry_id):
+        """Index of an entry's row, fetching the batches up to it.
+
+        Invalid when the entry is not in the current db (e.g. filtered out).
+        """
+        color_row = self.color_row(color)
+        if color_row < 0:
+            return QModelIndex()
+        rows = self._entry_rows(color)
+        row = rows.get(entry_id)
+        if row is None:
+            return QModelIndex()
+        parent = self.index(color_row, 0)
+        start = self._fetched[color]
+        if row >= start:
+            end = min((row // self.BATCH + 1) * self.BATCH, len(rows))
+            self.beginInsertRows(parent, start, end - 1)
+            self._fetched[color] = end
+            self.endInsertRows()
+        return self.index(row, 0, parent)
+
+    def update_entries(self, delta, changed):
+        """Re-render only the rows ``LegoStore.sync`` reported in ``delta``.
+
+        Edited entries get a ``dataChanged`` on their row.  A group that
+        gained or lost entries drops its fetched rows and fetches them again;
+        the other groups are left alone.  Only valid while the model shows
+        the store's own db, which ``sync`` has already updated.
+        """
+        self._changed = changed
+        by_color = {}
+        for (color, entry_id), keys in delta.items():
+            by_color.setdefault(color, []).append((entry_id, keys))
+        last = len(HEADERS) - 1
+        for color, entries in by_color.items():
+            color_row = self.color_row(color)
+            if color_row < 0:
+                if color not in self._db:
+                    continue
+                color_row = len(self._colors)
+                self.beginInsertRows(QModelIndex(), color_row, color_row)
+                self._colors.append(color)
+                self._fetched[color] = 0
+                self.endInsertRows()
+                continue
+            parent = self.index(color_row, 0)
+            self.dataChanged.emit(parent, parent)  # the "color (count)" label
+            rows = self._entry_rows(color)
+            if any(keys is None or entry_id not in rows for entry_id, keys in entries):
+                self._refetch(color, parent)
+                continue
+            for entry_id, _ in entries:
+                row = rows[entry_id]
+                if row < self._fetched[color]:
+                    self.dataChanged.emit(
+                        self.index(row, 0, parent), self.index(row, last, parent)
+                    )
+
+    def _refetch(self, color, parent):
+        fetched = self._fetched[color]
+        if fetched:
+            self.beginRemoveRows(parent, 0, fetched - 1)
+            self._fetched[color] = 0
+            self._ids.pop(color, None)
+            self._rows.pop(color, None)
+            self.endRemoveRows()
+        else:
+            self._ids.pop(color, None)
+            self._rows.pop(color, None)
+        count = min(fetched, len(self._entry_ids(color)))
+        if count:
+            self.beginInsertRows(parent, 0, count - 1)
+            self._fetched[color] = count
+            self.endInsertRows()
+
+    def _entry_rows(self, color):
+        rows = self._rows.get(color)
+        if rows is None:
+            rows = self._rows[color] = {
+                uid: row for row, uid in enumerate(self._entry_ids(color))
+            }
+        return rows
+
+    def _color_of(self, parent):
+        if parent.isValid() and parent.internalId() == 0 and parent.column() == 0:
+            return self._colors[parent.row()]
+        return None
+
+    def _entry_ids(self, color):
+        ids = self._ids.get(color)
+        if ids is None:
+            ids = self._ids[color] = list(self._db[color])
+        return ids
+
+    def index(self, row, column, parent=QModelIndex()):
+        if not self.hasIndex(row, column, parent):
+            return QModelIndex()
+        if not parent.isValid():
+            return self.createIndex(row, column, 0)
+        return self.createIndex(row, column, parent.row() + 1)
+
+    def parent(self, index):
+        if not index.isValid() or index.internalId() == 0:
+            return QModelIndex()
+        return self.createIndex(index.internalId() - 1, 0, 0)
+
+    def rowCount(self, parent=QModelIndex()):
+        if not parent.isValid():
+            return len(self._colors)
+        color = self._color_of(parent)
+        return self._fetched[color] if color is not None else 0
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(HEADERS)
+
+    def hasChildren(self, parent=QModelIndex()):
+        if not parent.isValid():
+            return bool(self._colors)
+        color = self._color_of(parent)
+        return color is not None and bool(self._db[color])
+
+    def canFetchMore(self, parent):
+        color = self._color_of(parent)
+        return color is not None and self._fetched[color] < len(self._db[color])
+
+    def fetchMore(self, parent):
+        color = self._color_of(parent)
+        if color is None:
+            return
+        start = self._fetched[color]
+        end = min(start + self.BATCH, len(self._entry_ids(color)))
+        if end <= start:
+            return
+        self.beginInsertRows(parent, start, end - 1)
+        self._fetched[color] = end
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        column = index.column()
+        if index.internalId() == 0:
+            color = self._colors[index.row()]
+            if role == Qt.DisplayRole and column == 0:
+                return f"{color} ({len(self._db[color])})"
+            if role == Qt.ForegroundRole:
+                return GROUP
+            return None
+
+        color = self._colors[index.internalId() - 1]
+        entry_id = self._entry_ids(color)[index.row()]
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return entry_id
+            value = self._db[color].get(entry_id, {}).get(FIELDS[column - 1])
+            if isinstance(value, bool):
+                return "true" if value else "false"
+            return value
+        if role == Qt.ForegroundRole:
+            if column == 0:
+                return QColor("orange")
+            changed = self._changed.get((color, entry_id), ())
+            return CHANGED if FIELDS[column - 1] in changed else UNCHANGED
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return HEADERS[section]
+        return None
+
+
+class _SearchSignals(QObject):
+    done = Signal(int, object)
+
+
+class _SearchTask(QRunnable):
+    def __init__(self, generation, search, query, cancel, signals):
+        super().__init__()
+        self.generation = generation
+        self.search = search
+        self.query = query
+        self.cancel = cancel
+        self.signals = signals
+
+    def run(self):
+        try:
+            result = self.search(self.query, self.cancel.is_set)
+        except RuntimeError:
+            # The GUI thread mutated the db mid-scan; it always starts a newer
+            # search right after, so this one is simply dropped.
+            result = None
+        if result is not None and not self.cancel.is_set():
+            self.signals.done.emit(self.generation, result)
+
+
+class SearchController(QObject):
+    """Debounces search-bar input and filters the db on a worker thread.
+
+    ``search(query, cancelled)`` does the filtering and must be safe to call
+    off the GUI thread.  ``schedule`` restarts the debounce timer; ``run_now`` skips it (used after
+    edits).  Starting a search cancels the one in flight, and results come back
+    through a queued signal, tagged with a generation so stale ones are ignored.
+    """
+
+    DELAY_MS = 200
+
+    results_ready = Signal(object)
+
+    def __init__(self, search, parent=None):
+        super().__init__(parent)
+        self._search = search
+        self._query = ""
+        self._generation = 0
+        self._cancel = None
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(1)
+        self._signals = _SearchSignals(self)
+        self._signals.done.connect(self._on_done, Qt.QueuedConnection)
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(self.DELAY_MS)
+        self._timer.timeout.connect(self._start)
+
+    def schedule(self, query):
+        self._query = query
+        self._timer.start()
+
+    def run_now(self, query):
+        self._timer.stop()
+        self._query = query
+        self._start()
+
+    def cancel(self):
+        self._timer.stop()
+        if self._cancel is not None:
+            self._cancel.set()
+            self._cancel = None
+        self._generation += 1
+
+    def shutdown(self):
+        self.cancel()
+        self._pool.waitForDone()
+
+    @property
+    def pool(self):
+        """The worker pool, for other off-thread jobs that should queue behind searches."""
+        return self._pool
+
+    def _start(self):
+        self.cancel()
+        query = self._query.strip().lower()
+        if not query:
+            self.results_ready.emit(self._search("", lambda: False))
+            return
+        self._cancel = threading.Event()
+        self._pool.start(_SearchTask(
+            self._generation, self._search, query, self._cancel, self._signals
+        ))
+
+    def _on_done(self, generation, result):
+        if generation == self._generation:
+            self._cancel = None
+            self.results_ready.emit(result)
+
+
+class _SummarySignals(QObject):
+    done = Signal(str, int, object)
+
+
+class _SummaryTask(QRunnable):
+    def __init__(self, stats, color, version, signals):
+        super().__init__()
+        self.stats = stats
+        self.color = color
+        self.version = version
+        self.signals = signals
+
+    def run(self):
+        try:
+            result = self.stats.tally(self.color)
+        except RuntimeError:
+            result = None  # the bucket changed mid-tally; tried again
+        self.signals.done.emit(self.color, self.version, result)
+
+
+class SummaryLoader(QObject):
+    """Tallies a color's aggregates on a worker so the GUI never parses a bucket.
+
+    ``request(color)`` starts a tally on ``pool`` unless one is running;
+    ``ready`` carries the color once ``store.summary(color, compute=False)``
+    has an answer.  A tally that an edit overtook is redone.
+    """
+
+    ready = Signal(str)
+
+    def __init__(self, store, pool, parent=None):
+        super().__init__(parent)
+        self._stats = store.stats
+        self._pool = pool
+        self._running = set()
+        self._signals = _SummarySignals(self)
+        self._signals.done.connect(self._on_done, Qt.QueuedConnection)
+
+    def request(self, color):
+        if color in self._running:
+            return
+        self._running.add(color)
+        self._pool.start(_SummaryTask(
+            self._stats, color, self._stats.version(color), self._signals
+        ))
+
+    def _on_done(self, color, version, result):
+        self._running.discard(color)
+        if result is None or not self._stats.install(color, result, version):
+            self.request(color)
+        else:
+            self.ready.emit(color)
+
+
+class StoreWatcher(QObject):
+    """Applies other instances' edits to a ``LegoStore`` on the GUI thread.
+
+    A ``FileWatcher`` thread notices the shared files changing; its callback
+    only emits a queued signal, so the store and its indexes are synced
+    here and never touched off the GUI thread.  ``synced`` carries the
+    non-empty deltas from ``LegoStore.sync``; a sync that finds the files
+    locked is retried after ``RETRY_MS``.
+    """
+
+    RETRY_MS = 100
+
+    synced = Signal(object)
+    _changed = Signal()
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self._store = store
+        self._changed.connect(self._sync, Qt.QueuedConnection)
+        self._retry = QTimer(self)
+        self._retry.setSingleShot(True)
+        self._retry.setInterval(self.RETRY_MS)
+        self._retry.timeout.connect(self._sync)
+        paths = store.watched()
+        self._watcher = FileWatcher(paths, self._changed.emit) if paths else None
+
+    def stop(self):
+        self._retry.stop()
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
+
+    def _sync(self):
+        delta = self._store.sync()
+        if delta is None:
+            self._retry.start()
+        elif delta:
+            self.synced.emit(delta)
@@ -0,0 +1,117 @@
+"""Notice other processes changing the database files."""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+
+IN_MODIFY = 0x002
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+WATCH_MASK = IN_MODIFY | IN_MOVED_TO | IN_CREATE | IN_DELETE
+# struct inotify_event: wd, mask, cookie, len, then ``len`` bytes of name.
+EVENT = struct.Struct("iIII")
+
+
+class FileWatcher:
+    """Calls ``callback()`` from a background thread when one of ``paths`` changes.
+
+    On Linux it uses inotify on the files' directories, so a file replaced by
+    a rename is still followed.  Elsewhere, or with ``inotify=False``, it
+    compares ``os.stat`` results every ``interval`` seconds.  Changes that
+    arrive together produce one callback.
+    """
+
+    def __init__(self, paths, callback, interval=0.5, inotify=True):
+        self.paths = {os.path.abspath(path) for path in paths}
+        self.callback = callback
+        self.interval = interval
+        self._stop = threading.Event()
+        watch = _inotify_watch(self.paths) if inotify else None
+        self._fd, self._dirs = watch if watch is not None else (None, {})
+        self.mode = "poll" if self._fd is None else "inotify"
+        self._seen = self._stats() if self._fd is None else None
+        self._thread = threading.Thread(target=self._run, name="lego-watch", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _run(self):
+        if self._fd is not None:
+            self._read_events()
+        else:
+            self._poll()
+
+    def _read_events(self):
+        while not self._stop.is_set():
+            ready, _, _ = select.select([self._fd], [], [], self.interval)
+            if not ready:
+                continue
+            try:
+                data = os.read(self._fd, 65536)
+            except BlockingIOError:
+                continue
+            if any(path in self.paths for path in _event_paths(data, self._dirs)):
+                self.callback()
+
+    def _poll(self):
+        while not self._stop.wait(self.interval):
+            current = self._stats()
+            if current != self._seen:
+                self._seen = current
+                self.callback()
+
+    def _stats(self):
+        stats = {}
+        for path in self.paths:
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                stats[path] = None
+            else:
+                stats[path] = (st.st_ino, st.st_size, st.st_mtime_ns)
+        return stats
+
+
+def _inotify_watch(paths):
+    """An inotify fd watching the directories of ``paths`` and its ``{wd: directory}``.
+
+    None where inotify is not available.
+    """
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        init, add_watch = libc.inotify_init1, libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    fd = init(os.O_NONBLOCK | os.O_CLOEXEC)
+    if fd < 0:
+        return None
+    dirs = {}
+    for directory in {os.path.dirname(path) for path in paths}:
+        wd = add_watch(fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            os.close(fd)
+            return None
+        dirs[wd] = directory
+    return fd, dirs
+
+
+def _event_paths(data, dirs):
+    offset = 0
+    while offset + EVENT.size <= len(data):
+        wd, _, _, length = EVENT.unpack_from(data, offset)
+        offset += EVENT.size
+        name = data[offset:offset + length].rstrip(b"\0")
+        offset += length
+        if wd in dirs:
+            yield os.path.join(dirs[wd], os.fsdecode(name))
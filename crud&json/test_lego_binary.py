@@ -0,0 +1,52 @@
+import pytest
+
+from lego_binary import SnapshotError, load_binary, write_binary
+from lego_record import Minifig
+
+DB = {
+    "red": {
+        "a": Minifig(name="Col Canine", helmet=False, weapon="flame", rank="Colonel",
+                     armor="Steel", has_jetpack=True),
+        "b": {"name": "Zoë ☃", "helmet": True, "rank": "Colonel"},
+        "c": {"name": "Odd", "helmet": "yes", "weapon": 7, "cape": {"color": "red"}},
+    },
+    "teal": {"d": {}},
+    "empty": {},
+}
+
+
+def test_round_trip_keeps_every_value(tmp_path):
+    path = str(tmp_path / "lego_db.bin")
+    write_binary(path, DB)
+    db = load_binary(path)
+
+    assert list(db) == ["red", "teal", "empty"]
+    assert {color: dict(entries) for color, entries in db.items()} == DB
+    assert db["red"]["c"]["helmet"] == "yes"
+    assert "weapon" not in db["red"]["b"]
+
+
+def test_buckets_decode_on_first_use(tmp_path):
+    path = str(tmp_path / "lego_db.bin")
+    write_binary(path, DB)
+    db = load_binary(path)
+
+    assert len(db["red"]) == 3
+    assert db.loaded_colors() == []
+    assert db["teal"]["d"] == {}
+    assert db.loaded_colors() == ["teal"]
+
+
+def test_corruption_is_detected(tmp_path):
+    path = tmp_path / "lego_db.bin"
+    write_binary(str(path), DB)
+    data = bytearray(path.read_bytes())
+    data[-3] ^= 0xFF
+    path.write_bytes(data)
+    db = load_binary(str(path))
+    with pytest.raises(SnapshotError, match="checksum"):
+        len(db["empty"]), db["empty"].items()
+
+    path.write_bytes(data[:-1])
+    with pytest.raises(SnapshotError):
+        load_binary(str(path))
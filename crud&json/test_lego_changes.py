@@ -0,0 +1,46 @@
+from lego_changes import ChangeTracker
+
+
+def test_take_returns_dirty_keys_and_resets():
+    changes = ChangeTracker()
+    changes.touch("red", "a", ["name", "rank"])
+    changes.touch("red", "a", ["armor"])
+
+    assert changes.take() == {("red", "a"): {"name", "rank", "armor"}}
+    assert changes.take() == {}
+
+
+def test_versions_count_changes_per_entry():
+    changes = ChangeTracker()
+    changes.touch("red", "a", ["name"])
+    changes.touch("red", "a", ["rank"])
+    changes.touch("red", "a", [])
+    assert changes.version("a") == 2
+    assert changes.version("missing") == 0
+
+
+def test_versions_are_never_reused():
+    changes = ChangeTracker()
+    changes.touch("red", "a", ["name"])
+    first = changes.version("a")
+    changes.forget("red", "a")
+    changes.touch("red", "a", ["name"])
+    assert changes.version("a") > first
+
+
+def test_color_version_moves_on_touch_and_forget():
+    changes = ChangeTracker()
+    assert changes.color_version("red") == 0
+    changes.touch("red", "a", ["name"])
+    touched = changes.color_version("red")
+    changes.forget("red", "a")
+    assert changes.color_version("red") > touched
+    assert changes.color_version("blue") == 0
+
+
+def test_forget_drops_deleted_entry():
+    changes = ChangeTracker()
+    changes.touch("red", "a", ["name"])
+    changes.forget("red", "a")
+    assert changes.take() == {}
+    assert changes.version("a") == 0
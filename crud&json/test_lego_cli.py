@@ -0,0 +1,96 @@
+import io
+import json
+
+import lego_cli
+from lego_storage import JournalStorage
+
+ALPHA_ID = "c343666d-da53-4198-a376-485c00023df4"
+EXISTING = {"red": {ALPHA_ID: {"name": "Col Canine", "helmet": False}}}
+
+
+def make_db(tmp_path):
+    path = tmp_path / "lego_db.json"
+    path.write_text(json.dumps(EXISTING, indent=4))
+    return str(path)
+
+
+def test_import_jsonl_validates_and_dedupes(tmp_path, capsys):
+    db_path = make_db(tmp_path)
+    source = tmp_path / "in.jsonl"
+    source.write_text("\n".join([
+        json.dumps({"color": "blue", "name": "mr bean", "helmet": "yes", "rank": "private"}),
+        json.dumps({"color": "blue", "name": "MR BEAN"}),
+        json.dumps({"color": "red", "name": "col canine"}),
+        json.dumps({"name": "No Color"}),
+        "{not json",
+        json.dumps({"color": "green", "name": "Bravo", "uuid": "12345678123456781234567812345678"}),
+    ]) + "\n")
+
+    assert lego_cli.main(["--db", db_path, "import", str(source)]) == 1
+
+    err = capsys.readouterr().err
+    assert "record 2: duplicate name" in err
+    assert "record 3: duplicate name" in err
+    assert "record 4: missing color" in err
+    assert "record 5: invalid JSON" in err
+    assert "imported 2 records (4 rejected)" in err
+
+    db = JournalStorage(db_path).load()
+    (bean,) = db["blue"].values()
+    assert bean == {
+        "name": "mr bean", "helmet": True, "weapon": "", "rank": "private",
+        "armor": "", "has_jetpack": False,
+    }
+    assert "12345678-1234-5678-1234-567812345678" in db["green"]
+
+
+def test_import_writes_one_committed_batch(tmp_path):
+    db_path = make_db(tmp_path)
+    storage = JournalStorage(db_path)
+    db = storage.load()
+    records = [{"color": "blue", "name": f"fig {i}"} for i in range(3)]
+
+    assert lego_cli.import_records(storage, db, records, io.StringIO()) == (3, 0)
+
+    lines = open(storage.journal_path).read().splitlines()
+    assert lines[0] == '{"op":"begin"}'
+    assert lines[-1] == '{"op":"commit"}'
+    assert len(lines) == 5
+
+
+def test_uncommitted_batch_is_dropped_on_replay(tmp_path):
+    db_path = make_db(tmp_path)
+    storage = JournalStorage(db_path)
+    storage.load()
+    storage.put_many([("blue", "b", {"name": "Bravo"})])
+    with open(storage.journal_path, "a") as f:
+        f.write('{"op":"begin"}\n{"op":"put","color":"blue","uuid":"c","entry":{}}\n')
+
+    db = JournalStorage(db_path).load()
+    assert set(db["blue"]) == {"b"}
+
+
+def test_export_csv_round_trips_through_import(tmp_path, capsys):
+    db_path = make_db(tmp_path)
+    out = tmp_path / "out.csv"
+    assert lego_cli.main(["--db", db_path, "export", str(out)]) == 0
+    assert "exported 1 records" in capsys.readouterr().err
+
+    other = str(tmp_path / "other.json")
+    assert lego_cli.main(["--db", other, "import", str(out)]) == 0
+    assert JournalStorage(other).load() == {
+        "red": {ALPHA_ID: {
+            "name": "Col Canine", "helmet": False, "weapon": "", "rank": "",
+            "armor": "", "has_jetpack": False,
+        }},
+    }
+
+
+def test_export_json_writes_the_snapshot_layout(tmp_path):
+    db_path = make_db(tmp_path)
+    storage = JournalStorage(db_path, binary=True)
+    storage.compact(storage.load())
+    target = tmp_path / "lego_db.json"
+
+    assert lego_cli.main(["--db", db_path, "export", str(target)]) == 0
+    assert target.read_text() == json.dumps(EXISTING, indent=4)
@@ -0,0 +1,119 @@
+import pytest
+
+import lego_diff
+from lego_diff import DiffRenderer
+from lego_store import LegoStore
+
+ALPHA = {
+    "name": "Col <Canine>", "helmet": False, "weapon": "flame",
+    "rank": "Colonel", "armor": "Steel", "has_jetpack": True,
+}
+BRAVO = {
+    "name": "mr bean", "helmet": True, "weapon": "guitar",
+    "rank": "private", "armor": "none", "has_jetpack": False,
+}
+
+
+def full_render(db, changes):
+    """The apps' original, uncached renderer."""
+    output = ["<pre>"]
+    for color, entries in db.items():
+        output.append(f'"<span style="color:#888">{color}</span>": {{')
+        for uuid_key, fields in entries.items():
+            output.append(f'  "<span style="color:orange">{uuid_key}</span>": {{')
+            changed = changes.get((color, uuid_key), ())
+            for k, v in fields.items():
+                v_str = ("true" if v else "false") if isinstance(v, bool) else str(v)
+                v_html = v_str.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+                color_code = "red" if k in changed else "green"
+                output.append(
+                    f'    "<span style="color:#888">{k}</span>": '
+                    f'<span style="color:{color_code}">"{v_html}"</span>,'
+                )
+            output.append("  },")
+        output.append("},")
+    output.append("</pre>")
+    return "\n".join(output)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LegoStore.open(str(tmp_path / "lego_db.json"), str(tmp_path / "lego_db.json"))
+
+
+@pytest.fixture
+def rendered(monkeypatch):
+    """Entry ids rendered from scratch, in order."""
+    calls = []
+    render_entry = lego_diff.render_entry
+
+    def counting(entry_id, fields, changed):
+        calls.append(entry_id)
+        return render_entry(entry_id, fields, changed)
+
+    monkeypatch.setattr(lego_diff, "render_entry", counting)
+    return calls
+
+
+def refresh(renderer, store, db=None):
+    changes = store.take_changes()
+    db = store.db if db is None else db
+    html = renderer.render(db, changes, store.changes, complete=db is store.db)
+    assert html == full_render(db, changes)
+    return html
+
+
+def test_edit_rerenders_only_that_entry(store, rendered):
+    renderer = DiffRenderer()
+    a = store.add("red", dict(ALPHA))
+    b = store.add("red", dict(BRAVO))
+    c = store.add("blue", dict(BRAVO, name="other"))
+    refresh(renderer, store)
+    assert sorted(rendered) == sorted([a, b, c])
+
+    rendered.clear()
+    refresh(renderer, store)  # highlights fade
+    assert sorted(rendered) == sorted([a, b, c])
+
+    rendered.clear()
+    store.update(a, {"rank": "General"})
+    refresh(renderer, store)
+    assert rendered == [a]
+
+    rendered.clear()
+    refresh(renderer, store)
+    assert rendered == [a]
+
+    rendered.clear()
+    refresh(renderer, store)
+    assert rendered == []
+
+
+def test_delete_and_undo_render_like_a_full_pass(store, rendered):
+    renderer = DiffRenderer()
+    a = store.add("red", dict(ALPHA))
+    store.add("red", dict(BRAVO))
+    refresh(renderer, store)
+    store.update(a, {"rank": "General"})
+    refresh(renderer, store)
+
+    store.delete(a)
+    refresh(renderer, store)
+    store.undo()
+    refresh(renderer, store)
+    store.undo()
+    refresh(renderer, store)
+    assert store.get(a)["rank"] == "Colonel"
+
+
+def test_search_results_keep_the_full_cache(store, rendered):
+    renderer = DiffRenderer()
+    store.add("red", dict(ALPHA))
+    store.add("red", dict(BRAVO))
+    refresh(renderer, store)
+    refresh(renderer, store)
+
+    rendered.clear()
+    refresh(renderer, store, store.search("bean"))
+    refresh(renderer, store)
+    assert rendered == []
@@ -0,0 +1,140 @@
+import random
+
+import pytest
+
+from lego_filter import BitmapIndex, FilterError, matches, parse_filter
+from lego_record import Minifig
+
+RANKS = ["private", "Captain", "major"]
+COLORS = ["red", "blue", "green"]
+
+
+def make_db(count, seed=7):
+    rng = random.Random(seed)
+    db = {color: {} for color in COLORS}
+    for i in range(count):
+        db[rng.choice(COLORS)][f"id{i}"] = {
+            "name": f"Minifig {i}", "helmet": rng.random() < 0.5,
+            "weapon": rng.choice(["sword", "blaster"]), "rank": rng.choice(RANKS),
+            "armor": "plastic", "has_jetpack": rng.random() < 0.3,
+        }
+    return db
+
+
+def scan(db, clauses):
+    return {
+        (color, uid)
+        for color, entries in db.items()
+        for uid, entry in entries.items()
+        if matches(color, entry, clauses)
+    }
+
+
+def test_parse_filter():
+    assert parse_filter("Blue, helmet, !jetpack, rank=Captain|major") == [
+        [("color", "blue", False)],
+        [("helmet", True, False)],
+        [("has_jetpack", True, True)],
+        [("rank", "captain", False), ("rank", "major", False)],
+    ]
+    assert parse_filter(" , ") == []
+    with pytest.raises(FilterError):
+        parse_filter("height=2")
+    with pytest.raises(FilterError):
+        parse_filter("helmet=maybe")
+
+
+@pytest.mark.parametrize("text", [
+    "blue, helmet, jetpack, rank=captain",
+    "red|green, !helmet",
+    "rank=major|private, weapon=sword, jetpack=false",
+    "!blue, !rank=captain",
+    "purple",
+])
+def test_bitmap_query_matches_linear_scan(text):
+    db = make_db(2000)
+    index = BitmapIndex()
+    index.rebuild(db)
+    clauses = parse_filter(text)
+
+    bits = index.query(clauses)
+    assert set(index.locations(bits)) == scan(db, clauses)
+    assert index.count(clauses) == len(scan(db, clauses))
+
+
+def test_add_discard_and_slot_reuse():
+    db = make_db(50)
+    index = BitmapIndex()
+    index.rebuild(db)
+    clauses = parse_filter("red, rank=captain")
+
+    uid, entry = next(iter(db["red"].items()))
+    index.discard(uid, entry)
+    del db["red"][uid]
+    new = dict(entry, rank="CAPTAIN")
+    index.add("red", "new", new)
+    db["red"]["new"] = new
+
+    assert ("red", "new") in set(index.locations(index.query(clauses)))
+    assert set(index.locations(index.query(clauses))) == scan(db, clauses)
+    assert len(index) == 50
+
+
+def test_many_distinct_values_and_minifig_records():
+    db = {"red": {f"id{i}": Minifig.from_dict({"weapon": f"w{i % 300}"}) for i in range(900)}}
+    index = BitmapIndex()
+    index.rebuild(db)
+    clauses = parse_filter("weapon=W7|w299")
+
+    assert set(index.locations(index.query(clauses))) == scan(db, clauses)
+    assert index.count(parse_filter("helmet")) == 0
+
+
+class Interrupting(dict):
+    """A bucket that runs ``hook`` when a rebuild snapshots it."""
+
+    def __init__(self, entries, hook):
+        super().__init__(entries)
+        self.hook = hook
+
+    def _interrupt(self):
+        hook, self.hook = self.hook, None
+        if hook is not None:
+            hook()
+
+    def __iter__(self):
+        self._interrupt()
+        return super().__iter__()
+
+    def items(self):
+        self._interrupt()
+        return super().items()
+
+
+@pytest.mark.parametrize("text", ["!rank=private", "red, helmet", "!red", "rank=major|captain"])
+def test_changes_during_a_rebuild_are_replayed(text):
+    db = make_db(60)
+    index = BitmapIndex()
+    index.bind(db)
+    new = dict(next(iter(db["red"].values())), rank="major")
+    gone, _ = next(iter(db["red"].items()))
+    edited, entry = next(iter(db["green"].items()))
+
+    def gui_thread():
+        db["red"]["new"] = new  # bucket already indexed
+        index.add("red", "new", new)
+        db["green"]["new2"] = dict(new)  # bucket about to be indexed
+        index.add("green", "new2", db["green"]["new2"])
+        index.discard(gone, db["red"][gone])
+        del db["red"][gone]
+        index.discard(edited, entry)
+        entry["rank"] = "private" if entry["rank"] != "private" else "Captain"
+        index.add("green", edited, entry)
+
+    db["blue"] = Interrupting(db["blue"], gui_thread)
+    clauses = parse_filter(text)
+    found = list(index.locations(index.query(clauses)))
+
+    assert len(found) == len(set(found))
+    assert set(found) == scan(db, clauses)
+    assert len(index) == 61
@@ -0,0 +1,21 @@
+from lego_history import History
+
+
+def test_depth_bounds_undo_steps():
+    history = History(depth=3)
+    for n in range(5):
+        history.record(("delete", str(n)))
+    assert len(history) == 3
+    assert [history.pop_undo() for _ in range(4)] == [
+        ("delete", "4"), ("delete", "3"), ("delete", "2"), None,
+    ]
+
+
+def test_recording_clears_redo():
+    history = History()
+    history.record(("delete", "a"))
+    history.push_redo(history.pop_undo())
+    assert history.can_redo
+    history.record(("delete", "b"))
+    assert not history.can_redo
+    assert history.pop_redo() is None
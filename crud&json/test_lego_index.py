@@ -0,0 +1,56 @@
+from lego_index import NameIndex, UuidIndex
+
+
+def test_lookup_is_case_insensitive():
+    index = NameIndex()
+    index.rebuild({"red": {"a": {"name": "Col Canine"}}})
+    assert "col canine" in index
+    assert "COL CANINE" in index
+    assert index.lookup("Col canine") == ("red", "a")
+    assert "mr bean" not in index
+
+
+def test_add_and_discard():
+    index = NameIndex()
+    index.add("Bravo", "blue", "b")
+    assert "bravo" in index
+    index.discard("Bravo", "blue", "b")
+    assert "bravo" not in index
+    assert len(index) == 0
+
+
+def test_discard_keeps_legacy_duplicate_visible():
+    index = NameIndex()
+    index.rebuild({
+        "red": {"a": {"name": "Twin"}},
+        "blue": {"b": {"name": "twin"}},
+    })
+    assert len(index) == 2
+
+    index.discard("Twin", "red", "a")
+    assert index.lookup("twin") == ("blue", "b")
+
+    index.discard("twin", "blue", "b")
+    assert "twin" not in index
+
+
+def test_discard_of_unknown_location_is_ignored():
+    index = NameIndex()
+    index.add("Alpha", "red", "a")
+    index.discard("Alpha", "blue", "zzz")
+    assert index.lookup("alpha") == ("red", "a")
+
+
+def test_uuid_index_defers_build_until_first_lookup():
+    db = {"red": {"a": {"name": "Alpha"}}, "blue": {"b": {"name": "Bravo"}}}
+    index = UuidIndex()
+    index.bind(db)
+    index.add("c", "green")  # already in db by the time the build runs
+    db["green"] = {"c": {"name": "Charlie"}}
+
+    assert index.get("b") == "blue"
+    assert index.get("c") == "green"
+    assert "z" not in index
+    index.discard("a")
+    assert index.get("a") is None
+    assert len(index) == 2
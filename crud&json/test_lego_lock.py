@@ -0,0 +1,22 @@
+import pytest
+
+from lego_lock import file_lock
+
+
+def test_exclusive_lock_blocks_other_holders(tmp_path):
+    path = str(tmp_path / "db.lock")
+    with file_lock(path):
+        with pytest.raises(BlockingIOError):
+            with file_lock(path, shared=True, blocking=False):
+                pass
+    with file_lock(path, shared=True, blocking=False):
+        pass
+
+
+def test_shared_locks_coexist(tmp_path):
+    path = str(tmp_path / "db.lock")
+    with file_lock(path, shared=True):
+        with file_lock(path, shared=True, blocking=False):
+            with pytest.raises(BlockingIOError):
+                with file_lock(path, blocking=False):
+                    pass
@@ -0,0 +1,51 @@
+import threading
+
+import pytest
+
+from lego_persist import PersistWorker
+
+
+def test_burst_is_written_once_in_order():
+    written = []
+    gate = threading.Event()
+
+    def write(lines):
+        gate.wait()
+        written.append(list(lines))
+
+    worker = PersistWorker(write, lambda: None, delay=0)
+    worker.submit(["a"])
+    worker.submit(["b"])
+    worker.submit(["c", "d"])
+    gate.set()
+    assert worker.flush(timeout=5)
+    worker.close()
+
+    assert [line for batch in written for line in batch] == ["a", "b", "c", "d"]
+    assert worker.writes == len(written) <= 2
+
+
+def test_checkpoint_runs_after_earlier_lines():
+    events = []
+    worker = PersistWorker(events.extend, lambda tag: events.append(tag))
+    worker.submit(["a"])
+    worker.checkpoint("checkpoint")
+    worker.submit(["b"])
+    worker.close()
+
+    assert events == ["a", "checkpoint", "b"]
+    assert not worker.checkpointing
+
+
+def test_flush_reraises_worker_error_once():
+    def write(lines):
+        raise OSError("disk full")
+
+    worker = PersistWorker(write, lambda: None)
+    worker.submit(["a"])
+    with pytest.raises(OSError, match="disk full"):
+        worker.flush(timeout=5)
+    assert worker.flush(timeout=5)
+    worker.close()
+    with pytest.raises(RuntimeError):
+        worker.submit(["b"])
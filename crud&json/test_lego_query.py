@@ -0,0 +1,36 @@
+from lego_filter import BitmapIndex, parse_filter
+from lego_query import filter_by_bitmap, group_by_color
+
+DB = {
+    "red": {"a": {"name": "Col Canine", "helmet": True}},
+    "blue": {"b": {"name": "mr bean"}, "c": {"name": "Captain Bean", "helmet": True}},
+}
+
+
+def make_bitmap():
+    bitmap = BitmapIndex()
+    bitmap.bind(DB)
+    return bitmap
+
+
+def test_filter_keeps_color_groups_and_checks_names():
+    clauses = parse_filter("helmet")
+    assert filter_by_bitmap(DB, make_bitmap(), clauses) == {
+        "red": {"a": DB["red"]["a"]},
+        "blue": {"c": DB["blue"]["c"]},
+    }
+    assert filter_by_bitmap(DB, make_bitmap(), clauses, "bean") == {
+        "red": {},
+        "blue": {"c": DB["blue"]["c"]},
+    }
+
+
+def test_cancelled_filter_returns_none():
+    assert filter_by_bitmap(DB, make_bitmap(), parse_filter("blue"), cancelled=lambda: True) is None
+
+
+def test_group_by_color_keeps_hit_order_and_skips_disallowed():
+    hits = [("blue", "c"), ("red", "a"), ("blue", "b"), ("blue", "gone")]
+    grouped = group_by_color(DB, hits, allowed={("blue", "c"), ("blue", "b"), ("blue", "gone")})
+    assert grouped == {"red": {}, "blue": {"c": DB["blue"]["c"], "b": DB["blue"]["b"]}}
+    assert list(grouped["blue"]) == ["c", "b"]
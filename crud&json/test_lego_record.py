@@ -0,0 +1,47 @@
+import json
+
+from lego_record import Minifig, db_from_json
+
+ENTRY = {
+    "name": "Col Canine", "helmet": False, "weapon": "flame",
+    "rank": "Colonel", "armor": "Steel", "has_jetpack": True,
+}
+
+
+def test_round_trips_the_json_schema():
+    fig = Minifig.from_dict(ENTRY)
+    assert fig.to_dict() == ENTRY
+    assert list(fig) == list(ENTRY)
+    assert json.loads(json.dumps(fig, default=dict)) == ENTRY
+
+
+def test_behaves_like_the_dict_it_replaces():
+    fig = Minifig.from_dict(ENTRY)
+    assert fig == ENTRY
+    assert fig["rank"] == "Colonel"
+    assert fig.get("missing", "x") == "x"
+    fig["rank"] = "General"
+    assert dict(fig.items())["rank"] == "General"
+
+
+def test_missing_and_unknown_keys_are_preserved():
+    partial = {"name": "Solo", "pet": "porg"}
+    fig = Minifig.from_dict(partial)
+    assert fig.to_dict() == partial
+    assert "helmet" not in fig
+    assert len(fig) == 2
+    del fig["pet"]
+    assert fig.to_dict() == {"name": "Solo"}
+
+
+def test_repeated_strings_are_interned():
+    a = Minifig.from_dict(json.loads(json.dumps(ENTRY)))
+    b = Minifig.from_dict(json.loads(json.dumps(ENTRY)))
+    assert a.rank is b.rank
+    assert a.armor is b.armor
+
+
+def test_db_from_json_converts_every_entry():
+    db = db_from_json({"red": {"a": ENTRY}})
+    assert isinstance(db["red"]["a"], Minifig)
+    assert db == {"red": {"a": ENTRY}}
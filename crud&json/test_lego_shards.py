@@ -0,0 +1,93 @@
+import json
+import os
+
+from lego_shards import MANIFEST, ShardedStorage
+from lego_storage import JournalStorage, apply_record
+
+
+def make_storage(tmp_path, **kwargs):
+    return ShardedStorage(str(tmp_path / "lego.shards"), **kwargs)
+
+
+def manifest(tmp_path):
+    return json.loads((tmp_path / "lego.shards" / MANIFEST).read_text())["shards"]
+
+
+def shard_files(tmp_path):
+    return sorted(name for name in os.listdir(tmp_path / "lego.shards") if name.endswith(".shard.json"))
+
+
+def test_migrates_single_file_once(tmp_path):
+    json_path = str(tmp_path / "lego_db.json")
+    source = JournalStorage(json_path)
+    source_db = source.load()
+    source.put("red", "a", {"name": "Alpha"})
+    source.compact(source_db)
+    source.put("blue", "b", {"name": "Bravo"})
+
+    db = make_storage(tmp_path, migrate_from=json_path).load()
+    assert db == {"red": {"a": {"name": "Alpha"}}, "blue": {"b": {"name": "Bravo"}}}
+    assert set(manifest(tmp_path)) == {"red", "blue"}
+
+    source.put("green", "c", {"name": "Charlie"})
+    assert "green" not in make_storage(tmp_path, migrate_from=json_path).load()
+
+
+def test_compact_rewrites_only_touched_shards(tmp_path):
+    storage = make_storage(tmp_path)
+    db = storage.load()
+    storage.put("red", "a", {"name": "Alpha"})
+    storage.put("blue", "b", {"name": "Bravo"})
+    storage.compact(db)
+    before = manifest(tmp_path)
+
+    storage.put("red", "a", {"name": "Alpha Prime"})
+    storage.compact(db)
+    after = manifest(tmp_path)
+    assert after["blue"] == before["blue"]
+    assert after["red"] != before["red"]
+    assert shard_files(tmp_path) == sorted(after.values())
+    assert make_storage(tmp_path).load() == {
+        "red": {"a": {"name": "Alpha Prime"}}, "blue": {"b": {"name": "Bravo"}},
+    }
+
+
+def test_background_compaction_keeps_edits_made_during_it(tmp_path):
+    storage = make_storage(tmp_path, background=True)
+    db = storage.load()
+    storage.put("red", "a", {"name": "Alpha"})
+    storage.compact(db)
+    storage.put("blue", "b", {"name": "Bravo"})
+    storage.close()
+
+    assert make_storage(tmp_path).load() == {
+        "red": {"a": {"name": "Alpha"}}, "blue": {"b": {"name": "Bravo"}},
+    }
+
+
+def test_leftover_shards_of_a_crashed_compaction_are_removed(tmp_path):
+    storage = make_storage(tmp_path)
+    db = storage.load()
+    storage.put("red", "a", {"name": "Alpha"})
+    (tmp_path / "lego.shards" / "red-deadbeef.9.shard.json").write_text("{}")
+    storage.compact(db)
+    assert shard_files(tmp_path) == sorted(manifest(tmp_path).values())
+
+
+def test_compactions_by_two_processes_keep_a_consistent_manifest(tmp_path):
+    first, second = make_storage(tmp_path), make_storage(tmp_path)
+    first_db = first.load()
+    second_db = second.load()
+    first.put("red", "a", {"name": "Alpha"})
+    first.put("blue", "b", {"name": "Bravo"})
+    first.compact(first_db)
+
+    for record in second.poll():
+        apply_record(second_db, record)
+    second.put("blue", "b", {"name": "Bravo Prime"})
+    second.compact(second_db)
+
+    assert shard_files(tmp_path) == sorted(manifest(tmp_path).values())
+    assert make_storage(tmp_path).load() == {
+        "red": {"a": {"name": "Alpha"}}, "blue": {"b": {"name": "Bravo Prime"}},
+    }
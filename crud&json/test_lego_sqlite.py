@@ -0,0 +1,87 @@
+import json
+import threading
+
+from lego_filter import parse_filter
+from lego_sqlite import SqliteStorage
+from lego_storage import JournalStorage, open_storage
+
+ALPHA = {
+    "name": "Col Canine", "helmet": False, "weapon": "flame",
+    "rank": "Colonel", "armor": "Steel", "has_jetpack": True,
+}
+BRAVO = {
+    "name": "mr bean", "helmet": True, "weapon": "guitar",
+    "rank": "private", "armor": "none", "has_jetpack": False,
+}
+
+
+def test_open_storage_picks_backend_by_extension(tmp_path):
+    assert isinstance(open_storage(str(tmp_path / "db.sqlite")), SqliteStorage)
+    assert isinstance(open_storage(str(tmp_path / "db.json")), JournalStorage)
+
+
+def test_put_get_delete_round_trip(tmp_path):
+    storage = SqliteStorage(str(tmp_path / "lego.sqlite"))
+    db = storage.load()
+    storage.put("red", "a", ALPHA)
+    storage.put("blue", "b", BRAVO)
+
+    assert list(db) == ["blue", "red"]
+    assert db["red"]["a"] == ALPHA
+    assert "a" in db.get("red", {})
+    assert "a" not in db.get("blue", {})
+    assert len(db["blue"]) == 1
+
+    storage.delete("red", "a")
+    assert "red" not in db
+    assert db.get("red", {}) == {}
+
+
+def test_name_exists_search_and_counts_run_in_sql(tmp_path):
+    storage = SqliteStorage(str(tmp_path / "lego.sqlite"))
+    storage.load()
+    storage.put("red", "a", ALPHA)
+    storage.put("blue", "b", BRAVO)
+
+    assert storage.name_exists("COL CANINE")
+    assert not storage.name_exists("col")
+    assert storage.counts() == {"red": 1, "blue": 1}
+
+    found = storage.search("bea")
+    assert list(found) == ["blue"]
+    assert dict(found["blue"].items()) == {"b": BRAVO}
+
+
+def test_empty_database_migrates_json_once(tmp_path):
+    json_path = tmp_path / "lego_db.json"
+    json_path.write_text(json.dumps({"red": {"a": ALPHA}}))
+    journal = JournalStorage(str(json_path))
+    journal.load()
+    journal.put("blue", "b", BRAVO)
+
+    storage = SqliteStorage(str(tmp_path / "lego.sqlite"), migrate_from=str(json_path))
+    db = storage.load()
+    assert db["red"]["a"] == ALPHA
+    assert db["blue"]["b"] == BRAVO
+
+    storage.delete("red", "a")
+    reopened = SqliteStorage(str(tmp_path / "lego.sqlite"), migrate_from=str(json_path))
+    assert "red" not in reopened.load()
+
+
+def test_filters_can_be_built_off_the_connection_thread(tmp_path):
+    storage = SqliteStorage(str(tmp_path / "lego.sqlite"))
+    storage.load()
+    storage.put("Red", "a", ALPHA)
+    storage.put("blue", "b", BRAVO)
+    storage.put("blue", "c", dict(ALPHA, name="Col Blue"))
+    clauses = parse_filter("red|BLUE, !helmet")
+    results = []
+
+    worker = threading.Thread(target=lambda: results.append(storage.search("col", clauses)))
+    worker.start()
+    worker.join()
+
+    found, = results
+    assert {color: set(found[color]) for color in found} == {"Red": {"a"}, "blue": {"c"}}
+    assert list(storage.search("", parse_filter("green"))) == []
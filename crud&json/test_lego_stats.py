@@ -0,0 +1,77 @@
+from lego_stats import StatsIndex
+
+
+def _db():
+    return {
+        "red": {
+            "a": {"name": "A", "helmet": True, "has_jetpack": False, "rank": "captain"},
+            "b": {"name": "B", "helmet": False, "has_jetpack": True, "rank": "captain"},
+        },
+        "teal": {"c": {"name": "C", "helmet": True, "has_jetpack": True, "rank": "private"}},
+        "blue": {},
+    }
+
+
+def test_counts_cover_arbitrary_colors_and_skip_empty_buckets():
+    stats = StatsIndex()
+    stats.bind(_db())
+    assert stats.counts() == {"red": 2, "teal": 1}
+
+
+def test_summary_is_computed_then_maintained():
+    db = _db()
+    stats = StatsIndex()
+    stats.bind(db)
+    assert stats.summary("red") == {
+        "count": 2, "helmets": 1, "helmet_ratio": 0.5, "jetpacks": 1,
+        "ranks": {"captain": 2},
+    }
+
+    entry = {"name": "D", "helmet": True, "has_jetpack": True, "rank": "major"}
+    db["red"]["d"] = entry
+    stats.add("red", entry)
+    stats.discard("red", db["red"].pop("b"))
+    summary = stats.summary("red")
+    assert summary["count"] == 2
+    assert summary["helmet_ratio"] == 1.0
+    assert summary["jetpacks"] == 1
+    assert summary["ranks"] == {"captain": 1, "major": 1}
+
+
+def test_last_entry_of_a_color_drops_it():
+    db = _db()
+    stats = StatsIndex()
+    stats.bind(db)
+    stats.summary("teal")
+    stats.discard("teal", db["teal"].pop("c"))
+    assert "teal" not in stats.counts()
+    assert stats.summary("teal") == {
+        "count": 0, "helmets": 0, "helmet_ratio": 0.0, "jetpacks": 0, "ranks": {},
+    }
+
+
+def test_initial_counts_come_from_the_callable():
+    stats = StatsIndex()
+    stats.bind({}, lambda: {"red": 7})
+    assert stats.counts() == {"red": 7}
+    stats.add("red", {"name": "X"})
+    assert stats.counts() == {"red": 8}
+
+
+def test_a_tally_overtaken_by_an_edit_is_not_installed():
+    db = _db()
+    stats = StatsIndex()
+    stats.bind(db)
+    assert stats.summary("red", compute=False) is None
+
+    version = stats.version("red")
+    tally = stats.tally("red")
+    entry = {"name": "D", "helmet": True, "rank": "major"}
+    db["red"]["d"] = entry
+    stats.add("red", entry)
+    assert not stats.install("red", tally, version)
+    assert stats.summary("red", compute=False) is None
+
+    version = stats.version("red")
+    assert stats.install("red", stats.tally("red"), version)
+    assert stats.summary("red", compute=False)["ranks"] == {"captain": 2, "major": 1}
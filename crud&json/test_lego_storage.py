@@ -0,0 +1,206 @@
+import json
+
+import pytest
+
+from lego_binary import SnapshotError
+from lego_lock import file_lock
+from lego_storage import JournalStorage, apply_record
+
+
+def make_storage(tmp_path, **kwargs):
+    return JournalStorage(str(tmp_path / "lego_db.json"), **kwargs)
+
+
+def test_load_missing_files_returns_empty_db(tmp_path):
+    assert make_storage(tmp_path).load() == {}
+
+
+def test_corrupt_snapshot_is_an_error_not_an_empty_db(tmp_path):
+    (tmp_path / "lego_db.json").write_text('{\n    "red": {\n        "a": {')
+
+    with pytest.raises(SnapshotError, match="lego_db.json"):
+        make_storage(tmp_path).load()
+    assert (tmp_path / "lego_db.json").read_text().startswith('{\n    "red"')
+
+
+def test_journal_replays_on_top_of_snapshot(tmp_path):
+    snapshot = {"red": {"a": {"name": "Alpha"}}}
+    (tmp_path / "lego_db.json").write_text(json.dumps(snapshot))
+
+    storage = make_storage(tmp_path)
+    storage.load()
+    storage.put("blue", "b", {"name": "Bravo"})
+    storage.put("red", "a", {"name": "Alpha Prime"})
+    storage.delete("blue", "b")
+
+    db = make_storage(tmp_path).load()
+    assert db == {"red": {"a": {"name": "Alpha Prime"}}, "blue": {}}
+
+
+def test_torn_journal_tail_is_dropped(tmp_path):
+    storage = make_storage(tmp_path)
+    storage.load()
+    storage.put("red", "a", {"name": "Alpha"})
+    with open(storage.journal_path, "a") as f:
+        f.write('{"op":"put","color":"red","uu')
+
+    reloaded = make_storage(tmp_path)
+    assert reloaded.load() == {"red": {"a": {"name": "Alpha"}}}
+    assert reloaded.journal_len == 1
+
+    reloaded.put("red", "b", {"name": "Bravo"})
+    assert set(make_storage(tmp_path).load()["red"]) == {"a", "b"}
+
+
+def test_compact_folds_journal_into_snapshot(tmp_path):
+    storage = make_storage(tmp_path)
+    db = storage.load()
+    db["red"] = {"a": {"name": "Alpha"}}
+    storage.put("red", "a", db["red"]["a"])
+    storage.compact(db)
+
+    assert storage.journal_len == 0
+    assert (tmp_path / "lego_db.json.journal").read_text() == ""
+    assert json.loads((tmp_path / "lego_db.json").read_text()) == db
+
+
+def test_maybe_compact_waits_for_journal_to_outgrow_db(tmp_path):
+    storage = make_storage(tmp_path, compact_min=2)
+    db = storage.load()
+    db["red"] = {"a": {"name": "Alpha"}}
+    storage.put("red", "a", db["red"]["a"])
+    storage.maybe_compact(db)
+    assert storage.journal_len == 1
+
+    storage.put("red", "a", db["red"]["a"])
+    storage.maybe_compact(db)
+    assert storage.journal_len == 0
+
+
+def test_background_writes_replay_after_flush(tmp_path):
+    storage = make_storage(tmp_path, background=True)
+    storage.load()
+    for n in range(50):
+        storage.put("red", f"id{n}", {"name": f"Minifig {n}"})
+    storage.delete("red", "id0")
+    assert storage.flush(timeout=5)
+
+    assert len(make_storage(tmp_path).load()["red"]) == 49
+    assert storage.worker.writes < 51
+    storage.close()
+
+
+def test_background_checkpoint_keeps_edits_made_during_it(tmp_path):
+    storage = make_storage(tmp_path, background=True)
+    db = storage.load()
+    storage.put("red", "a", {"name": "Alpha"})
+    storage.compact(db)
+    storage.put("red", "a", {"name": "Alpha Prime"})
+    storage.put("blue", "b", {"name": "Bravo"})
+    storage.close()
+
+    assert not (tmp_path / "lego_db.json.journal.old").exists()
+    assert make_storage(tmp_path).load() == {
+        "red": {"a": {"name": "Alpha Prime"}}, "blue": {"b": {"name": "Bravo"}},
+    }
+
+
+def test_set_aside_journal_from_unfinished_checkpoint_is_replayed(tmp_path):
+    (tmp_path / "lego_db.json").write_text(json.dumps({"red": {"a": {"name": "Alpha"}}}))
+    (tmp_path / "lego_db.json.journal.old").write_text(
+        '{"op":"put","color":"red","uuid":"a","entry":{"name":"Alpha Prime"}}\n'
+    )
+    (tmp_path / "lego_db.json.journal").write_text(
+        '{"op":"put","color":"blue","uuid":"b","entry":{"name":"Bravo"}}\n'
+    )
+
+    storage = make_storage(tmp_path, background=True)
+    db = storage.load()
+    assert db["red"]["a"]["name"] == "Alpha Prime"
+    storage.compact(db)
+    storage.close()
+
+    assert json.loads((tmp_path / "lego_db.json").read_text()) == {
+        "red": {"a": {"name": "Alpha Prime"}}, "blue": {"b": {"name": "Bravo"}},
+    }
+    assert not (tmp_path / "lego_db.json.journal.old").exists()
+
+
+def test_poll_returns_only_other_processes_records(tmp_path):
+    first, second = make_storage(tmp_path), make_storage(tmp_path)
+    first.load()
+    second.load()
+
+    first.put("red", "a", {"name": "Alpha"})
+    second.put("blue", "b", {"name": "Bravo"})
+    assert second.poll() == [
+        {"op": "put", "color": "red", "uuid": "a", "entry": {"name": "Alpha"}},
+    ]
+    assert [r["uuid"] for r in first.poll()] == ["b"]
+    assert first.poll() == []
+    assert second.poll() == []
+
+
+def test_poll_skips_records_superseded_by_own_later_write(tmp_path):
+    first, second = make_storage(tmp_path), make_storage(tmp_path)
+    first.load()
+    second.load()
+
+    first.put("red", "a", {"name": "Alpha"})
+    first.put("red", "c", {"name": "Charlie"})
+    second.put("red", "a", {"name": "Alpha Prime"})
+    assert [r["uuid"] for r in second.poll()] == ["c"]
+    assert [r["entry"]["name"] for r in first.poll()] == ["Alpha Prime"]
+
+
+def test_compact_waits_until_other_processes_records_are_read(tmp_path):
+    first, second = make_storage(tmp_path), make_storage(tmp_path)
+    db = first.load()
+    second.load()
+
+    second.put("blue", "b", {"name": "Bravo"})
+    first.compact(db)
+    assert (tmp_path / "lego_db.json.journal").read_text() != ""
+
+    for record in first.poll():
+        apply_record(db, record)
+    first.compact(db)
+    assert json.loads((tmp_path / "lego_db.json").read_text()) == {
+        "blue": {"b": {"name": "Bravo"}},
+    }
+
+
+def test_poll_follows_journal_replaced_by_other_process(tmp_path):
+    first, second = make_storage(tmp_path), make_storage(tmp_path)
+    db = first.load()
+    second.load()
+
+    first.put("red", "a", {"name": "Alpha"})
+    first.compact(db)
+    first.put("red", "b", {"name": "Bravo"})
+    assert [r["uuid"] for r in second.poll()] == ["a", "b"]
+
+
+def test_poll_returns_none_while_locked(tmp_path):
+    storage = make_storage(tmp_path)
+    storage.load()
+    with file_lock(storage.lock_path):
+        assert storage.poll() is None
+    assert storage.poll() == []
+
+
+def test_binary_snapshot_is_preferred_until_a_json_compaction(tmp_path):
+    storage = make_storage(tmp_path, binary=True)
+    db = storage.load()
+    storage.put("red", "a", {"name": "Alpha"})
+    storage.compact(db)
+    assert (tmp_path / "lego_db.bin").exists()
+    assert not (tmp_path / "lego_db.json").exists()
+
+    storage = make_storage(tmp_path)
+    db = storage.load()
+    assert db == {"red": {"a": {"name": "Alpha"}}}
+    storage.put("red", "b", {"name": "Bravo"})
+    storage.compact(db)
+    assert not (tmp_path / "lego_db.bin").exists()
+    assert set(json.loads((tmp_path / "lego_db.json").read_text())["red"]) == {"a", "b"}
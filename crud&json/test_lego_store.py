@@ -0,0 +1,189 @@
+import pytest
+
+from lego_filter import parse_filter
+from lego_store import LegoStore
+
+ALPHA = {
+    "name": "Col Canine", "helmet": False, "weapon": "flame",
+    "rank": "Colonel", "armor": "Steel", "has_jetpack": True,
+}
+BRAVO = {
+    "name": "mr bean", "helmet": True, "weapon": "guitar",
+    "rank": "private", "armor": "none", "has_jetpack": False,
+}
+
+
+@pytest.fixture(params=["lego_db.json", "lego.sqlite"])
+def store(request, tmp_path):
+    return LegoStore.open(str(tmp_path / request.param), str(tmp_path / "lego_db.json"))
+
+
+def test_add_rejects_duplicate_names(store):
+    entry_id = store.add("red", dict(ALPHA))
+
+    assert store.get(entry_id) == ALPHA
+    assert store.name_exists("col canine")
+    with pytest.raises(ValueError, match="already exists"):
+        store.add("blue", dict(ALPHA, weapon="sword"))
+    store.add("blue", dict(ALPHA), unique=False)
+    assert store.counts() == {"red": 1, "blue": 1}
+
+
+def test_update_skips_blank_strings_and_tracks_changes(store):
+    entry_id = store.add("red", dict(ALPHA))
+    store.take_changes()
+
+    assert store.update(entry_id, {"name": "", "rank": "General", "helmet": False}) == "red"
+    assert store.get(entry_id)["name"] == "Col Canine"
+    assert store.get(entry_id)["rank"] == "General"
+    assert store.take_changes() == {("red", entry_id): {"rank"}}
+    assert store.update("no-such-uuid", {"rank": "Major"}) is None
+
+
+def test_rename_moves_name_in_index(store):
+    entry_id = store.add("red", dict(ALPHA))
+    store.update(entry_id, {"name": "Gen Canine"})
+
+    assert not store.name_exists("Col Canine")
+    assert store.name_exists("gen canine")
+
+
+def test_delete_find_and_search(store):
+    alpha = store.add("red", dict(ALPHA))
+    bravo = store.add("blue", dict(BRAVO))
+
+    assert store.find(bravo) == "blue"
+    assert dict(store.search(" BEA ")["blue"].items()) == {bravo: BRAVO}
+    assert store.delete(alpha) == "red"
+    assert store.delete(alpha) is None
+    assert store.find(alpha) is None
+    assert store.get(alpha) is None
+    assert not store.name_exists("Col Canine")
+
+
+def test_changes_survive_reopen(tmp_path):
+    path = str(tmp_path / "lego_db.json")
+    store = LegoStore.open(path)
+    entry_id = store.add("red", dict(ALPHA))
+    store.save()
+
+    assert LegoStore.open(path).find(entry_id) == "red"
+
+
+def test_search_with_attribute_filters(store):
+    alpha = store.add("red", dict(ALPHA))
+    bravo = store.add("blue", dict(BRAVO))
+    clauses = parse_filter("red|blue, !helmet")
+
+    hits = store.search("", filters=clauses)
+    assert {uid for entries in hits.values() for uid in entries} == {alpha}
+
+    store.update(bravo, {"helmet": False})
+    hits = store.search("bean", filters=clauses)
+    assert {uid for entries in hits.values() for uid in entries} == {bravo}
+    assert not any(store.search("", filters=parse_filter("rank=general")).values())
+
+
+def test_summary_tracks_edits_for_any_color(store):
+    alpha = store.add("teal", dict(ALPHA))
+    store.add("teal", dict(BRAVO))
+    assert store.summary("teal")["helmet_ratio"] == 0.5
+
+    store.update(alpha, {"helmet": True, "rank": "private"})
+    summary = store.summary("teal")
+    assert summary["helmets"] == 2
+    assert summary["jetpacks"] == 1
+    assert summary["ranks"] == {"private": 2}
+    store.delete(alpha)
+    assert store.counts() == {"teal": 1}
+
+
+def test_sync_applies_other_instances_edits(tmp_path):
+    path = str(tmp_path / "lego_db.json")
+    first, second = LegoStore.open(path), LegoStore.open(path)
+    alpha = first.add("red", dict(ALPHA))
+    bravo = first.add("red", dict(BRAVO))
+    assert second.sync() == {("red", alpha): set(ALPHA), ("red", bravo): set(BRAVO)}
+
+    first.update(alpha, {"rank": "General"})
+    first.delete(bravo)
+    assert second.sync() == {("red", alpha): {"rank"}, ("red", bravo): None}
+    assert second.get(alpha)["rank"] == "General"
+    assert second.get(bravo) is None
+    assert not second.name_exists("mr bean")
+    assert second.counts() == {"red": 1}
+    assert second.take_changes() == {("red", alpha): set(ALPHA)}
+    assert second.sync() == {}
+
+
+def test_save_includes_other_instances_edits(tmp_path):
+    path = str(tmp_path / "lego_db.json")
+    first, second = LegoStore.open(path), LegoStore.open(path)
+    alpha = first.add("red", dict(ALPHA))
+    second.add("blue", dict(BRAVO))
+    first.save()
+
+    assert LegoStore.open(path).counts() == {"red": 1, "blue": 1}
+    assert LegoStore.open(path).get(alpha) == ALPHA
+
+
+def test_saving_an_unchanged_store_leaves_the_snapshot_alone(tmp_path):
+    path = tmp_path / "lego_db.json"
+    store = LegoStore.open(str(path))
+    store.add("red", dict(ALPHA))
+    store.add("blue", dict(BRAVO))
+    store.save()
+    store.close()
+    before = path.stat()
+
+    store = LegoStore.open(str(path))
+    store.save()
+    store.close()
+
+    after = path.stat()
+    assert (after.st_ino, after.st_mtime_ns) == (before.st_ino, before.st_mtime_ns)
+    assert store.db.loaded_colors() == []
+
+
+def test_summary_without_compute_leaves_lazy_buckets_unparsed(tmp_path):
+    path = str(tmp_path / "lego_db.json")
+    store = LegoStore.open(path)
+    store.add("red", dict(ALPHA))
+    store.save()
+    store.close()
+
+    store = LegoStore.open(path)
+    assert store.counts() == {"red": 1}
+    assert store.summary("red", compute=False) is None
+    assert store.db.loaded_colors() == []
+    assert store.summary("red")["helmets"] == 0
+
+
+def test_undo_and_redo_walk_the_history(store):
+    alpha = store.add("red", dict(ALPHA))
+    store.update(alpha, {"rank": "General", "weapon": ""})
+    store.delete(alpha)
+
+    assert store.undo() == ("red", alpha)
+    assert store.get(alpha)["rank"] == "General"
+    assert store.undo() == ("red", alpha)
+    assert store.get(alpha) == ALPHA
+    assert store.name_exists("col canine")
+    assert store.undo() == ("red", alpha)
+    assert store.get(alpha) is None
+    assert store.counts() == {}
+    assert store.undo() is None
+
+    assert store.redo() == ("red", alpha)
+    assert store.redo() == ("red", alpha)
+    assert store.get(alpha)["rank"] == "General"
+    store.add("blue", dict(BRAVO))
+    assert store.redo() is None
+    assert store.history.can_undo
+
+
+def test_undo_removes_fields_the_edit_added(store):
+    entry_id = store.add("red", {"name": "Bare"})
+    store.update(entry_id, {"rank": "Major"})
+    store.undo()
+    assert not store.get(entry_id).get("rank")  # SQLite keeps every column
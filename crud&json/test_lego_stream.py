@@ -0,0 +1,106 @@
+import json
+
+import pytest
+
+from lego_storage import JournalStorage
+from lego_stream import LazyDB, load_lazy
+
+DB = {
+    "red": {
+        "a": {"name": "Col Canine", "helmet": False, "rank": "Colonel"},
+    },
+    "blue": {
+        "b": {"name": "tricky\n        \"name\"", "helmet": True, "rank": "}"},
+        "c": {"name": "mr bean", "helmet": False, "rank": "private"},
+    },
+    "gr\"een": {},
+}
+
+
+def write_indented(path, data):
+    path.write_text(json.dumps(data, indent=4))
+
+
+def test_indented_snapshot_is_indexed_without_parsing(tmp_path):
+    path = tmp_path / "lego_db.json"
+    write_indented(path, DB)
+
+    db = load_lazy(str(path))
+    assert isinstance(db, LazyDB)
+    assert list(db) == ["red", "blue", "gr\"een"]
+    assert {color: len(bucket) for color, bucket in db.items()} == {
+        "red": 1, "blue": 2, "gr\"een": 0,
+    }
+    assert db.loaded_colors() == []
+
+
+def test_buckets_materialize_on_demand(tmp_path):
+    path = tmp_path / "lego_db.json"
+    write_indented(path, DB)
+
+    db = load_lazy(str(path))
+    assert db["blue"]["b"] == DB["blue"]["b"]
+    assert db.loaded_colors() == ["blue"]
+    assert {color: dict(bucket) for color, bucket in db.items()} == DB
+
+
+def test_compact_json_falls_back_to_full_parse(tmp_path):
+    path = tmp_path / "lego_db.json"
+    path.write_text(json.dumps(DB))
+    assert load_lazy(str(path)) == DB
+
+
+def test_journal_storage_round_trips_through_lazy_snapshot(tmp_path):
+    path = tmp_path / "lego_db.json"
+    write_indented(path, DB)
+
+    storage = JournalStorage(str(path))
+    db = storage.load()
+    storage.put("red", "d", {"name": "Delta"})
+    storage.delete("blue", "c")
+    assert db.loaded_colors() == ["red", "blue"]
+    storage.compact(db)
+
+    expected = json.loads(json.dumps(DB))
+    expected["red"]["d"] = {"name": "Delta"}
+    del expected["blue"]["c"]
+    assert json.loads(path.read_text()) == expected
+    assert JournalStorage(str(path)).load() == expected
+
+
+def test_sidecar_index_is_used_until_the_file_changes(tmp_path, monkeypatch):
+    import lego_stream
+
+    path = tmp_path / "lego_db.json"
+    write_indented(path, DB)
+    load_lazy(str(path))
+    assert (tmp_path / "lego_db.json.idx").exists()
+
+    monkeypatch.setattr(lego_stream, "_index", lambda mm: pytest.fail("rescanned"))
+    assert len(load_lazy(str(path))["blue"]) == 2
+
+    monkeypatch.undo()
+    write_indented(path, {"red": {}})
+    assert load_lazy(str(path)) == {"red": {}}
+
+
+def test_new_colors_added_through_setdefault_are_kept(tmp_path):
+    path = tmp_path / "lego_db.json"
+    write_indented(path, DB)
+
+    db = load_lazy(str(path))
+    db.setdefault("pink", {})["p"] = {"name": "Pinky"}
+    assert db["pink"] == {"p": {"name": "Pinky"}}
+
+
+def test_dump_snapshot_matches_json_dump_indent_4():
+    import io
+
+    from lego_record import db_from_json
+    from lego_stream import dump_snapshot
+
+    data = dict(DB, nested={"n": {"name": "Deep", "gear": {"a": [1, 2]}}}, empty={"e": {}})
+    for db in ({}, data, db_from_json(data)):
+        out = io.StringIO()
+        dump_snapshot(db, out)
+        assert out.getvalue() == json.dumps(json.loads(json.dumps(data if db else {})), indent=4)
@@ -0,0 +1,101 @@
+from lego_filter import BitmapIndex
+from lego_trigram import TrigramIndex, ranked_search, similarity, trigrams
+
+
+def make_indexes():
+    db = {
+        "red": {
+            "a": {"name": "Col Canine", "weapon": "flame", "rank": "Colonel", "armor": "Steel"},
+            "b": {"name": "Minifig Bob", "weapon": "sword", "rank": "private", "armor": ""},
+        },
+        "blue": {
+            "c": {"name": "mr bean", "weapon": "guitar", "rank": "private", "armor": "none"},
+        },
+    }
+    names = TrigramIndex()
+    names.bind(db)
+    bitmap = BitmapIndex()
+    bitmap.bind(db)
+    return db, names, bitmap
+
+
+def test_substring_matches_any_text_field():
+    _, names, bitmap = make_indexes()
+    assert ranked_search(names, bitmap, "CANINE") == [("red", "a")]
+    assert set(ranked_search(names, bitmap, "privat")) == {("red", "b"), ("blue", "c")}
+    assert names.substring("ea") == [("blue", "c")]  # too short for trigrams: scanned
+
+
+def test_fuzzy_matches_follow_substring_hits_best_first():
+    _, names, bitmap = make_indexes()
+    assert ranked_search(names, bitmap, "minfig") == [("red", "b")]
+    assert ranked_search(names, bitmap, "gitar") == [("blue", "c")]
+    assert ranked_search(names, bitmap, "col") == [("red", "a")]
+    assert ranked_search(names, bitmap, "zzzz") == []
+    assert similarity(trigrams("minifig"), "minifig") == 1.0
+
+
+def test_add_discard_and_slot_reuse():
+    db, names, _ = make_indexes()
+    names.substring("x")  # build
+    del db["red"]["a"]
+    names.discard("a")
+    db["red"]["d"] = {"name": "Colonel Klink"}
+    names.add("red", "d", db["red"]["d"])
+
+    assert names.substring("canine") == []
+    assert names.substring("klink") == [("red", "d")]
+    assert len(names) == 3
+
+
+def test_rebuilds_once_freed_slots_outnumber_live_ones():
+    db, names, _ = make_indexes()
+    names.substring("x")
+    for color, uid in [("red", "a"), ("red", "b")]:
+        del db[color][uid]
+        names.discard(uid)
+
+    assert names.substring("bean") == [("blue", "c")]
+    assert names._free == []
+
+
+class Interrupting(dict):
+    """A bucket that runs ``hook`` when a rebuild snapshots it."""
+
+    def __init__(self, entries, hook):
+        super().__init__(entries)
+        self.hook = hook
+
+    def _interrupt(self):
+        hook, self.hook = self.hook, None
+        if hook is not None:
+            hook()
+
+    def __iter__(self):
+        self._interrupt()
+        return super().__iter__()
+
+    def items(self):
+        self._interrupt()
+        return super().items()
+
+
+def test_changes_during_a_rebuild_are_replayed():
+    db, names, _ = make_indexes()
+
+    def gui_thread():
+        db["red"]["g"] = {"name": "gamma"}  # bucket already indexed
+        names.add("red", "g", db["red"]["g"])
+        db["blue"]["d"] = {"name": "delta"}  # bucket about to be indexed
+        names.add("blue", "d", db["blue"]["d"])
+        names.discard("b")
+        del db["red"]["b"]
+
+    db["blue"] = Interrupting(db["blue"], gui_thread)
+    names.substring("x")
+
+    assert names.substring("gamma") == [("red", "g")]
+    assert names.substring("delta") == [("blue", "d")]
+    assert names.substring("bean") == [("blue", "c")]
+    assert names.substring("bob") == []
+    assert len(names) == 4
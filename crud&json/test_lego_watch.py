@@ -0,0 +1,40 @@
+import os
+import threading
+
+import pytest
+
+from lego_watch import FileWatcher
+
+
+@pytest.fixture(params=[True, False], ids=["inotify", "poll"])
+def watch(request, tmp_path):
+    path = tmp_path / "lego_db.json.journal"
+    path.write_text("")
+    changed = threading.Event()
+    watcher = FileWatcher([str(path)], changed.set, interval=0.02, inotify=request.param)
+    yield path, changed
+    watcher.stop()
+
+
+def test_append_is_noticed(watch):
+    path, changed = watch
+    with open(path, "a") as f:
+        f.write('{"op":"del","color":"red","uuid":"a"}\n')
+    assert changed.wait(5)
+
+
+def test_replacement_is_noticed(watch):
+    path, changed = watch
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text("x\n" * 3)
+    os.replace(tmp, path)
+    assert changed.wait(5)
+
+
+def test_other_files_are_ignored(tmp_path):
+    (tmp_path / "watched").write_text("")
+    changed = threading.Event()
+    watcher = FileWatcher([str(tmp_path / "watched")], changed.set, interval=0.02)
+    (tmp_path / "other").write_text("noise")
+    assert not changed.wait(0.2)
+    watcher.stop()